@@ -0,0 +1,517 @@
+"""Бенчмарки SQL Viewer на синтетичних базах зі схемою project_management.db.
+
+Генерує бази розміром 1e4..1e7 рядків (детерміновано, кешуються між запусками) і вимірює
+виконання запитів, заповнення таблиці результатів, кожен формат експорту, перевірку прав,
+історію запитів, читання схеми та шлях ШІ з підміненим клієнтом LLM. Результат - JSON.
+
+Приклади:
+    python benchmark.py --sizes 1e4 1e5 -o bench.json
+    python benchmark.py --sizes 1e6 --only query export --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+from sql_core import (
+    EXPORT_WRITERS, ConnectionManager, HistoryStore, PermissionSet, QueryExport, SchemaCatalog,
+    SchemaPruner, AIResponseCache, split_sql_statements
+)
+
+SCHEMA = '''
+CREATE TABLE departments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    location TEXT NOT NULL
+);
+CREATE TABLE employees (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    position TEXT NOT NULL,
+    salary REAL NOT NULL,
+    hire_date DATE NOT NULL,
+    department_id INTEGER,
+    FOREIGN KEY (department_id) REFERENCES departments(id)
+);
+CREATE TABLE projects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    description TEXT,
+    start_date DATE NOT NULL,
+    end_date DATE,
+    budget REAL NOT NULL
+);
+CREATE TABLE tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    description TEXT,
+    project_id INTEGER NOT NULL,
+    assigned_to INTEGER,
+    due_date DATE NOT NULL,
+    status TEXT NOT NULL,
+    FOREIGN KEY (project_id) REFERENCES projects(id),
+    FOREIGN KEY (assigned_to) REFERENCES employees(id)
+);
+CREATE TABLE vehicles (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    capacity INTEGER,
+    registration_date DATE
+);
+'''
+
+# Частка загальної кількості рядків для кожної таблиці (решта - tasks)
+TABLE_SHARES = {"employees": 0.2, "projects": 0.1, "vehicles": 0.05}
+
+# Рядки генеруються рекурсивним CTE всередині SQLite; "випадкові" значення - детермінований
+# мультиплікативний хеш номера рядка, тож бази однакового розміру ідентичні між запусками
+SEQUENCE = "WITH RECURSIVE seq(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM seq WHERE i < :count) "
+GENERATORS = {
+    "departments": SEQUENCE + '''
+        INSERT INTO departments (id, name, location)
+        SELECT i, 'Відділ ' || i,
+               CASE i % 5 WHEN 0 THEN 'Київ' WHEN 1 THEN 'Львів' WHEN 2 THEN 'Одеса'
+                          WHEN 3 THEN 'Харків' ELSE 'Дніпро' END
+        FROM seq''',
+    "employees": SEQUENCE + '''
+        INSERT INTO employees (id, name, position, salary, hire_date, department_id)
+        SELECT i, 'Працівник ' || i,
+               CASE (i * 7) % 4 WHEN 0 THEN 'Розробник' WHEN 1 THEN 'Тестувальник'
+                                WHEN 2 THEN 'Менеджер проектів' ELSE 'HR спеціаліст' END,
+               15000 + (i * 2654435761) % 45000,
+               date('2015-01-01', '+' || ((i * 40503) % 3650) || ' days'),
+               (i * 2246822519) % :departments + 1
+        FROM seq''',
+    "projects": SEQUENCE + '''
+        INSERT INTO projects (id, name, description, start_date, end_date, budget)
+        SELECT i, 'Проєкт ' || i, 'Опис проєкту ' || i || ': розробка та впровадження системи',
+               date('2020-01-01', '+' || ((i * 40503) % 1460) || ' days'),
+               CASE WHEN i % 10 = 0 THEN NULL
+                    ELSE date('2024-01-01', '+' || ((i * 9973) % 730) || ' days') END,
+               50000 + (i * 2654435761) % 950000
+        FROM seq''',
+    "tasks": SEQUENCE + '''
+        INSERT INTO tasks (id, name, description, project_id, assigned_to, due_date, status)
+        SELECT i, 'Завдання ' || i, 'Підзавдання для проєкту ' || ((i * 2654435761) % :projects + 1),
+               (i * 2654435761) % :projects + 1,
+               CASE WHEN i % 20 = 0 THEN NULL ELSE (i * 2246822519) % :employees + 1 END,
+               date('2023-01-01', '+' || ((i * 9973) % 1095) || ' days'),
+               CASE (i * 31) % 4 WHEN 0 THEN 'Завершено' WHEN 1 THEN 'В процесі'
+                                 WHEN 2 THEN 'Заплановано' ELSE 'Відкладено' END
+        FROM seq''',
+    "vehicles": SEQUENCE + '''
+        INSERT INTO vehicles (id, name, type, capacity, registration_date)
+        SELECT i, CASE i % 3 WHEN 0 THEN 'Van' WHEN 1 THEN 'Sedan' ELSE 'Truck' END || ' ' || i,
+               CASE i % 2 WHEN 0 THEN 'Cargo' ELSE 'Passenger' END,
+               2 + (i * 40503) % 40,
+               date('2018-01-01', '+' || ((i * 9973) % 2000) || ' days')
+        FROM seq''',
+}
+
+# Типові запити: точковий пошук, повне сканування з фільтром, JOIN з групуванням, сортування
+QUERIES = {
+    "point_lookup": "SELECT * FROM employees WHERE id = {middle}",
+    "scan_filter": "SELECT * FROM tasks WHERE status = 'В процесі'",
+    "join_group": "SELECT d.name, COUNT(*), AVG(e.salary) FROM employees e "
+                  "JOIN departments d ON d.id = e.department_id GROUP BY d.name",
+    "join_three": "SELECT t.name, p.name, e.name FROM tasks t JOIN projects p ON p.id = t.project_id "
+                  "LEFT JOIN employees e ON e.id = t.assigned_to WHERE p.budget > 900000",
+    "order_limit": "SELECT * FROM employees ORDER BY salary DESC LIMIT 100",
+    "count_all": "SELECT COUNT(*) FROM tasks",
+}
+
+# Скільки рядків експортувати у кожному форматі (PDF і Word верстаються значно повільніше)
+EXPORT_ROWS = {"csv": 1000000, "xlsx": 200000, "docx": 20000, "pdf": 10000}
+
+BENCHMARK_GROUPS = ("query", "grid", "export", "permissions", "history", "schema", "ai")
+
+def table_sizes(total_rows):
+    sizes = {table: max(1, int(total_rows * share)) for table, share in TABLE_SHARES.items()}
+    sizes["departments"] = max(5, min(1000, total_rows // 1000))
+    sizes["tasks"] = max(1, total_rows - sum(sizes.values()))
+    return sizes
+
+def generate_database(path, total_rows):
+    """Створює базу зі схемою project_management.db; повертає кількість рядків по таблицях"""
+    sizes = table_sizes(total_rows)
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        # Під час генерації надійність не потрібна - лише швидкість
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA cache_size = -262144")
+        conn.executescript(SCHEMA)
+        conn.execute("BEGIN")
+        for table in ("departments", "employees", "projects", "tasks", "vehicles"):
+            conn.execute(GENERATORS[table], dict(sizes, count=sizes[table]))
+        conn.execute("COMMIT")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return sizes
+
+def cached_database(work_dir, total_rows):
+    """Згенерована раніше база перевикористовується, якщо збігаються розміри таблиць"""
+    path = os.path.join(work_dir, f"bench_{total_rows}.db")
+    meta_path = path + ".json"
+    sizes = table_sizes(total_rows)
+    if os.path.exists(path) and os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            if json.load(f) == sizes:
+                return path, sizes, 0.0
+    started = time.perf_counter()
+    generate_database(path, total_rows)
+    elapsed = time.perf_counter() - started
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(sizes, f)
+    return path, sizes, elapsed
+
+def measure(fn, repeat):
+    """Запускає fn repeat разів; повертає статистику часу і останній результат fn"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    stats = {"min": min(timings), "median": statistics.median(timings), "max": max(timings), "runs": repeat}
+    return stats, result
+
+class BenchmarkRun:
+    def __init__(self, args):
+        self.args = args
+        self.results = []
+        self._qt = None
+
+    def record(self, name, size, stats, **extra):
+        entry = {"benchmark": name, "size": size, "seconds": stats}
+        entry.update(extra)
+        self.results.append(entry)
+        print(f"{name:<32}{str(size or '-'):>10}{stats['median'] * 1000:12.2f} мс  {extra or ''}",
+              file=sys.stderr)
+
+    def skip(self, name, size, reason):
+        self.results.append({"benchmark": name, "size": size, "skipped": reason})
+        print(f"{name:<32}{str(size or '-'):>10}  пропущено: {reason}", file=sys.stderr)
+
+    def qt(self):
+        """Модуль mix з QApplication без дисплея; None, якщо PyQt6 недоступний"""
+        if self._qt is None:
+            os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+            try:
+                from PyQt6.QtWidgets import QApplication
+                import mix
+            except ImportError as e:
+                self._qt = (None, None, str(e))
+            else:
+                app = QApplication.instance() or QApplication([])
+                self._qt = (mix, app, None)
+        return self._qt
+
+    # === Окремі групи ===
+    def bench_query(self, db_path, size, sizes):
+        connections = ConnectionManager()
+        try:
+            for name, template in QUERIES.items():
+                sql = template.format(middle=max(1, sizes["employees"] // 2))
+
+                def first_batch():
+                    # Те, що бачить користувач: перша порція рядків для таблиці
+                    conn = connections.acquire(db_path)
+                    try:
+                        return len(conn.execute(sql).fetchmany(500))
+                    finally:
+                        connections.release(conn)
+
+                def full_fetch():
+                    conn = connections.acquire(db_path)
+                    try:
+                        cursor = conn.execute(sql)
+                        count = 0
+                        while True:
+                            rows = cursor.fetchmany(2000)
+                            if not rows:
+                                return count
+                            count += len(rows)
+                    finally:
+                        connections.release(conn)
+
+                stats, rows = measure(first_batch, self.args.repeat)
+                self.record(f"query.{name}.first_batch", size, stats, rows=rows)
+                stats, rows = measure(full_fetch, self.args.repeat)
+                self.record(f"query.{name}.full", size, stats, rows=rows)
+        finally:
+            connections.close_all()
+
+    def bench_grid(self, db_path, size, sizes):
+        mix, app, error = self.qt()
+        if mix is None:
+            self.skip("grid.populate", size, error)
+            return
+        from PyQt6.QtWidgets import QTableView
+        limit = min(sizes["employees"], self.args.grid_rows)
+        conn = sqlite3.connect(db_path)
+        cursor = conn.execute(f"SELECT * FROM employees LIMIT {limit}")
+        columns = [desc[0] for desc in cursor.description]
+        rows = cursor.fetchall()
+        conn.close()
+        batch = mix.ResultTableModel.FETCH_BATCH_SIZE
+
+        def populate():
+            # Перша порція, потім довантаження порціями, як під час прокрутки
+            model = mix.ResultTableModel()
+            view = QTableView()
+            view.setModel(model)
+            view.resize(1000, 700)
+            view.show()
+            model.set_result(columns, rows[:batch], len(rows) > batch)
+            app.processEvents()
+            for start in range(batch, len(rows), batch):
+                model.append_rows(rows[start:start + batch], start + batch < len(rows))
+            view.scrollToBottom()
+            app.processEvents()
+            view.close()
+            view.deleteLater()
+            return model.rowCount()
+
+        stats, count = measure(populate, self.args.repeat)
+        self.record("grid.populate", size, stats, rows=count)
+
+    def bench_export(self, db_path, size, sizes):
+        out_dir = tempfile.mkdtemp(prefix="sql_viewer_export_")
+        connections = ConnectionManager()
+        try:
+            for fmt, writer_class in EXPORT_WRITERS.items():
+                limit = min(EXPORT_ROWS[fmt], sizes["tasks"], self.args.max_export_rows or EXPORT_ROWS[fmt])
+                sql = f"SELECT * FROM tasks LIMIT {limit}"
+                filename = os.path.join(out_dir, f"export.{fmt}")
+
+                def export():
+                    writer = writer_class(filename, sql)
+                    return QueryExport(connections, db_path, split_sql_statements(sql), writer).run()
+
+                try:
+                    stats, rows = measure(export, self.args.repeat)
+                except ImportError as e:
+                    self.skip(f"export.{fmt}", size, str(e))
+                    continue
+                self.record(f"export.{fmt}", size, stats, rows=rows, bytes=os.path.getsize(filename))
+        finally:
+            connections.close_all()
+            for name in os.listdir(out_dir):
+                os.remove(os.path.join(out_dir, name))
+            os.rmdir(out_dir)
+
+    def bench_permissions(self, db_path, size, sizes):
+        # Звичайний користувач: читання всіх таблиць, зміна лише tasks
+        permissions = PermissionSet(2, {"tasks": {"select": True, "insert": True, "update": True, "delete": False},
+                                        "projects": {"select": True, "insert": False, "update": False,
+                                                     "delete": False}})
+        statements = [QUERIES["join_three"], QUERIES["join_group"],
+                      "UPDATE tasks SET status = 'Завершено' WHERE id = 1",
+                      "WITH t AS (SELECT project_id FROM tasks) SELECT COUNT(*) FROM t JOIN projects p ON p.id = t.project_id"]
+        conn = sqlite3.connect(db_path)
+        iterations = 200
+        try:
+            stats, allowed = measure(lambda: [permissions.check_statements(conn, statements)
+                                              for _ in range(iterations)][-1], self.args.repeat)
+        finally:
+            conn.close()
+        per_statement = {key: value / (iterations * len(statements)) if key != "runs" else value
+                         for key, value in stats.items()}
+        self.record("permissions.check_statements", size, per_statement, allowed=allowed)
+
+    def bench_history(self):
+        fd, path = tempfile.mkstemp(prefix="sql_viewer_history_", suffix=".db")
+        os.close(fd)
+        store = HistoryStore(path)
+        try:
+            entries = self.args.history_entries
+            queries = [f"SELECT name, salary FROM employees WHERE department_id = {i % 97} AND salary > {i}"
+                       for i in range(entries)]
+
+            def append_all():
+                for query in queries:
+                    history_id = store.append(1, query, "bench.db")
+                    store.update_stats(history_id, 1.5, 10)
+
+            stats, _ = measure(append_all, 1)
+            per_append = {key: value / entries if key != "runs" else value for key, value in stats.items()}
+            self.record("history.append", None, per_append, entries=entries)
+            stats, rows = measure(lambda: len(store.fetch(1)), self.args.repeat)
+            self.record("history.first_page", None, stats, rows=rows)
+            stats, rows = measure(lambda: len(store.fetch(1, search="department_id salary")), self.args.repeat)
+            self.record("history.search", None, stats, rows=rows)
+            stats, rows = measure(lambda: len(store.recent_queries(1)), self.args.repeat)
+            self.record("history.recent_queries", None, stats, rows=rows)
+        finally:
+            store.close()
+            os.remove(path)
+
+    def bench_schema(self, db_path, size, sizes):
+        connections = ConnectionManager()
+        catalog = SchemaCatalog(connections)
+        try:
+            def cold():
+                catalog.invalidate(db_path)
+                return len(catalog.get(db_path).tables)
+
+            stats, tables = measure(cold, self.args.repeat)
+            self.record("schema.load", size, stats, tables=tables)
+            stats, _ = measure(lambda: catalog.get(db_path), self.args.repeat)
+            self.record("schema.cached", size, stats)
+        finally:
+            connections.close_all()
+
+    def bench_ai(self, db_path, size, sizes):
+        mix, app, error = self.qt()
+        if mix is None:
+            self.skip("ai.generate", size, error)
+            return
+        latency = self.args.ai_latency_ms / 1000
+        prompts = []
+
+        class FakeCompletions:
+            def create(self, model, messages, **kwargs):
+                prompts.append(messages[-1]["content"])
+                time.sleep(latency)
+                message = types.SimpleNamespace(content="```sql\nSELECT name FROM employees WHERE salary > 30000\n```")
+                return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+        class FakeClient:
+            def __init__(self):
+                self.chat = types.SimpleNamespace(completions=FakeCompletions())
+
+        # Підміняємо g4f, щоб не ходити в мережу і не вантажити справжній пакет
+        saved = {name: sys.modules.get(name) for name in ("g4f", "g4f.client")}
+        fake = types.ModuleType("g4f.client")
+        fake.Client = FakeClient
+        sys.modules["g4f"] = types.ModuleType("g4f")
+        sys.modules["g4f.client"] = fake
+        connections = ConnectionManager()
+        catalog = SchemaCatalog(connections)
+        pruner = SchemaPruner()
+        fd, cache_path = tempfile.mkstemp(prefix="sql_viewer_ai_", suffix=".db")
+        os.close(fd)
+        cache = AIResponseCache(cache_path)
+        question = "покажи працівників із зарплатою понад 30000 та їхні відділи"
+        try:
+            def generate():
+                # Той самий шлях, що й ai_query при промаху кешу
+                schema = catalog.get(db_path)
+                selected = pruner.select(schema, question, [])
+                tables = [(name,) for name in selected]
+                schemas = {name: schema.objects[name].columns for name in selected}
+                sql = mix.SQLApp.try_mysql(None, tables, schemas, question)
+                cache.put(question, schema.fingerprint, sql)
+                return sql
+
+            stats, sql = measure(generate, self.args.repeat)
+            self.record("ai.generate", size, stats, prompt_chars=len(prompts[-1]), sql=sql)
+            fingerprint = catalog.get(db_path).fingerprint
+            stats, _ = measure(lambda: cache.get(question, fingerprint), self.args.repeat)
+            self.record("ai.cache_hit", size, stats)
+        finally:
+            cache.close()
+            os.remove(cache_path)
+            connections.close_all()
+            for name, module in saved.items():
+                if module is None:
+                    sys.modules.pop(name, None)
+                else:
+                    sys.modules[name] = module
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_path, threshold):
+    """Порівнює медіани з попереднім JSON; повертає список регресій"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(entry["benchmark"], entry["size"]): entry["seconds"]["median"]
+                for entry in baseline["results"] if "seconds" in entry}
+    regressions = []
+    for entry in results:
+        key = (entry["benchmark"], entry["size"])
+        if "seconds" not in entry or key not in previous or previous[key] <= 0:
+            continue
+        ratio = entry["seconds"]["median"] / previous[key]
+        entry["baseline_ratio"] = round(ratio, 3)
+        if ratio > threshold:
+            regressions.append({"benchmark": key[0], "size": key[1], "ratio": round(ratio, 3)})
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки SQL Viewer на синтетичних базах")
+    parser.add_argument("--sizes", nargs="+", default=["1e4", "1e5"],
+                        help="загальна кількість рядків у базі, напр. 1e4 1e5 1e6 1e7")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARK_GROUPS, help="запустити лише вибрані групи")
+    parser.add_argument("--repeat", type=int, default=3, help="кількість повторів кожного виміру")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "sql_viewer_bench"),
+                        help="каталог для згенерованих баз (кешуються між запусками)")
+    parser.add_argument("--grid-rows", type=int, default=100000, help="рядків для заповнення таблиці")
+    parser.add_argument("--max-export-rows", type=int, help="обмеження рядків для всіх форматів експорту")
+    parser.add_argument("--history-entries", type=int, default=10000, help="записів історії для вимірів")
+    parser.add_argument("--ai-latency-ms", type=float, default=0.0, help="штучна затримка підміненого LLM")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="файл JSON з результатами")
+    parser.add_argument("--baseline", help="попередній JSON для порівняння")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="у скільки разів повільніше вважається регресією")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    groups = args.only or BENCHMARK_GROUPS
+    os.makedirs(args.work_dir, exist_ok=True)
+    run = BenchmarkRun(args)
+    generated = {}
+    for size in (int(float(value)) for value in args.sizes):
+        db_path, sizes, elapsed = cached_database(args.work_dir, size)
+        generated[size] = {"tables": sizes, "generation_seconds": elapsed,
+                           "file_bytes": os.path.getsize(db_path)}
+        print(f"=== {size} рядків ({db_path}) ===", file=sys.stderr)
+        for group in groups:
+            if group != "history":
+                getattr(run, f"bench_{group}")(db_path, size, sizes)
+    if "history" in groups:
+        run.bench_history()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "databases": generated,
+        },
+        "results": run.results,
+    }
+    regressions = []
+    if args.baseline:
+        regressions = compare(run.results, args.baseline, args.threshold)
+        report["regressions"] = regressions
+        for item in regressions:
+            print(f"РЕГРЕСІЯ {item['benchmark']} ({item['size']}): x{item['ratio']}", file=sys.stderr)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результати збережено у {args.output}", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,35 +1,39 @@
 import sys
+import time
+# Момент початку імпорту модуля - точка відліку для --profile-startup
+STARTUP_STARTED = time.perf_counter()
 import sqlite3
 import os
-import json
-import speech_recognition as sr
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, CancelledError, wait
+import threading
 from PyQt6.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QPushButton, QTableWidget, 
-    QTableWidgetItem, QLineEdit, QLabel, QDialog, QHBoxLayout, QFileDialog,
-    QListWidget, QListWidgetItem, QSplitter, QScrollArea, QGridLayout, QWidget,
-    QGroupBox, QToolButton, QMenu, QCheckBox
+    QApplication, QWidget, QVBoxLayout, QPushButton, QTableView, QTabWidget,
+    QLineEdit, QLabel, QDialog, QHBoxLayout, QFileDialog,
+    QListWidget, QListWidgetItem, QListView, QTreeView, QSplitter, QWidget,
+    QGroupBox, QToolButton, QMenu, QCheckBox, QTreeWidget, QTreeWidgetItem, QSpinBox,
+    QComboBox, QProgressBar, QTableWidget, QTableWidgetItem
+)
+from PyQt6.QtCore import (
+    Qt, QAbstractTableModel, QAbstractListModel, QAbstractItemModel, QModelIndex, QObject, QThread, QTimer, QElapsedTimer,
+    QMetaObject, pyqtSignal, pyqtSlot
+)
+from PyQt6.QtGui import QColor, QFont
+# ШІ, голосове введення, експортери та графіки імпортуються під час першого використання,
+# щоб вікно входу з'являлося без очікування на важкі залежності.
+# QtCharts лише шукаємо, не завантажуючи сам модуль
+HAS_QTCHARTS = importlib.util.find_spec("PyQt6.QtCharts") is not None
+
+from sql_core import (
+    NO_TRANSACTION_KEYWORDS, split_sql_statements, first_keyword, is_read_only_sql, is_authorization_error,
+    PermissionSet, ConnectionManager, quote_identifier, SchemaCatalog, format_table_schema, SchemaPruner,
+    is_ai_error_sql, AIResponseCache, HistoryStore, QueryProfiler, measure_query_memory, authenticate, QueryExport,
+    RowsExport,
+    PLAN_WARNINGS, explain_plan, IndexAdvisor, ResultCache, TableBrowser, ChangeSet, ChangeConflict, editor_value,
+    ColumnProfiler, CHART_FUNCTIONS,
+    chart_categories, chart_line, IMPORT_TYPES, import_column_name, ImportSource, BulkImport,
+    PdfExportWriter, DocxExportWriter, XlsxExportWriter
 )
-from PyQt6.QtCore import Qt
-from reportlab.pdfgen import canvas
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from g4f.client import Client
-from reportlab.lib import colors
-from docx import Document
-from docx.shared import Pt
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment
-try:
-    from PyQt6.QtCharts import QChart, QChartView, QBarSeries, QBarSet, QValueAxis, QPieSeries, QLineSeries
-    from PyQt6.QtCore import QPointF
-    from PyQt6.QtGui import QPainter
-    HAS_QTCHARTS = True
-except ModuleNotFoundError:
-    HAS_QTCHARTS = False
-
-# Реєструємо шрифт Arial та Arial-Bold
-pdfmetrics.registerFont(TTFont("Arial", "C:/Windows/Fonts/arial.ttf"))
-pdfmetrics.registerFont(TTFont("Arial-Bold", "C:/Windows/Fonts/arialbd.ttf"))
 
 class LoginDialog(QDialog):
     def __init__(self):
@@ -64,31 +68,8 @@ class LoginDialog(QDialog):
         
         # Перевірка у базі даних
         try:
-            # Використовуємо окрему базу даних для аутентифікації або вашу основну
-            conn = sqlite3.connect("user_management.db")  # або self.db_path
-            cursor = conn.cursor()
-            
-            # Створити таблицю, якщо вона не існує
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                role TEXT DEFAULT 'user'
-            )''')
-            
-            # Для першого запуску: додати адміністратора
-            cursor.execute("SELECT COUNT(*) FROM users")
-            if cursor.fetchone()[0] == 0:
-                cursor.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)", 
-                              ("admin", "admin123", "admin"))
-                conn.commit()
-            
-            # Перевірити користувача
-            cursor.execute("SELECT user_id, role FROM users WHERE username=? AND password=?", 
-                          (username, password))
-            user_data = cursor.fetchone()
-            conn.close()
+            # Використовуємо окрему базу даних для аутентифікації
+            user_data = authenticate(username, password)
             
             if user_data:
                 self.user_id = user_data[0]
@@ -103,11 +84,1853 @@ class LoginDialog(QDialog):
         from PyQt6.QtWidgets import QMessageBox
         QMessageBox.warning(self, "Помилка входу", "Невірний логін або пароль")
 
+class HistoryListModel(QAbstractListModel):
+    """Список історії, що довантажує сторінки з HistoryStore під час прокрутки"""
+
+    def __init__(self, store, user_id, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.user_id = user_id
+        self.search = ""
+        self.entries = []
+        self.has_more = True
+
+    def set_search(self, text):
+        self.beginResetModel()
+        self.search = text
+        self.entries = []
+        self.has_more = True
+        self.endResetModel()
+
+    def reload(self):
+        self.set_search(self.search)
+
+    def prepend(self, history_id, query, db_path, executed_at):
+        """Новий запис з'являється зверху без повторного читання історії"""
+        if self.search:
+            self.reload()
+            return
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self.entries.insert(0, [history_id, query, db_path, executed_at, None, None])
+        self.endInsertRows()
+
+    def update_stats(self, history_id, elapsed_ms, row_count):
+        for row, entry in enumerate(self.entries):
+            if entry[0] == history_id:
+                entry[4], entry[5] = elapsed_ms, row_count
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+                return
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        history_id, query, db_path, executed_at, elapsed_ms, row_count = self.entries[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            text = " ".join(query.split())
+            return text[:50] + ("..." if len(text) > 50 else "")
+        if role == Qt.ItemDataRole.UserRole:
+            return query
+        if role == Qt.ItemDataRole.ToolTipRole:
+            details = [time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(executed_at))]
+            if elapsed_ms is not None:
+                details.append(f"{elapsed_ms:.0f} мс")
+            if row_count is not None:
+                details.append(f"рядків: {row_count}")
+            if db_path:
+                details.append(os.path.basename(db_path))
+            return " · ".join(details) + "\n\n" + query[:2000]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        before_id = self.entries[-1][0] if self.entries else None
+        try:
+            rows = self.store.fetch(self.user_id, before_id, search=self.search)
+        except sqlite3.Error as e:
+            print(f"Помилка читання історії запитів: {e}")
+            rows = []
+        self.has_more = len(rows) == self.store.PAGE_SIZE
+        if not rows:
+            return
+        first = len(self.entries)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.entries.extend(list(row) for row in rows)
+        self.endInsertRows()
+
+class ResultTableModel(QAbstractTableModel):
+    """Модель результатів запиту, яка довантажує рядки порціями під час прокрутки"""
+    FETCH_BATCH_SIZE = 500
+    # NULL показується сірим курсивом - його не сплутати з текстом "None" чи "NULL"
+    NULL_TEXT = "NULL"
+    NULL_COLOR = QColor(150, 150, 150)
+    _null_font = None
+
+    # Модель просить наступну порцію у фонового виконавця запиту
+    fetch_requested = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.columns = []
+        self.rows = []
+        self.has_more = False
+        self._fetch_pending = False
+
+    def set_result(self, columns, rows=None, has_more=False):
+        """Replace the model contents; has_more means the source cursor is not exhausted yet"""
+        self.beginResetModel()
+        self.columns = list(columns)
+        self.rows = list(rows) if rows else []
+        self.has_more = has_more
+        self._fetch_pending = False
+        self.endResetModel()
+
+    def append_rows(self, rows, has_more):
+        """Додає порцію рядків, отриману з фонового потоку"""
+        self._fetch_pending = False
+        self.has_more = has_more
+        if not rows:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    def clear(self):
+        self.set_result([])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        # Значення перетворюються на рядок лише під час відображення
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.cell_text(self.rows[index.row()][index.column()])
+        if role in (Qt.ItemDataRole.ForegroundRole, Qt.ItemDataRole.FontRole):
+            return self.null_style(role, self.rows[index.row()][index.column()])
+        return None
+
+    @classmethod
+    def cell_text(cls, value):
+        return cls.NULL_TEXT if value is None else str(value)
+
+    @classmethod
+    def null_style(cls, role, value):
+        """Колір і шрифт комірки NULL (ForegroundRole/FontRole); для інших значень - None"""
+        if value is not None:
+            return None
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return cls.NULL_COLOR
+        if cls._null_font is None:
+            cls._null_font = QFont()
+            cls._null_font.setItalic(True)
+        return cls._null_font
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal and section < len(self.columns):
+            return self.columns[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more and not self._fetch_pending
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._fetch_pending = True
+        self.fetch_requested.emit()
+
+    def display_text(self, row, col):
+        """Текст комірки так, як він показується у таблиці"""
+        return self.cell_text(self.rows[row][col])
+
+class SchemaTreeModel(QAbstractItemModel):
+    """Дерево схеми: групи -> таблиці, представлення, індекси, тригери -> стовпці.
+
+    Верхній рівень - один запит до sqlite_master, закешований SchemaCatalog за schema_version.
+    Об'єкти групи додаються порціями (fetchMore), стовпці читаються лише під час розгортання.
+    """
+    CHUNK = 500
+    GROUPS = (("table", "Таблиці"), ("view", "Представлення"), ("index", "Індекси"), ("trigger", "Тригери"))
+
+    class Node:
+        __slots__ = ("kind", "name", "detail", "parent", "row", "children", "pending", "loaded")
+
+        def __init__(self, kind, name, detail="", parent=None, row=0):
+            self.kind = kind
+            self.name = name
+            self.detail = detail
+            self.parent = parent
+            self.row = row
+            self.children = []
+            self.pending = []    # відфільтровані, але ще не додані в модель об'єкти групи
+            self.loaded = kind not in ("table", "view", "index")
+
+    def __init__(self, catalog, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.db_path = None
+        self.version = None
+        self.objects = {kind: [] for kind, _ in self.GROUPS}  # тип -> [(назва, таблиця)]
+        self.matches = dict(self.objects)
+        self.search = ""
+        self.root = self.Node("root", "")
+        self._build_groups()
+
+    def set_database(self, db_path, force=False):
+        """Перечитує список об'єктів; False, якщо схема не змінилась"""
+        version, listing = self.catalog.objects(db_path)
+        if not force and (db_path, version) == (self.db_path, self.version):
+            return False
+        self.db_path, self.version = db_path, version
+        self.objects = {kind: [] for kind, _ in self.GROUPS}
+        for kind, name, table in listing:
+            if kind in self.objects:
+                self.objects[kind].append((name, table))
+        self.search = ""
+        self.set_search("", force=True)
+        return True
+
+    def set_search(self, text, force=False):
+        """Фільтр за входженням у назву; уточнення пошуку фільтрує вже знайдене, а не весь каталог"""
+        text = text.strip().lower()
+        if text == self.search and not force:
+            return
+        narrowing = not force and self.search and text.startswith(self.search)
+        base = self.matches if narrowing else self.objects
+        self.matches = {kind: [item for item in items if text in item[0].lower()] if text else list(items)
+                        for kind, items in base.items()}
+        self.search = text
+        self.beginResetModel()
+        self._build_groups()
+        self.endResetModel()
+
+    def _build_groups(self):
+        self.root.children = []
+        for row, (kind, title) in enumerate(self.GROUPS):
+            group = self.Node("group", title, parent=self.root, row=row)
+            group.pending = list(self.matches.get(kind, []))
+            self.root.children.append(group)
+
+    def node(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.node(parent)
+        if 0 <= row < len(node.children) and column == 0:
+            return self.createIndex(row, 0, node.children[row])
+        return QModelIndex()
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self.root:
+            return QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        return len(self.node(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node(parent)
+        if node.kind in ("root", "group"):
+            return bool(node.children or node.pending)
+        return not node.loaded or bool(node.children)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        node = self.node(parent)
+        return bool(node.pending) if node.kind == "group" else not node.loaded
+
+    def fetchMore(self, parent=QModelIndex()):
+        node = self.node(parent)
+        if node.kind == "group":
+            items, node.pending = node.pending[:self.CHUNK], node.pending[self.CHUNK:]
+            kind = self.GROUPS[node.row][0]
+            children = [self.Node(kind, name, table, node, len(node.children) + i)
+                        for i, (name, table) in enumerate(items)]
+        elif not node.loaded:
+            node.loaded = True
+            try:
+                children = [self.Node("column", name, detail, node, i)
+                            for i, (name, detail) in enumerate(self._columns(node))]
+            except sqlite3.Error as e:
+                print(f"Помилка читання схеми: {e}")
+                children = []
+        else:
+            return
+        if not children:
+            return
+        first = len(node.children)
+        self.beginInsertRows(parent, first, first + len(children) - 1)
+        node.children.extend(children)
+        self.endInsertRows()
+
+    def _columns(self, node):
+        """(назва, опис) стовпців таблиці, представлення чи індексу"""
+        if node.kind == "index":
+            conn = self.catalog.connections.get(self.db_path)
+            return [(name or "<вираз>", "")
+                    for name, in conn.execute("SELECT name FROM pragma_index_info(?) ORDER BY seqno", (node.name,))]
+        info = self.catalog.table(self.db_path, node.name)
+        if info is None:
+            return []
+        return [(name, " ".join(filter(None, [col_type, "PK" if pk else "", "NOT NULL" if notnull else ""])))
+                for _, name, col_type, notnull, _, pk in info.columns]
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if node.kind == "group":
+                return f"{node.name} ({len(node.children) + len(node.pending)})"
+            if node.kind == "column" and node.detail:
+                return f"{node.name}  {node.detail}"
+            return node.name
+        if role == Qt.ItemDataRole.ToolTipRole and node.kind in ("index", "trigger"):
+            return f"Таблиця: {node.detail}"
+        if role == Qt.ItemDataRole.UserRole:
+            return node.kind, node.name
+        return None
+
+class QueryWorker(QObject):
+    """Виконує пакет SQL-інструкцій у фоновому потоці та передає результати в UI.
+
+    Відкритий курсор останньої інструкції тримає SHARED-блокування бази (режим журналу rollback),
+    тож після CURSOR_IDLE_MS без прокрутки він "паркується": курсор закривається, з'єднання
+    повертається в пул, а наступна порція читається повторним виконанням із пропуском уже
+    відданих рядків. Перед власними змінами даних застосунок паркує курсор одразу (park).
+    """
+    RESULT_ROW_LIMIT = 10000  # Скільки рядків зберігається для проміжних SELECT пакета
+    CURSOR_IDLE_MS = 1000     # менше за busy_timeout, тож інші записувачі дочекаються
+    # Кожен сигнал несе run_id, щоб UI відкидав запізнілі сигнали скасованих запитів
+    statement_done = pyqtSignal(int, dict)      # run_id, результат однієї інструкції
+    batch_ready = pyqtSignal(int, list, bool)   # run_id, rows, has_more
+    failed = pyqtSignal(int, str)
+    truncated = pyqtSignal(int, str)            # run_id, чому решту рядків не буде дочитано
+    profiled = pyqtSignal(int, dict)            # run_id, фази виконання пакета (QueryProfiler)
+    finished = pyqtSignal(int)
+
+    def __init__(self, run_id, connections, db_path, queries, authorizer=None,
+                 batch_size=ResultTableModel.FETCH_BATCH_SIZE, cache=None):
+        super().__init__()
+        self.run_id = run_id
+        self.connections = connections
+        self.authorizer = authorizer
+        self.db_path = db_path
+        self.queries = queries
+        self.batch_size = batch_size
+        # Кеш результатів (ResultCache) використовується лише для пакетів SELECT
+        self.cache = cache if cache is not None and ResultCache.is_cacheable(queries) else None
+        self.monitor = cache  # ResultCache.fingerprint перевіряє, чи не змінились дані до дочитування
+        self.fingerprint = None
+        self.resume_after = None  # Скільки рядків останньої інструкції вже віддано (з кешу чи до паркування)
+        self.delivered = 0        # Скільки рядків останньої інструкції віддано в UI
+        self.idle_timer = None
+        self.conn = None
+        self.cursor = None
+        self.cancelled = False
+        self._closed = False
+        # Не даємо interrupt() влучити у з'єднання, яке вже повернуто в пул
+        self._conn_lock = threading.Lock()
+
+    @pyqtSlot()
+    def run(self):
+        # Таймер створюється в потоці виконавця - park викликається в ньому ж
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setInterval(self.CURSOR_IDLE_MS)
+        self.idle_timer.timeout.connect(self.park)
+        if self.cache is not None:
+            # Відбиток бази береться до виконання: зміна під час запиту лише зробить запис застарілим
+            started = time.perf_counter()
+            self.fingerprint = self.cache.fingerprint(self.db_path)
+            entry = self.cache.get(self.db_path, self.queries, self.fingerprint)
+            if entry is not None:
+                self.replay(entry, time.perf_counter() - started)
+                return
+        current = 0
+        profiler = QueryProfiler()
+        conn = None
+        cached = []
+        try:
+            conn = self.connections.acquire(self.db_path, readonly=is_read_only_sql(self.queries),
+                                            authorizer=self.authorizer)
+            with self._conn_lock:
+                self.conn = conn
+            profiler.attach(conn)
+
+            # Увесь пакет - одна транзакція: або застосовуються всі зміни, або жодна
+            explicit = not any(first_keyword(q) in NO_TRANSACTION_KEYWORDS for q in self.queries)
+            if explicit:
+                conn.execute("BEGIN")
+            last = len(self.queries) - 1
+            for i, q in enumerate(self.queries):
+                current = i
+                if self.cancelled:
+                    raise sqlite3.OperationalError("interrupted")
+                started = time.perf_counter()
+                cursor = conn.cursor()
+                profiler.begin_statement()
+                cursor.execute(q)
+                profiler.executed()
+                result = {"index": i, "statement": q, "columns": [], "rows": [],
+                          "has_more": False, "truncated": False}
+                if cursor.description:  # If this query returns results
+                    result["columns"] = [desc[0] for desc in cursor.description]
+                    fetch_started = time.perf_counter()
+                    if i == last:
+                        # Курсор останньої інструкції лишається відкритим для порційного читання
+                        rows = cursor.fetchmany(self.batch_size)
+                        result["has_more"] = len(rows) == self.batch_size
+                        self.delivered = len(rows)
+                        if result["has_more"]:
+                            self.cursor = cursor
+                    else:
+                        rows = cursor.fetchmany(self.RESULT_ROW_LIMIT + 1)
+                        result["truncated"] = len(rows) > self.RESULT_ROW_LIMIT
+                        rows = rows[:self.RESULT_ROW_LIMIT]
+                    profiler.add_fetch(time.perf_counter() - fetch_started)
+                    result["rows"] = rows
+                    result["rowcount"] = len(rows)
+                else:
+                    result["rowcount"] = cursor.rowcount
+                result["elapsed"] = time.perf_counter() - started
+                result["profile"] = profiler.end_statement(result["rowcount"])
+                if self.cache is not None:
+                    cached.append({key: result[key] for key in
+                                   ("index", "statement", "columns", "has_more", "truncated", "rowcount")})
+                    cached[-1]["rows"] = list(result["rows"])
+                self.statement_done.emit(self.run_id, result)
+
+            if explicit:
+                conn.execute("COMMIT")
+            if self.cache is not None:
+                self.cache.put(self.db_path, self.queries, self.fingerprint, cached)
+            summary = profiler.detach(conn)
+            self.profiled.emit(self.run_id, dict(summary, statements=profiler.statements))
+            if self.cursor is None:
+                self.close()
+            else:
+                self.idle_timer.start()
+        except Exception as e:
+            if conn is not None:
+                profiler.detach(conn)
+            # Незавершена транзакція відкочується, коли з'єднання повертається в пул
+            if self.cancelled:
+                message = "Запит скасовано"
+            elif len(self.queries) > 1:
+                message = f"Інструкція {current + 1}: {e}"
+            else:
+                message = str(e)
+            self.failed.emit(self.run_id, message)
+            self.close()
+
+    def replay(self, entry, lookup_seconds):
+        """Віддає результати з кешу так само, як після виконання"""
+        results = entry["results"]
+        phases = []
+        for result in results:
+            phases.append({"prepare_ms": 0.0, "execute_ms": 0.0, "fetch_ms": 0.0, "vm_steps": 0,
+                           "rows": result["rowcount"]})
+            self.statement_done.emit(self.run_id, dict(result, rows=list(result["rows"]), cached=True,
+                                                       elapsed=lookup_seconds / len(results), profile=phases[-1]))
+        self.profiled.emit(self.run_id, {
+            "total_ms": round(lookup_seconds * 1000, 3), "vm_steps": 0,
+            "rows": sum(result["rowcount"] for result in results), "peak_memory_kb": None,
+            "prepare_ms": 0.0, "execute_ms": 0.0, "fetch_ms": 0.0, "cached": True, "statements": phases})
+        if results[-1]["has_more"]:
+            # Решту рядків дочитає fetch_more, виконавши останню інструкцію заново
+            self.delivered = len(results[-1]["rows"])
+            self.resume_after = self.delivered
+        else:
+            self.close()
+
+    def resume(self):
+        """Відкриває курсор останньої інструкції і пропускає рядки, які вже віддано; False - дані змінились"""
+        skip, self.resume_after = self.resume_after, None
+        if self.monitor is not None and self.monitor.fingerprint(self.db_path) != self.fingerprint:
+            if self.cache is not None:
+                self.cache.invalidate(self.db_path, self.queries)
+            return False
+        conn = self.connections.acquire(self.db_path, readonly=True, authorizer=self.authorizer)
+        with self._conn_lock:
+            self.conn = conn
+        self.cursor = conn.execute(self.queries[-1])
+        while skip > 0:
+            skipped = len(self.cursor.fetchmany(min(skip, 10000)))
+            if not skipped:
+                break
+            skip -= skipped
+        return True
+
+    @pyqtSlot()
+    def fetch_more(self):
+        """Читає наступну порцію рядків з відкритого (або запаркованого) курсора"""
+        if self.idle_timer is not None:
+            self.idle_timer.stop()
+        try:
+            if self.cursor is None and self.resume_after is not None:
+                if not self.resume():
+                    self.batch_ready.emit(self.run_id, [], False)
+                    self.truncated.emit(self.run_id, "дані змінилися - виконайте запит ще раз, щоб побачити решту")
+                    self.close()
+                    return
+            if self.cursor is None:
+                return
+            batch = self.cursor.fetchmany(self.batch_size)
+        except Exception as e:
+            self.failed.emit(self.run_id, "Запит скасовано" if self.cancelled else str(e))
+            self.close()
+            return
+        has_more = len(batch) == self.batch_size
+        self.delivered += len(batch)
+        if self.cache is not None:
+            self.cache.extend(self.db_path, self.queries, batch, has_more)
+        self.batch_ready.emit(self.run_id, batch, has_more)
+        if not has_more:
+            self.close()
+        else:
+            self.idle_timer.start()
+
+    @pyqtSlot()
+    def park(self):
+        """Закриває відкритий курсор, щоб не тримати блокування бази; дочитування - через resume"""
+        if self._closed or self.cursor is None:
+            return
+        self.idle_timer.stop()
+        rerunnable = is_read_only_sql(self.queries)
+        if rerunnable:
+            # Поки курсор відкритий, інші з'єднання не можуть змінити дані - відбиток відповідає прочитаному
+            self.fingerprint = self.monitor.fingerprint(self.db_path) if self.monitor is not None else None
+        try:
+            self.cursor.close()
+        except sqlite3.Error:
+            pass
+        self.cursor = None
+        with self._conn_lock:
+            if self.conn is not None:
+                self.connections.release(self.conn)
+                self.conn = None
+        if rerunnable:
+            self.resume_after = self.delivered
+            return
+        # Інструкцію пакета зі змінами даних не можна виконати повторно - результат лишається неповним
+        self.batch_ready.emit(self.run_id, [], False)
+        self.truncated.emit(self.run_id, "курсор закрито перед зміною даних, решту рядків не дочитано")
+        self.close()
+
+    def cancel(self):
+        """Called from the GUI thread: interrupts whatever SQLite is doing right now"""
+        self.cancelled = True
+        with self._conn_lock:
+            if self.conn is not None:
+                try:
+                    self.conn.interrupt()
+                except sqlite3.Error:
+                    pass
+
+    @pyqtSlot()
+    def close(self):
+        """Закриває курсор і з'єднання та завершує потік виконавця"""
+        if self._closed:
+            return
+        self._closed = True
+        if self.idle_timer is not None:
+            self.idle_timer.stop()
+        if self.cursor is not None:
+            try:
+                self.cursor.close()
+            except sqlite3.Error:
+                pass
+            self.cursor = None
+        with self._conn_lock:
+            if self.conn is not None:
+                self.connections.release(self.conn)
+                self.conn = None
+        self.finished.emit(self.run_id)
+
+class AIQueryWorker(QObject):
+    """Runs AI validation and speculative SQL generation concurrently off the GUI thread"""
+    POLL_INTERVAL = 0.1        # с - як часто перевіряти скасування
+    VALIDATION_TIMEOUT = 30    # с
+    GENERATION_TIMEOUT = 90    # с
+
+    generated = pyqtSignal(int, str)   # run_id, sql
+    rejected = pyqtSignal(int, str)    # run_id, повідомлення валідації
+    failed = pyqtSignal(int, str)
+    finished = pyqtSignal(int)
+
+    def __init__(self, run_id, validate, generate):
+        super().__init__()
+        self.run_id = run_id
+        self.validate = validate
+        self.generate = generate
+        self.cancelled = False
+
+    @pyqtSlot()
+    def run(self):
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            # Генерація стартує одразу, не чекаючи валідації; якщо валідація відхилить запит - результат відкидається
+            validation = executor.submit(self.validate)
+            generation = executor.submit(self.generate)
+
+            is_valid, message = self._wait(validation, self.VALIDATION_TIMEOUT)
+            if not is_valid:
+                generation.cancel()
+                self.rejected.emit(self.run_id, message)
+                return
+            self.generated.emit(self.run_id, self._wait(generation, self.GENERATION_TIMEOUT))
+        except CancelledError:
+            pass
+        except TimeoutError:
+            self.failed.emit(self.run_id, "Час очікування відповіді ШІ вичерпано")
+        except Exception as e:
+            self.failed.emit(self.run_id, str(e))
+        finally:
+            # Не чекаємо завислих мережевих викликів - їхній результат просто ігнорується
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.finished.emit(self.run_id)
+
+    def _wait(self, future, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.cancelled:
+                raise CancelledError()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError()
+            done, _ = wait([future], timeout=min(self.POLL_INTERVAL, remaining))
+            if done:
+                return future.result()
+
+    def cancel(self):
+        """Called from the GUI thread"""
+        self.cancelled = True
+
+class MemoryProfileWorker(QObject):
+    """Окремий прохід measure_query_memory у фоновому потоці - не під час вимірювання часу"""
+    done = pyqtSignal(int, float)   # run_id, КБ
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, run_id, connections, db_path, statements, authorizer=None):
+        super().__init__()
+        self.run_id = run_id
+        self.connections = connections
+        self.db_path = db_path
+        self.statements = statements
+        self.authorizer = authorizer
+
+    @pyqtSlot()
+    def run(self):
+        conn = None
+        try:
+            conn = self.connections.acquire(self.db_path, readonly=True, authorizer=self.authorizer)
+            self.done.emit(self.run_id, measure_query_memory(conn, self.statements))
+        except Exception as e:
+            self.failed.emit(self.run_id, str(e))
+        finally:
+            if conn is not None:
+                self.connections.release(conn)
+
+class ExportWorker(QObject):
+    """Виконує QueryExport (або RowsExport для вже отриманих рядків) у фоновому потоці"""
+    progress = pyqtSignal(int)   # exported rows so far
+    status = pyqtSignal(str)     # стадія, що виконується після читання рядків (напр. верстка PDF)
+    done = pyqtSignal(str)       # filename
+    failed = pyqtSignal(str)
+
+    def __init__(self, connections, db_path, statements, writer, authorizer=None, columns=None, rows=None):
+        super().__init__()
+        self.writer = writer
+        self.writer.status_callback = self.status.emit
+        if rows is not None:
+            self.export = RowsExport(columns, rows, writer, progress_callback=self.progress.emit)
+        else:
+            self.export = QueryExport(connections, db_path, statements, writer, authorizer,
+                                      progress_callback=self.progress.emit)
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            self.export.run()
+            self.done.emit(self.writer.filename)
+        except Exception as e:
+            self.failed.emit("Експорт скасовано" if self.export.cancelled else str(e))
+
+    def cancel(self):
+        """Called from the GUI thread"""
+        self.export.cancel()
+
+class ImportWorker(QObject):
+    """Виконує BulkImport у фоновому потоці"""
+    progress = pyqtSignal(int, float, str)   # вставлено рядків, частка прочитаного файлу, стадія
+    done = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, bulk_import):
+        super().__init__()
+        self.bulk_import = bulk_import
+        self.bulk_import.progress_callback = self.progress.emit
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            self.done.emit(self.bulk_import.run())
+        except Exception as e:
+            self.failed.emit("Імпорт скасовано, зміни відкочено" if self.bulk_import.cancelled else str(e))
+
+    def cancel(self):
+        """Called from the GUI thread"""
+        self.bulk_import.cancel()
+
+class IndexAdvisorWorker(QObject):
+    """Запускає IndexAdvisor у фоновому потоці"""
+    progress = pyqtSignal(str)
+    done = pyqtSignal(list)      # пропозиції
+    failed = pyqtSignal(str)
+
+    def __init__(self, db_path, workload):
+        super().__init__()
+        self.workload = workload
+        self.advisor = IndexAdvisor(db_path)
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            self.done.emit(self.advisor.analyze(self.workload, self.progress.emit))
+        except Exception as e:
+            self.failed.emit("Аналіз скасовано" if self.advisor.cancelled else str(e))
+
+    def cancel(self):
+        """Called from the GUI thread"""
+        self.advisor.cancel()
+
+class QueryPlanDialog(QDialog):
+    """Дерево EXPLAIN QUERY PLAN; повні сканування та тимчасові B-дерева підсвічуються"""
+    WARNING_COLOR = QColor(200, 60, 40)
+
+    def __init__(self, plans, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("План запиту")
+        self.resize(700, 400)
+        layout = QVBoxLayout(self)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Крок", "Проблема"])
+        counts = {}
+        for number, (statement, nodes) in enumerate(plans, start=1):
+            root = QTreeWidgetItem([f"{number}. {' '.join(statement.split())[:150]}", ""])
+            self.tree.addTopLevelItem(root)
+            self._add_nodes(root, nodes, counts)
+        self.tree.expandAll()
+        self.tree.resizeColumnToContents(0)
+        layout.addWidget(self.tree)
+        if counts:
+            summary = " · ".join(f"{PLAN_WARNINGS[kind]}: {count}" for kind, count in counts.items())
+            layout.addWidget(QLabel(f"⚠ {summary}"))
+        else:
+            layout.addWidget(QLabel("✅ Повних сканувань і тимчасових B-дерев немає"))
+
+    def _add_nodes(self, parent, nodes, counts):
+        for node in nodes:
+            warning = node["warning"]
+            item = QTreeWidgetItem([node["detail"], PLAN_WARNINGS[warning] if warning else ""])
+            if warning:
+                counts[warning] = counts.get(warning, 0) + 1
+                for column in (0, 1):
+                    item.setForeground(column, self.WARNING_COLOR)
+            parent.addChild(item)
+            self._add_nodes(item, node["children"], counts)
+
+class IndexAdvisorDialog(QDialog):
+    """Пропозиції індексів за історією запитів; адміністратор може застосувати їх одним натисканням"""
+    apply_requested = pyqtSignal(str)  # CREATE INDEX
+
+    def __init__(self, db_path, workload, can_apply, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Поради щодо індексів")
+        self.resize(900, 400)
+        self.suggestions = []
+        layout = QVBoxLayout(self)
+        self.status_label = QLabel(f"Запитів в історії: {len(workload)}")
+        layout.addWidget(self.status_label)
+        self.model = ResultTableModel(self)
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.view.setSelectionMode(QTableView.SelectionMode.SingleSelection)
+        self.view.verticalHeader().setVisible(False)
+        layout.addWidget(self.view)
+        buttons = QHBoxLayout()
+        self.apply_button = QPushButton("Застосувати")
+        self.apply_button.setToolTip("Створити вибраний індекс у базі даних")
+        self.apply_button.setVisible(can_apply)
+        self.apply_button.setEnabled(False)
+        self.apply_button.clicked.connect(self.apply_selected)
+        buttons.addWidget(self.apply_button)
+        self.cancel_button = QPushButton("⏹ Скасувати")
+        self.cancel_button.clicked.connect(self.cancel)
+        buttons.addWidget(self.cancel_button)
+        buttons.addStretch(1)
+        layout.addLayout(buttons)
+
+        self.worker = IndexAdvisorWorker(db_path, workload)
+        self.thread = QThread(self)
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+        self.worker.progress.connect(self.status_label.setText)
+        self.worker.done.connect(self.on_done)
+        self.worker.failed.connect(self.on_failed)
+        self.worker.done.connect(self.thread.quit)
+        self.worker.failed.connect(self.thread.quit)
+        self.thread.finished.connect(lambda: self.cancel_button.setEnabled(False))
+        self.thread.start()
+
+    def on_done(self, suggestions):
+        self.suggestions = suggestions
+        if not suggestions:
+            self.status_label.setText("Індекси, що помітно прискорили б запити з історії, не знайдено")
+        else:
+            fraction = min(s["sample_fraction"] for s in suggestions)
+            self.status_label.setText(
+                f"Пропозицій: {len(suggestions)} · час виміряно на вибірковій копії "
+                f"(від {fraction:.0%} рядків таблиці) і помножено на кількість виконань")
+        self.show_suggestions()
+        self.view.selectionModel().selectionChanged.connect(
+            lambda: self.apply_button.setEnabled(bool(self.view.selectionModel().selectedRows())))
+
+    def show_suggestions(self):
+        rows = [(s["table"], ", ".join(s["columns"]), "так" if s["covering"] else "ні", s["executions"],
+                 s["before_ms"], s["after_ms"], f"×{s['speedup']}", s["saved_ms"], s["sql"])
+                for s in self.suggestions]
+        self.model.set_result(["Таблиця", "Стовпці", "Покривний", "Виконань", "До, мс", "Після, мс",
+                               "Прискорення", "Економія, мс", "SQL"], rows)
+        self.view.resizeColumnsToContents()
+
+    def on_failed(self, message):
+        self.status_label.setText(f"❌ {message}")
+
+    def apply_selected(self):
+        selected = self.view.selectionModel().selectedRows()
+        if not selected:
+            return
+        suggestion = self.suggestions.pop(selected[0].row())
+        self.apply_requested.emit(suggestion["sql"])
+        self.show_suggestions()
+        self.apply_button.setEnabled(False)
+
+    def cancel(self):
+        self.worker.cancel()
+
+    def closeEvent(self, event):
+        self.worker.cancel()
+        self.thread.quit()
+        self.thread.wait(2000)
+        super().closeEvent(event)
+
+class BrowseWorker(QObject):
+    """Завантажує одну сторінку TableBrowser у фоновому потоці"""
+    page_ready = pyqtSignal(int, list, int)   # run_id, rows, кількість сторінок (-1 - не змінилась)
+    failed = pyqtSignal(int, str)
+    finished = pyqtSignal(int)
+
+    def __init__(self, run_id, connections, db_path, browser, action, args=(), authorizer=None):
+        super().__init__()
+        self.run_id = run_id
+        self.connections = connections
+        self.db_path = db_path
+        self.browser = browser
+        self.action = action
+        self.args = args
+        self.authorizer = authorizer
+        self.conn = None
+        self._conn_lock = threading.Lock()
+
+    @pyqtSlot()
+    def run(self):
+        conn = None
+        try:
+            conn = self.connections.acquire(self.db_path, readonly=True, authorizer=self.authorizer)
+            with self._conn_lock:
+                self.conn = conn
+            rows = getattr(self.browser, self.action)(conn, *self.args)
+            # Після зміни сортування чи фільтрів кількість сторінок рахується заново
+            pages = self.browser.estimate_pages(conn) if self.action == "first" else -1
+            self.page_ready.emit(self.run_id, rows, pages)
+        except Exception as e:
+            self.failed.emit(self.run_id, str(e))
+        finally:
+            with self._conn_lock:
+                self.conn = None
+            if conn is not None:
+                self.connections.release(conn)
+            self.finished.emit(self.run_id)
+
+    def cancel(self):
+        """Called from the GUI thread"""
+        with self._conn_lock:
+            if self.conn is not None:
+                try:
+                    self.conn.interrupt()
+                except sqlite3.Error:
+                    pass
+
+class ColumnProfileWorker(QObject):
+    """Запускає ColumnProfiler у фоновому потоці"""
+    progress = pyqtSignal(str)
+    done = pyqtSignal(list)      # рядки профілю
+    failed = pyqtSignal(str)
+
+    def __init__(self, connections, db_path, info, cache=None, authorizer=None):
+        super().__init__()
+        self.connections = connections
+        self.db_path = db_path
+        self.info = info
+        self.authorizer = authorizer
+        self.profiler = ColumnProfiler(cache)
+
+    @pyqtSlot()
+    def run(self):
+        conn = None
+        try:
+            conn = self.connections.acquire(self.db_path, readonly=True, authorizer=self.authorizer)
+            self.done.emit(self.profiler.profile(conn, self.db_path, self.info, self.progress.emit))
+        except Exception as e:
+            self.failed.emit("Профілювання скасовано" if self.profiler.cancelled else str(e))
+        finally:
+            if conn is not None:
+                self.connections.release(conn)
+
+    def cancel(self):
+        """Called from the GUI thread"""
+        self.profiler.cancel()
+
+class ColumnProfileDialog(QDialog):
+    """Статистика стовпців таблиці; для великих таблиць - наближена (≈)"""
+
+    def __init__(self, connections, db_path, info, cache=None, authorizer=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Профіль стовпців: {info.name}")
+        self.resize(900, 350)
+        layout = QVBoxLayout(self)
+        self.status_label = QLabel("Профілювання...")
+        layout.addWidget(self.status_label)
+        self.model = ResultTableModel(self)
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.verticalHeader().setVisible(False)
+        layout.addWidget(self.view)
+        self.started = time.perf_counter()
+
+        self.worker = ColumnProfileWorker(connections, db_path, info, cache, authorizer)
+        self.thread = QThread(self)
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+        self.worker.progress.connect(self.status_label.setText)
+        self.worker.done.connect(self.on_done)
+        self.worker.failed.connect(lambda message: self.status_label.setText(f"❌ {message}"))
+        self.worker.done.connect(self.thread.quit)
+        self.worker.failed.connect(self.thread.quit)
+        self.thread.start()
+
+    def on_done(self, rows):
+        self.model.set_result(ColumnProfiler.COLUMNS, rows)
+        self.view.resizeColumnsToContents()
+        method = rows[0][-1] if rows else ""
+        self.status_label.setText(f"Готово за {time.perf_counter() - self.started:.2f} с · метод: {method}"
+                                  + (" · ≈ - наближені значення" if method not in ("", "точно") else ""))
+
+    def closeEvent(self, event):
+        self.worker.cancel()
+        self.thread.quit()
+        self.thread.wait(2000)
+        super().closeEvent(event)
+
+class EditableTableModel(ResultTableModel):
+    """Сторінка TableBrowser з редагуванням: зміни накопичуються в ChangeSet до збереження.
+
+    Нові рядки показуються після рядків сторінки; представлення (без ключа) лише для читання.
+    """
+    DIRTY_COLOR = QColor(255, 240, 170)
+    INSERTED_COLOR = QColor(205, 240, 205)
+    DELETED_COLOR = QColor(240, 200, 200)
+    changes_changed = pyqtSignal(int)   # кількість незбережених змін
+
+    def __init__(self, browser, parent=None):
+        super().__init__(parent)
+        self.changes = ChangeSet(browser) if browser.has_key else None
+
+    @property
+    def editable(self):
+        return self.changes is not None
+
+    def inserted_count(self):
+        return len(self.changes.inserts) if self.changes is not None else 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows) + self.inserted_count()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or self.changes is None:
+            return super().data(index, role)
+        column = self.columns[index.column()]
+        if index.row() >= len(self.rows):
+            values = self.changes.inserts[index.row() - len(self.rows)]
+            if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+                value = values.get(column)
+                return "" if value is None else str(value)
+            if role == Qt.ItemDataRole.BackgroundRole:
+                return self.INSERTED_COLOR
+            return None
+        row = self.rows[index.row()]
+        if role == Qt.ItemDataRole.EditRole:
+            value = self.changes.value(row, column)
+            return "" if value is None else str(value)
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.cell_text(self.changes.value(row, column))
+        if role in (Qt.ItemDataRole.ForegroundRole, Qt.ItemDataRole.FontRole):
+            return self.null_style(role, self.changes.value(row, column))
+        if role == Qt.ItemDataRole.BackgroundRole:
+            if self.changes.is_deleted(row):
+                return self.DELETED_COLOR
+            if self.changes.is_dirty(row, column):
+                return self.DIRTY_COLOR
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if self.changes is not None and index.isValid() and not (
+                index.row() < len(self.rows) and self.changes.is_deleted(self.rows[index.row()])):
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or not index.isValid() or not (self.flags(index) & Qt.ItemFlag.ItemIsEditable):
+            return False
+        column = self.columns[index.column()]
+        if index.row() >= len(self.rows):
+            current = self.changes.inserts[index.row() - len(self.rows)].get(column)
+        else:
+            current = self.changes.value(self.rows[index.row()], column)
+        # Редактор показує NULL порожнім: незмінений порожній текст лишає NULL, а не пише ""
+        value = None if value == "" and current is None else editor_value(value, self.changes.types.get(column))
+        if index.row() >= len(self.rows):
+            self.changes.set_insert_value(index.row() - len(self.rows), column, value)
+        else:
+            self.changes.set_value(self.rows[index.row()], column, value)
+        self.dataChanged.emit(index, index)
+        self.changes_changed.emit(len(self.changes))
+        return True
+
+    def add_row(self):
+        """Порожній новий рядок у кінці; повертає його номер"""
+        row = self.rowCount()
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.changes.add_row()
+        self.endInsertRows()
+        self.changes_changed.emit(len(self.changes))
+        return row
+
+    def toggle_delete(self, rows):
+        """Позначає рядки сторінки на видалення (повторно - знімає позначку); нові рядки просто прибирає"""
+        for row in sorted(rows, reverse=True):
+            if row >= len(self.rows):
+                self.beginRemoveRows(QModelIndex(), row, row)
+                self.changes.remove_insert(row - len(self.rows))
+                self.endRemoveRows()
+            else:
+                self.changes.toggle_delete(self.rows[row])
+                self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+        self.changes_changed.emit(len(self.changes))
+
+    def discard_changes(self):
+        self.beginResetModel()
+        self.changes.clear()
+        self.endResetModel()
+        self.changes_changed.emit(0)
+
+class ChangeSetWorker(QObject):
+    """Записує ChangeSet однією транзакцією у фоновому потоці"""
+    done = pyqtSignal(int)            # змінено рядків
+    conflict = pyqtSignal(str)
+    failed = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, connections, db_path, changes, authorizer=None):
+        super().__init__()
+        self.connections = connections
+        self.db_path = db_path
+        self.changes = changes
+        self.authorizer = authorizer
+        self.cancelled = False
+        self.conn = None
+        self._conn_lock = threading.Lock()
+
+    @pyqtSlot()
+    def run(self):
+        conn = None
+        try:
+            conn = self.connections.acquire(self.db_path, readonly=False, authorizer=self.authorizer)
+            with self._conn_lock:
+                self.conn = conn
+            self.done.emit(self.changes.apply(conn, lambda: self.cancelled))
+        except ChangeConflict as e:
+            self.conflict.emit(str(e))
+        except Exception as e:
+            if self.cancelled:
+                self.failed.emit("Збереження скасовано, нічого не записано")
+            else:
+                self.failed.emit("У вас немає прав на ці зміни" if is_authorization_error(str(e)) else str(e))
+        finally:
+            with self._conn_lock:
+                self.conn = None
+            if conn is not None:
+                self.connections.release(conn)
+            self.finished.emit()
+
+    def cancel(self):
+        """Можна викликати з GUI-потоку: запис переривається, транзакція відкочується цілком"""
+        self.cancelled = True
+        with self._conn_lock:
+            if self.conn is not None:
+                try:
+                    self.conn.interrupt()
+                except sqlite3.Error:
+                    pass
+
+class TableBrowserPanel(QWidget):
+    """Вкладка перегляду таблиці: сторінки, сортування за кліком на заголовку, фільтри з контекстного меню.
+
+    Комірки редагуються прямо в таблиці; зміни зберігаються кнопкою «Зберегти» однією транзакцією.
+    """
+    source_changed = pyqtSignal(dict)
+
+    def __init__(self, connections, db_path, browser, authorizer=None, cache=None, parent=None):
+        super().__init__(parent)
+        self.connections = connections
+        self.db_path = db_path
+        self.browser = browser
+        self.authorizer = authorizer
+        self.cache = cache
+        self.profile_dialog = None
+        self.pages = 1
+        self.at_end = False
+        self.run_id = 0
+        self.started = 0.0
+        self.worker = None
+        self.thread = None
+        self.notice = ""          # результат збереження - показується після перезавантаження сторінки
+        self.reload_page = False
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        nav = QHBoxLayout()
+        self.first_button = QPushButton("⏮")
+        self.first_button.clicked.connect(lambda: self.load("first"))
+        self.previous_button = QPushButton("◀")
+        self.previous_button.clicked.connect(lambda: self.load("previous"))
+        self.page_spin = QSpinBox()
+        self.page_spin.setMinimum(1)
+        self.page_spin.setKeyboardTracking(False)
+        self.page_spin.editingFinished.connect(self.jump_to_page)
+        self.pages_label = QLabel("")
+        self.next_button = QPushButton("▶")
+        self.next_button.clicked.connect(lambda: self.load("next"))
+        self.last_button = QPushButton("⏭")
+        self.last_button.clicked.connect(lambda: self.load("last"))
+        self.nav_buttons = (self.first_button, self.previous_button, self.next_button, self.last_button)
+        for widget in (self.first_button, self.previous_button, QLabel("Сторінка"), self.page_spin,
+                       self.pages_label, self.next_button, self.last_button):
+            nav.addWidget(widget)
+        self.filters_label = QLabel("")
+        nav.addWidget(self.filters_label, 1)
+        self.clear_filters_button = QPushButton("Скинути фільтри")
+        self.clear_filters_button.clicked.connect(self.clear_filters)
+        self.clear_filters_button.setVisible(False)
+        nav.addWidget(self.clear_filters_button)
+        self.profile_button = QPushButton("📊 Профіль стовпців")
+        self.profile_button.setToolTip("Частка NULL, кількість різних значень, мін/макс і часті значення")
+        self.profile_button.clicked.connect(self.show_column_profile)
+        nav.addWidget(self.profile_button)
+        layout.addLayout(nav)
+
+        edit = QHBoxLayout()
+        self.add_row_button = QPushButton("➕ Новий рядок")
+        self.add_row_button.clicked.connect(self.add_row)
+        self.delete_rows_button = QPushButton("🗑 Видалити")
+        self.delete_rows_button.setToolTip("Позначити вибрані рядки на видалення (повторно - зняти позначку)")
+        self.delete_rows_button.clicked.connect(self.delete_selected_rows)
+        self.save_button = QPushButton("💾 Зберегти")
+        self.save_button.setToolTip("Записати всі зміни однією транзакцією")
+        self.save_button.clicked.connect(self.save_changes)
+        self.discard_button = QPushButton("↩ Скасувати зміни")
+        self.discard_button.clicked.connect(self.discard_changes)
+        self.edit_buttons = (self.add_row_button, self.delete_rows_button, self.save_button, self.discard_button)
+        for button in self.edit_buttons:
+            edit.addWidget(button)
+        self.changes_label = QLabel("")
+        edit.addWidget(self.changes_label, 1)
+        layout.addLayout(edit)
+
+        self.model = EditableTableModel(browser, self)
+        self.model.changes_changed.connect(self.on_changes_changed)
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.verticalHeader().setVisible(False)
+        self.view.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        header = self.view.horizontalHeader()
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(False)
+        header.sectionClicked.connect(self.on_header_clicked)
+        header.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        header.customContextMenuRequested.connect(self.edit_filter)
+        header.setToolTip("Клік - сортування, права кнопка - фільтр")
+        layout.addWidget(self.view)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+        if not self.model.editable:
+            for button in self.edit_buttons:
+                button.setVisible(False)
+            self.changes_label.setText("Представлення доступне лише для читання")
+        self.on_changes_changed(0)
+        self.load("first")
+
+    def source(self):
+        """Звідки отримано вміст вкладки - для експорту всіх сторінок"""
+        sql = self.browser.export_sql()
+        return {"db_path": self.db_path, "query": sql, "statements": [sql], "count": 1}
+
+    def load(self, action, *args):
+        if self.thread is not None:
+            return
+        self.run_id += 1
+        self.set_busy(True)
+        self.started = time.perf_counter()
+        worker = BrowseWorker(self.run_id, self.connections, self.db_path, self.browser, action, args,
+                              self.authorizer)
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.page_ready.connect(self.on_page)
+        worker.failed.connect(self.on_failed)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(self.on_thread_finished)
+        self.worker, self.thread = worker, thread
+        thread.start()
+
+    def on_page(self, run_id, rows, pages):
+        if run_id != self.run_id:
+            return
+        if not rows and pages < 0 and self.model.rowCount():
+            # За останньою сторінкою рядків немає - лишаємо її на екрані
+            self.at_end = True
+            return
+        self.at_end = len(rows) < self.browser.page_size
+        if pages > 0:
+            self.pages = pages
+        self.pages = max(self.pages, self.browser.page)
+        self.model.set_result(self.browser.columns, rows)
+        self.page_spin.blockSignals(True)
+        self.page_spin.setMaximum(self.pages)
+        self.page_spin.setValue(max(1, self.browser.page))
+        self.page_spin.blockSignals(False)
+        exact = self.browser.filters or not self.browser.uses_rowid
+        self.pages_label.setText(f"з {'' if exact else '≈'}{self.pages}")
+        self.status_label.setText(
+            f"{self.notice}Рядків на сторінці: {len(rows)} · {(time.perf_counter() - self.started) * 1000:.1f} мс")
+        self.notice = ""
+
+    def on_failed(self, run_id, message):
+        if run_id == self.run_id:
+            self.status_label.setText(f"❌ Помилка: {message}")
+
+    def on_thread_finished(self):
+        self.worker = None
+        self.thread = None
+        self.set_busy(False)
+        if self.reload_page:
+            # Після збереження перечитуємо поточну сторінку - з новими значеннями та rowid
+            self.reload_page = False
+            self.load("jump", max(1, self.browser.page))
+
+    def set_busy(self, busy):
+        for button in self.nav_buttons:
+            button.setEnabled(not busy)
+        self.page_spin.setEnabled(not busy)
+        self.view.setEditTriggers(QTableView.EditTrigger.NoEditTriggers if busy
+                                  else QTableView.EditTrigger.DoubleClicked | QTableView.EditTrigger.EditKeyPressed
+                                  | QTableView.EditTrigger.AnyKeyPressed)
+        if not busy:
+            self.previous_button.setEnabled(self.browser.page > 1)
+            self.next_button.setEnabled(not self.at_end)
+        self.on_changes_changed(len(self.model.changes) if self.model.editable else 0)
+
+    def on_changes_changed(self, count):
+        if not self.model.editable:
+            return
+        idle = self.thread is None
+        self.add_row_button.setEnabled(idle)
+        self.delete_rows_button.setEnabled(idle)
+        self.save_button.setEnabled(idle and count > 0)
+        self.discard_button.setEnabled(idle and count > 0)
+        self.save_button.setText(f"💾 Зберегти ({count})" if count else "💾 Зберегти")
+        self.changes_label.setText(f"Незбережених змін: {count}" if count else
+                                   "Подвійний клік - редагувати комірку; порожнє значення у числовому стовпці - NULL")
+
+    def has_unsaved_changes(self):
+        return self.model.editable and len(self.model.changes) > 0
+
+    def add_row(self):
+        row = self.model.add_row()
+        index = self.model.index(row, 0)
+        self.view.scrollTo(index)
+        self.view.setCurrentIndex(index)
+        self.view.edit(index)
+
+    def delete_selected_rows(self):
+        rows = {index.row() for index in self.view.selectionModel().selectedIndexes()}
+        if rows:
+            self.model.toggle_delete(rows)
+
+    def discard_changes(self):
+        if self.thread is None:
+            self.model.discard_changes()
+
+    def save_changes(self):
+        """Усі зміни - одна транзакція; однакові за формою інструкції виконуються одним executemany"""
+        if self.thread is not None or not self.has_unsaved_changes():
+            return
+        count = len(self.model.changes)
+        self.run_id += 1
+        self.started = time.perf_counter()
+        self.set_busy(True)
+        self.status_label.setText("Збереження...")
+        worker = ChangeSetWorker(self.connections, self.db_path, self.model.changes, self.authorizer)
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.done.connect(lambda changed: self.on_saved(count, changed))
+        worker.conflict.connect(lambda message: self.status_label.setText(
+            f"⚠️ {message}. Нічого не збережено: перегляньте сторінку або скасуйте зміни"))
+        worker.failed.connect(lambda message: self.status_label.setText(f"❌ Помилка збереження: {message}"))
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(self.on_thread_finished)
+        self.worker, self.thread = worker, thread
+        thread.start()
+
+    def on_saved(self, count, changed):
+        self.notice = (f"✅ Збережено змін: {count} (рядків: {changed}) за "
+                       f"{(time.perf_counter() - self.started) * 1000:.1f} мс · ")
+        self.reload_page = True
+        self.model.discard_changes()
+
+    def jump_to_page(self):
+        if self.page_spin.value() != self.browser.page:
+            self.load("jump", self.page_spin.value())
+
+    def on_header_clicked(self, section):
+        """Без сортування -> за зростанням -> за спаданням -> без сортування"""
+        if self.thread is not None:
+            return
+        column = self.browser.columns[section]
+        header = self.view.horizontalHeader()
+        if self.browser.sort is None or self.browser.sort[0] != column:
+            self.browser.set_sort(column, False)
+            header.setSortIndicator(section, Qt.SortOrder.AscendingOrder)
+        elif not self.browser.sort[1]:
+            self.browser.set_sort(column, True)
+            header.setSortIndicator(section, Qt.SortOrder.DescendingOrder)
+        else:
+            self.browser.set_sort(None)
+        header.setSortIndicatorShown(self.browser.sort is not None)
+        self.reload()
+
+    def edit_filter(self, pos):
+        from PyQt6.QtWidgets import QInputDialog
+        if self.thread is not None:
+            return
+        section = self.view.horizontalHeader().logicalIndexAt(pos)
+        if section < 0:
+            return
+        column = self.browser.columns[section]
+        operator, value = self.browser.filters.get(column, ("", None))
+        current = "" if not operator else ("NULL" if operator == "IS NULL" else "!NULL" if value is None
+                                           else value if operator == "LIKE" else f"{operator}{value}")
+        text, ok = QInputDialog.getText(
+            self, "Фільтр", f"Фільтр для «{column}»:\n"
+            "текст - містить; =, !=, <, >, <=, >= - порівняння; NULL, !NULL; порожньо - без фільтра", text=current)
+        if ok:
+            self.browser.set_filter(column, text)
+            self.reload()
+
+    def clear_filters(self):
+        if self.thread is None:
+            self.browser.clear_filters()
+            self.reload()
+
+    def reload(self):
+        filters = self.browser.describe_filters()
+        self.filters_label.setText(f"Фільтри: {filters}" if filters else "")
+        self.clear_filters_button.setVisible(bool(filters))
+        self.source_changed.emit(self.source())
+        self.load("first")
+
+    def show_column_profile(self):
+        if self.profile_dialog is not None:
+            self.profile_dialog.close()
+        self.profile_dialog = ColumnProfileDialog(self.connections, self.db_path, self.browser.info, self.cache,
+                                                  self.authorizer, self)
+        self.profile_dialog.show()
+
+    def stop(self):
+        """Перериває завантаження сторінки перед закриттям вкладки"""
+        if self.profile_dialog is not None:
+            self.profile_dialog.close()
+        self.run_id += 1
+        if self.thread is not None:
+            self.worker.cancel()
+            self.thread.quit()
+            self.thread.wait(2000)
+
+class ChartWorker(QObject):
+    """Готує дані графіка в SQLite у фоновому потоці"""
+    done = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+    def __init__(self, connections, db_path, statement, options, authorizer=None):
+        super().__init__()
+        self.connections = connections
+        self.db_path = db_path
+        self.statement = statement
+        self.options = options
+        self.authorizer = authorizer
+        self.conn = None
+        self.cancelled = False
+        self._conn_lock = threading.Lock()
+
+    @pyqtSlot()
+    def run(self):
+        conn = None
+        options = self.options
+        try:
+            conn = self.connections.acquire(self.db_path, readonly=True, authorizer=self.authorizer)
+            with self._conn_lock:
+                self.conn = conn
+            started = time.perf_counter()
+            if options["kind"] == "line":
+                points, info = chart_line(conn, self.statement, options["x"], options["y"], options["width"])
+                result = dict(info, points=points)
+            else:
+                categories, truncated = chart_categories(conn, self.statement, options["x"], options["y"],
+                                                         options["function"])
+                result = {"categories": categories, "truncated": truncated}
+            result["seconds"] = time.perf_counter() - started
+            self.done.emit(result)
+        except Exception as e:
+            self.failed.emit("Побудову графіка скасовано" if self.cancelled else str(e))
+        finally:
+            with self._conn_lock:
+                self.conn = None
+            if conn is not None:
+                self.connections.release(conn)
+
+    def cancel(self):
+        """Called from the GUI thread"""
+        self.cancelled = True
+        with self._conn_lock:
+            if self.conn is not None:
+                try:
+                    self.conn.interrupt()
+                except sqlite3.Error:
+                    pass
+
+class ChartDialog(QDialog):
+    """Графік результату запиту: групування виконує SQLite, лінія проріджується до ширини графіка"""
+    KINDS = (("Стовпчики", "bar"), ("Кругова", "pie"), ("Лінія", "line"))
+
+    def __init__(self, connections, db_path, statement, columns, authorizer=None, parent=None):
+        super().__init__(parent)
+        from PyQt6.QtCharts import QChartView
+        from PyQt6.QtGui import QPainter
+        self.connections = connections
+        self.db_path = db_path
+        self.statement = statement
+        self.authorizer = authorizer
+        self.worker = None
+        self.thread = None
+        self.setWindowTitle("Графік")
+        self.resize(900, 600)
+        layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        self.kind_combo = QComboBox()
+        for title, kind in self.KINDS:
+            self.kind_combo.addItem(title, kind)
+        self.kind_combo.currentIndexChanged.connect(self.update_controls)
+        self.x_combo = QComboBox()
+        self.x_combo.addItems(columns)
+        self.function_combo = QComboBox()
+        self.function_combo.addItems(CHART_FUNCTIONS)
+        self.function_combo.currentIndexChanged.connect(self.update_controls)
+        self.y_combo = QComboBox()
+        self.y_combo.addItems(columns)
+        if len(columns) > 1:
+            self.y_combo.setCurrentIndex(1)
+        self.draw_button = QPushButton("Побудувати")
+        self.draw_button.clicked.connect(self.draw)
+        for label, widget in (("Тип:", self.kind_combo), ("X:", self.x_combo), ("Функція:", self.function_combo),
+                              ("Y:", self.y_combo)):
+            controls.addWidget(QLabel(label))
+            controls.addWidget(widget)
+        controls.addWidget(self.draw_button)
+        controls.addStretch(1)
+        layout.addLayout(controls)
+
+        self.chart_view = QChartView()
+        self.chart_view.setRenderHint(QPainter.RenderHint.Antialiasing)
+        layout.addWidget(self.chart_view, 1)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+        self.update_controls()
+
+    def update_controls(self):
+        line = self.kind_combo.currentData() == "line"
+        self.function_combo.setEnabled(not line)
+        # COUNT рахує рядки групи - стовпець Y не потрібен
+        self.y_combo.setEnabled(line or self.function_combo.currentText() != "COUNT")
+
+    def draw(self):
+        if self.thread is not None:
+            return
+        kind = self.kind_combo.currentData()
+        function = self.function_combo.currentText()
+        options = {"kind": kind, "x": self.x_combo.currentText(), "function": function,
+                   "y": None if kind != "line" and function == "COUNT" else self.y_combo.currentText(),
+                   "width": max(200, self.chart_view.width())}
+        self.status_label.setText("Обчислення в SQLite...")
+        self.draw_button.setEnabled(False)
+        worker = ChartWorker(self.connections, self.db_path, self.statement, options, self.authorizer)
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.done.connect(lambda result: self.show_chart(options, result))
+        worker.failed.connect(lambda message: self.status_label.setText(f"❌ {message}"))
+        worker.done.connect(thread.quit)
+        worker.failed.connect(thread.quit)
+        thread.finished.connect(self.on_thread_finished)
+        self.worker, self.thread = worker, thread
+        thread.start()
+
+    def on_thread_finished(self):
+        self.worker = None
+        self.thread = None
+        self.draw_button.setEnabled(True)
+
+    def show_chart(self, options, result):
+        from PyQt6.QtCharts import (QChart, QBarSeries, QBarSet, QBarCategoryAxis, QValueAxis, QPieSeries,
+                                    QLineSeries, QDateTimeAxis)
+        from PyQt6.QtCore import QPointF
+        chart = QChart()
+        value_title = (f"{options['function']}({options['y']})" if options["y"] else "COUNT(*)")
+        if options["kind"] == "line":
+            series = QLineSeries()
+            series.setName(options["y"])
+            # replace() передає всі точки одним викликом
+            series.replace([QPointF(x, y) for x, y in result["points"]])
+            chart.addSeries(series)
+            x_axis = QDateTimeAxis() if result["is_time"] else QValueAxis()
+            if result["is_time"]:
+                x_axis.setFormat("yyyy-MM-dd")
+            chart.addAxis(x_axis, Qt.AlignmentFlag.AlignBottom)
+            y_axis = QValueAxis()
+            chart.addAxis(y_axis, Qt.AlignmentFlag.AlignLeft)
+            series.attachAxis(x_axis)
+            series.attachAxis(y_axis)
+            chart.legend().setVisible(False)
+            details = f"рядків: {result['rows']}, точок на графіку: {len(result['points'])}"
+            if result["buckets"]:
+                details += f" (групування в {result['buckets']} кошиків і LTTB)"
+        elif options["kind"] == "pie":
+            series = QPieSeries()
+            for label, value in result["categories"]:
+                if isinstance(value, (int, float)) and value > 0:
+                    series.append(str(label), float(value))
+            chart.addSeries(series)
+            chart.setTitle(value_title)
+            details = f"категорій: {len(result['categories'])}"
+        else:
+            bar_set = QBarSet(value_title)
+            labels = []
+            for label, value in result["categories"]:
+                bar_set.append(float(value) if isinstance(value, (int, float)) else 0.0)
+                labels.append(str(label))
+            series = QBarSeries()
+            series.append(bar_set)
+            chart.addSeries(series)
+            x_axis = QBarCategoryAxis()
+            x_axis.append(labels)
+            chart.addAxis(x_axis, Qt.AlignmentFlag.AlignBottom)
+            y_axis = QValueAxis()
+            chart.addAxis(y_axis, Qt.AlignmentFlag.AlignLeft)
+            series.attachAxis(x_axis)
+            series.attachAxis(y_axis)
+            details = f"категорій: {len(result['categories'])}"
+        if options["kind"] != "line" and result["truncated"]:
+            details += " (показано найбільші)"
+        self.chart_view.setChart(chart)
+        self.status_label.setText(f"✅ {details} · {result['seconds']:.2f} с")
+
+    def closeEvent(self, event):
+        if self.thread is not None:
+            self.worker.cancel()
+            self.thread.quit()
+            self.thread.wait(2000)
+        super().closeEvent(event)
+
+class ImportDialog(QDialog):
+    """Імпорт CSV/TSV/JSON lines у нову або наявну таблицю: відповідність полів, типи та прогрес"""
+    imported = pyqtSignal(str, int)   # таблиця, кількість рядків
+    starting = pyqtSignal()           # перед початком запису в базу
+    SKIP = "— пропустити —"
+
+    def __init__(self, connections, db_path, source, catalog, check_permissions, authorizer=None, parent=None):
+        super().__init__(parent)
+        self.connections = connections
+        self.db_path = db_path
+        self.source = source
+        self.catalog = catalog
+        self.check_permissions = check_permissions
+        self.authorizer = authorizer
+        self.worker = None
+        self.thread = None
+        self.timer = QElapsedTimer()
+        self.declared = {}   # стовпці наявної таблиці -> оголошений тип
+        self.setWindowTitle("Імпорт даних")
+        self.resize(800, 500)
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(
+            f"Файл: {os.path.basename(source.filename)} · {source.format.upper()} · "
+            f"{source.size / 1048576:.1f} МБ · полів: {len(source.fields)}"))
+
+        table_layout = QHBoxLayout()
+        table_layout.addWidget(QLabel("Таблиця:"))
+        self.table_combo = QComboBox()
+        self.table_combo.setEditable(True)
+        self.table_combo.setToolTip("Наявна таблиця або назва нової")
+        self.load_tables()
+        self.table_combo.setCurrentText(import_column_name(os.path.splitext(os.path.basename(source.filename))[0], 0))
+        self.table_combo.currentTextChanged.connect(self.update_mapping)
+        table_layout.addWidget(self.table_combo, 1)
+        self.mode_label = QLabel("")
+        table_layout.addWidget(self.mode_label)
+        layout.addLayout(table_layout)
+
+        self.mapping = QTableWidget(len(source.fields), 4)
+        self.mapping.setHorizontalHeaderLabels(["Поле файлу", "Приклад", "Стовпець таблиці", "Тип"])
+        self.mapping.verticalHeader().setVisible(False)
+        for row, field in enumerate(source.fields):
+            sample = next((r[row] for r in source.sample if r[row] not in (None, "")), "")
+            for column, text in ((0, field), (1, str(sample)[:60])):
+                item = QTableWidgetItem(text)
+                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+                self.mapping.setItem(row, column, item)
+            target = QComboBox()
+            target.currentTextChanged.connect(lambda text, row=row: self.on_target_changed(row, text))
+            self.mapping.setCellWidget(row, 2, target)
+            type_combo = QComboBox()
+            type_combo.addItems(IMPORT_TYPES)
+            self.mapping.setCellWidget(row, 3, type_combo)
+        layout.addWidget(self.mapping, 1)
+
+        self.defer_check = QCheckBox("Створити індекси таблиці після вставки")
+        self.defer_check.setToolTip("Звичайні індекси видаляються на час імпорту й будуються один раз наприкінці; UNIQUE-індекси лишаються")
+        self.defer_check.setChecked(True)
+        layout.addWidget(self.defer_check)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+        buttons = QHBoxLayout()
+        self.import_button = QPushButton("📥 Імпортувати")
+        self.import_button.clicked.connect(self.start)
+        buttons.addWidget(self.import_button)
+        self.cancel_button = QPushButton("⏹ Скасувати")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel)
+        buttons.addWidget(self.cancel_button)
+        buttons.addStretch(1)
+        layout.addLayout(buttons)
+        self.update_mapping()
+
+    def load_tables(self):
+        text = self.table_combo.currentText()
+        self.tables = [name for kind, name, _ in self.catalog.objects(self.db_path)[1] if kind == "table"]
+        self.table_combo.blockSignals(True)
+        self.table_combo.clear()
+        self.table_combo.addItems(self.tables)
+        self.table_combo.setCurrentText(text)
+        self.table_combo.blockSignals(False)
+
+    def target_info(self):
+        """TableInfo наявної таблиці або None для нової"""
+        name = self.table_combo.currentText().strip()
+        match = next((t for t in self.tables if t.lower() == name.lower()), None)
+        return self.catalog.table(self.db_path, match) if match else None
+
+    def update_mapping(self):
+        """Наявна таблиця: поля зіставляються зі стовпцями за назвою; нова - стовпці з типами за вибіркою"""
+        info = self.target_info()
+        self.mode_label.setText("додавання до наявної таблиці" if info else "буде створено нову таблицю")
+        self.declared = {name: col_type or "" for _, name, col_type, _, _, _ in info.columns} if info else {}
+        by_lower = {name.lower(): name for name in self.declared}
+        for row, field in enumerate(self.source.fields):
+            target = self.mapping.cellWidget(row, 2)
+            type_combo = self.mapping.cellWidget(row, 3)
+            target.blockSignals(True)
+            target.clear()
+            target.setEditable(info is None)
+            if info is None:
+                target.addItems([field, self.SKIP])
+                type_combo.setCurrentText(self.source.types[row])
+            else:
+                target.addItems([self.SKIP] + list(self.declared))
+                target.setCurrentText(by_lower.get(field.lower(), self.SKIP))
+                type_combo.setCurrentText(self.declared_type(target.currentText()))
+            target.blockSignals(False)
+            type_combo.setEnabled(info is None)
+
+    def on_target_changed(self, row, column):
+        # Тип стовпця задає наявна таблиця; він визначає лише, чи стає порожнє значення NULL
+        if self.declared:
+            self.mapping.cellWidget(row, 3).setCurrentText(self.declared_type(column))
+
+    def declared_type(self, column):
+        upper = self.declared.get(column, "").upper()
+        if "INT" in upper:
+            return "INTEGER"
+        if any(word in upper for word in ("REAL", "FLOA", "DOUB", "NUM", "DEC")):
+            return "REAL"
+        return "BLOB" if not upper or "BLOB" in upper else "TEXT"
+
+    def selected_columns(self):
+        columns = []
+        for row in range(len(self.source.fields)):
+            name = self.mapping.cellWidget(row, 2).currentText().strip()
+            if name and name != self.SKIP:
+                columns.append((row, name, self.mapping.cellWidget(row, 3).currentText()))
+        names = [name.lower() for _, name, _ in columns]
+        if not columns:
+            raise ValueError("Не вибрано жодного стовпця")
+        if len(set(names)) != len(names):
+            raise ValueError("Кілька полів зіставлено з одним стовпцем")
+        return columns
+
+    def start(self):
+        if self.thread is not None:
+            return
+        table = self.table_combo.currentText().strip()
+        info = self.target_info()
+        try:
+            if not table:
+                raise ValueError("Вкажіть назву таблиці")
+            columns = self.selected_columns()
+        except ValueError as e:
+            self.status_label.setText(f"❌ {e}")
+            return
+        bulk_import = BulkImport(self.connections, self.db_path, self.source, info.name if info else table,
+                                 columns, create=info is None, authorizer=self.authorizer,
+                                 defer_indexes=self.defer_check.isChecked())
+        if not self.check_permissions(";\n".join(bulk_import.statements())):
+            self.status_label.setText("❌ У вас немає прав на " +
+                                      ("створення таблиці" if info is None else "додавання рядків у цю таблицю"))
+            return
+        self.starting.emit()
+        self.set_running(True)
+        self.status_label.setText("Імпорт...")
+        self.timer.start()
+        worker = ImportWorker(bulk_import)
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(self.on_progress)
+        worker.done.connect(lambda rows: self.on_done(bulk_import.table, rows))
+        worker.failed.connect(lambda message: self.status_label.setText(f"❌ {message}"))
+        worker.done.connect(thread.quit)
+        worker.failed.connect(thread.quit)
+        thread.finished.connect(self.on_thread_finished)
+        self.worker, self.thread = worker, thread
+        thread.start()
+
+    def set_running(self, running):
+        self.import_button.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+        self.table_combo.setEnabled(not running)
+        self.mapping.setEnabled(not running)
+        self.progress_bar.setVisible(running)
+        self.progress_bar.setValue(0)
+
+    def on_progress(self, rows, fraction, stage):
+        self.progress_bar.setValue(int(fraction * 1000))
+        if stage:
+            self.status_label.setText(stage)
+        else:
+            rate = rows / max(self.timer.elapsed() / 1000, 0.001)
+            self.status_label.setText(f"Імпортовано рядків: {rows:,} · {rate:,.0f} рядків/с")
+
+    def on_done(self, table, rows):
+        self.status_label.setText(
+            f"✅ Імпортовано рядків: {rows:,} у таблицю {table} за {self.timer.elapsed() / 1000:.1f} с")
+        self.imported.emit(table, rows)
+        self.load_tables()
+        self.update_mapping()
+
+    def on_thread_finished(self):
+        self.worker = None
+        self.thread = None
+        self.set_running(False)
+
+    def cancel(self):
+        if self.worker is not None:
+            self.worker.cancel()
+
+    def closeEvent(self, event):
+        if self.thread is not None:
+            self.worker.cancel()
+            self.thread.quit()
+            self.thread.wait(2000)
+        super().closeEvent(event)
+
 class SQLApp(QWidget):
     def __init__(self, user_id=None, user_role=None):
         super().__init__()
         self.user_id = user_id
         self.user_role = user_role
+        # Права завантажуються один раз при вході; перевіряє їх SQLite через set_authorizer
+        self.permissions = None
+        if self.user_id and self.user_role != "admin":
+            try:
+                self.permissions = PermissionSet.load(self.user_id)
+            except sqlite3.Error as e:
+                print(f"Помилка завантаження прав доступу: {e}")
         
         # === Window configuration ===
         self.setWindowTitle("SQL Viewer")
@@ -116,10 +1939,36 @@ class SQLApp(QWidget):
         # === Instance variables ===
         self.db_path = os.path.join(os.path.dirname(__file__), "project_management.db")
         self.pdf_export_path = os.path.expanduser("~/Documents")
-        self.history = []
         self.favorites = []  # Change this to a dictionary to store both name and query
         self.favorites_data = {}  # Will store queries with their names as keys
         self.history_file = f"user_history_{self.user_id}.json" if self.user_id else "guest_history.json"
+        self.history_store = HistoryStore()
+        self.history_model = HistoryListModel(self.history_store, self.user_id)
+        self.connections = ConnectionManager()
+        self.catalog = SchemaCatalog(self.connections)
+        # Повторне відкриття закріпленого запиту чи таблиці без змін у базі не виконує запит знову
+        import tempfile
+        self.result_cache = ResultCache(
+            spill_dir=os.path.join(tempfile.gettempdir(), f"sql_viewer_results_{os.getpid()}"))
+        self.schema_pruner = SchemaPruner()
+        self.ai_cache = AIResponseCache(os.path.join(os.path.dirname(__file__), "ai_cache.db"))
+        self.last_ai_question = None  # (питання, відбиток схеми) останньої генерації
+        self.ai_worker = None
+        self.ai_thread = None
+        self.ai_run_id = 0
+        self.ai_request = None  # (питання, відбиток схеми) запиту, що зараз генерується
+        self.query_worker = None
+        self.query_thread = None
+        self.query_run_id = 0
+        self.query_seconds = 0.0
+        self.running_source = None
+        self.result_source = None  # Звідки отримано поточний результат - для експорту
+        self.export_worker = None
+        self.export_thread = None
+        self.export_progress = None
+        self.advisor_dialog = None
+        self.chart_dialog = None
+        self.import_dialog = None
         
         # === UI initialization ===
         # Create main horizontal splitter
@@ -130,6 +1979,29 @@ class SQLApp(QWidget):
         sidebar_layout = QVBoxLayout(sidebar)
         sidebar_layout.setContentsMargins(0, 0, 0, 0)
         
+        # Схема бази: дерево з пошуком замість сітки кнопок таблиць
+        schema_group = QGroupBox("Схема бази даних")
+        schema_layout = QVBoxLayout()
+        self.schema_search = QLineEdit()
+        self.schema_search.setPlaceholderText("Пошук таблиць, індексів...")
+        self.schema_search.setClearButtonEnabled(True)
+        self.schema_search_timer = QTimer(self)
+        self.schema_search_timer.setSingleShot(True)
+        self.schema_search_timer.setInterval(150)
+        self.schema_search_timer.timeout.connect(self.filter_schema)
+        self.schema_search.textChanged.connect(self.schema_search_timer.start)
+        schema_layout.addWidget(self.schema_search)
+        self.schema_model = SchemaTreeModel(self.catalog, self)
+        self.schema_tree = QTreeView()
+        self.schema_tree.setModel(self.schema_model)
+        self.schema_tree.setHeaderHidden(True)
+        self.schema_tree.setUniformRowHeights(True)
+        self.schema_tree.setToolTip("Подвійний клік по таблиці чи представленню - відкрити")
+        self.schema_tree.activated.connect(self.on_schema_activated)
+        schema_layout.addWidget(self.schema_tree)
+        schema_group.setLayout(schema_layout)
+        sidebar_layout.addWidget(schema_group)
+
         # History section
         history_group = QGroupBox("Історія запитів")
         history_layout = QVBoxLayout()
@@ -147,8 +2019,22 @@ class SQLApp(QWidget):
         
         history_layout.addLayout(history_header_layout)
         
-        self.history_list = QListWidget()
-        self.history_list.itemClicked.connect(self.load_from_history)
+        self.history_search = QLineEdit()
+        self.history_search.setPlaceholderText("Пошук в історії...")
+        self.history_search.setClearButtonEnabled(True)
+        # Пошук запускається після короткої паузи у введенні
+        self.history_search_timer = QTimer(self)
+        self.history_search_timer.setSingleShot(True)
+        self.history_search_timer.setInterval(200)
+        self.history_search_timer.timeout.connect(
+            lambda: self.history_model.set_search(self.history_search.text().strip()))
+        self.history_search.textChanged.connect(self.history_search_timer.start)
+        history_layout.addWidget(self.history_search)
+
+        self.history_list = QListView()
+        self.history_list.setModel(self.history_model)
+        self.history_list.setUniformItemSizes(True)
+        self.history_list.clicked.connect(self.load_from_history)
         history_layout.addWidget(self.history_list)
         history_group.setLayout(history_layout)
         sidebar_layout.addWidget(history_group)
@@ -197,19 +2083,6 @@ class SQLApp(QWidget):
         
         layout.addLayout(db_layout)
 
-        # Tables access section with dropdown/grid for better handling of many tables
-        self.tables_label = QLabel("Таблиці бази даних:")
-        layout.addWidget(self.tables_label)
-        
-        # Create scrollable area for table buttons
-        tables_scroll_area = QScrollArea()
-        tables_scroll_area.setWidgetResizable(True)
-        tables_container = QWidget()
-        self.tables_grid = QGridLayout(tables_container)
-        tables_scroll_area.setWidget(tables_container)
-        tables_scroll_area.setMaximumHeight(120)  # Limit height
-        layout.addWidget(tables_scroll_area)
-
         # Поле для введення запиту з голосовим введенням
         query_layout = QHBoxLayout()
         self.query_label = QLabel("Введіть ваш запит:")
@@ -240,28 +2113,53 @@ class SQLApp(QWidget):
         self.ai_button.clicked.connect(self.ai_query)
         self.ai_button.setMinimumHeight(40)  # Робимо кнопку більшою
         main_buttons_layout.addWidget(self.ai_button)
+
+        # Повторна генерація в обхід кешу для останнього питання
+        self.ai_regenerate_button = QPushButton("♻")
+        self.ai_regenerate_button.setToolTip("Згенерувати заново (видалити відповідь з кешу)")
+        self.ai_regenerate_button.clicked.connect(self.regenerate_ai_query)
+        self.ai_regenerate_button.setMinimumHeight(40)
+        self.ai_regenerate_button.setEnabled(False)
+        main_buttons_layout.addWidget(self.ai_regenerate_button)
         
         # Кнопка виконання запиту - з новою назвою
         self.run_button = QPushButton("Виконати SQL запит")
         self.run_button.clicked.connect(self.execute_query)
         self.run_button.setMinimumHeight(40)  # Робимо кнопку більшою
         main_buttons_layout.addWidget(self.run_button)
+
+        # Кнопка скасування запиту, що виконується у фоні
+        self.cancel_button = QPushButton("⏹ Скасувати")
+        self.cancel_button.setToolTip("Перервати виконання запиту")
+        self.cancel_button.clicked.connect(self.cancel_query)
+        self.cancel_button.setMinimumHeight(40)
+        self.cancel_button.setEnabled(False)
+        main_buttons_layout.addWidget(self.cancel_button)
+
+        # План виконання та поради щодо індексів
+        self.explain_button = QPushButton("🔍 План запиту")
+        self.explain_button.setToolTip("Показати EXPLAIN QUERY PLAN і знайти повні сканування таблиць")
+        self.explain_button.clicked.connect(self.explain_query)
+        self.explain_button.setMinimumHeight(40)
+        main_buttons_layout.addWidget(self.explain_button)
+
+        self.advisor_button = QPushButton("💡 Індекси")
+        self.advisor_button.setToolTip("Запропонувати індекси за історією запитів до цієї бази")
+        self.advisor_button.clicked.connect(self.open_index_advisor)
+        self.advisor_button.setMinimumHeight(40)
+        main_buttons_layout.addWidget(self.advisor_button)
         
         layout.addLayout(main_buttons_layout)
 
-        # Додаткові кнопки для INSERT, DELETE, UPDATE
-        btn_layout = QHBoxLayout()
-        self.insert_button = QPushButton("Додати")
-        self.insert_button.clicked.connect(self.insert_row)
-        btn_layout.addWidget(self.insert_button)
-
-        self.delete_button = QPushButton("Видалити")
-        self.delete_button.clicked.connect(self.delete_row)
-        btn_layout.addWidget(self.delete_button)
+        self.ai_status_label = QLabel("")
+        layout.addWidget(self.ai_status_label)
 
-        self.update_button = QPushButton("Оновити")
-        self.update_button.clicked.connect(self.update_row)
-        btn_layout.addWidget(self.update_button)
+        # Зміна даних: рядки редагуються у вкладці таблиці, великі обсяги - імпортом файлу
+        btn_layout = QHBoxLayout()
+        self.import_button = QPushButton("📥 Імпорт файлу")
+        self.import_button.setToolTip("Завантажити CSV, TSV або JSON lines у таблицю поточної бази")
+        self.import_button.clicked.connect(self.import_file)
+        btn_layout.addWidget(self.import_button)
 
         layout.addLayout(btn_layout)
 
@@ -286,11 +2184,59 @@ class SQLApp(QWidget):
         self.export_excel_button.clicked.connect(self.export_to_excel)
         settings_layout.addWidget(self.export_excel_button)
 
+        # Графік поточного результату
+        self.chart_button = QPushButton("📈 Графік")
+        self.chart_button.setToolTip("Побудувати графік поточного результату" if HAS_QTCHARTS
+                                     else "Графіки недоступні: не встановлено PyQt6-Charts")
+        self.chart_button.setEnabled(HAS_QTCHARTS)
+        self.chart_button.clicked.connect(self.show_chart)
+        settings_layout.addWidget(self.chart_button)
+
         layout.addLayout(settings_layout)
         
-        # Таблиця для виводу результатів
-        self.table = QTableWidget()
-        layout.addWidget(self.table)
+        # Стан виконання запиту: час та кількість отриманих рядків
+        self.query_status_label = QLabel("")
+        layout.addWidget(self.query_status_label)
+        self.query_elapsed = QElapsedTimer()
+        self.query_status_timer = QTimer(self)
+        self.query_status_timer.setInterval(100)
+        self.query_status_timer.timeout.connect(self.update_query_status)
+
+        # Профіль останнього запуску: згорнута панель з фазами кожної інструкції
+        profile_header = QHBoxLayout()
+        self.profile_toggle = QToolButton()
+        self.profile_toggle.setText("Профіль виконання")
+        self.profile_toggle.setToolButtonStyle(Qt.ToolButtonStyle.ToolButtonTextBesideIcon)
+        self.profile_toggle.setArrowType(Qt.ArrowType.RightArrow)
+        self.profile_toggle.setCheckable(True)
+        self.profile_toggle.toggled.connect(self.toggle_profile_panel)
+        profile_header.addWidget(self.profile_toggle)
+        self.profile_summary_label = QLabel("")
+        profile_header.addWidget(self.profile_summary_label, 1)
+        self.memory_button = QPushButton("Виміряти пам'ять")
+        self.memory_button.setToolTip("Окремий прохід запиту під tracemalloc; час цього проходу не враховується")
+        self.memory_button.setEnabled(False)
+        self.memory_button.clicked.connect(self.measure_memory)
+        profile_header.addWidget(self.memory_button)
+        self.memory_thread = None
+        layout.addLayout(profile_header)
+        self.profile_model = ResultTableModel(self)
+        self.profile_view = QTableView()
+        self.profile_view.setModel(self.profile_model)
+        self.profile_view.verticalHeader().setVisible(False)
+        self.profile_view.setMaximumHeight(160)
+        self.profile_view.setVisible(False)
+        layout.addWidget(self.profile_view)
+        self.render_times = {}  # номер інструкції -> час відображення, мс
+
+        # Результати: окрема вкладка для кожної інструкції, що повертає рядки
+        self.result_tabs = QTabWidget()
+        self.result_tabs.currentChanged.connect(self.on_result_tab_changed)
+        layout.addWidget(self.result_tabs)
+        self.results = []  # {"view", "model", "source"} для кожної вкладки
+        self.batch_log = []
+        # Модель останнього результату - саме вона дочитується порціями під час прокрутки
+        self.result_model = ResultTableModel(self)
 
         # Add content to splitter and set up the final layout
         main_splitter.addWidget(main_content)
@@ -396,33 +2342,15 @@ class SQLApp(QWidget):
             print(f"Помилка завантаження закріплених запитів: {e}")
 
     def load_user_history(self):
-        """Завантаження історії запитів користувача з JSON файлу"""
-        try:
-            history_path = os.path.join(os.path.dirname(__file__), self.history_file)
-            if os.path.exists(history_path):
-                with open(history_path, 'r', encoding='utf-8') as f:
-                    self.history = json.load(f)
-            else:
-                self.history = []
-                
-            # Очистити старі і завантажити нові
-            self.history_list.clear()
-            
-            for query in self.history:
-                self.history_list.addItem(query[:50] + ("..." if len(query) > 50 else ""))
-                
-        except Exception as e:
-            print(f"Помилка завантаження історії запитів: {e}")
-            self.history = []
-
-    def save_history_to_json(self):
-        """Збереження історії запитів у JSON файл"""
+        """Завантаження історії запитів користувача; стара JSON-історія переноситься в базу"""
         try:
             history_path = os.path.join(os.path.dirname(__file__), self.history_file)
-            with open(history_path, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, ensure_ascii=False, indent=2)
+            migrated = self.history_store.import_json(self.user_id, history_path)
+            if migrated:
+                print(f"Перенесено {migrated} запитів з {self.history_file}")
         except Exception as e:
-            print(f"Помилка збереження історії запитів: {e}")
+            print(f"Помилка перенесення історії запитів: {e}")
+        self.history_model.reload()
 
     def clear_history(self):
         """Очищення історії запитів"""
@@ -435,9 +2363,8 @@ class SQLApp(QWidget):
         
         if reply == QMessageBox.StandardButton.Yes:
             # Очистити список та збережену історію
-            self.history_list.clear()
-            self.history = []
-            self.save_history_to_json()
+            self.history_store.clear(self.user_id)
+            self.history_model.reload()
             QMessageBox.information(self, "Інформація", "Історію успішно очищено")
 
     def save_user_preferences(self):
@@ -469,67 +2396,78 @@ class SQLApp(QWidget):
             self.db_path = file_path
             self.db_path_label.setText(self.db_path)
             
-            # Test connection and update quick access buttons
+            # Test connection and update the schema tree
             try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-                tables = cursor.fetchall()
+                self.update_schema_tree()
                 print(f"Connected to {self.db_path}")
-                print(f"Tables found: {tables}")
-                conn.close()
-                
-                # Update quick access table buttons
-                self.update_table_buttons(tables)
             except Exception as e:
                 print(f"Error connecting to database: {e}")
 
-    def update_table_buttons(self, tables):
-        """Creates buttons for quick access to each table in a grid layout"""
-        # Clear existing buttons first
-        for i in reversed(range(self.tables_grid.count())): 
-            self.tables_grid.itemAt(i).widget().setParent(None)
-        
-        # Add new buttons for each table in a grid (4 columns)
-        MAX_COLS = 4
-        row, col = 0, 0
-        
-        for table in tables:
-            table_name = table[0]
-            # Skip sqlite_sequence as it's a system table
-            if table_name == "sqlite_sequence":
-                continue
-                
-            btn = QPushButton(table_name)
-            btn.clicked.connect(lambda checked, name=table_name: self.show_table(name))
-            self.tables_grid.addWidget(btn, row, col)
-            
-            # Move to next column or row
-            col += 1
-            if col >= MAX_COLS:
-                col = 0
-                row += 1
+    def update_schema_tree(self, force=False):
+        """Показує схему поточної бази; фільтр пошуку застосовується і до нової схеми"""
+        if self.schema_model.set_database(self.db_path, force):
+            self.filter_schema()
+
+    def filter_schema(self):
+        self.schema_model.set_search(self.schema_search.text())
+        if self.schema_model.search:
+            # Під час пошуку групи з результатами розгортаються
+            for row in range(self.schema_model.rowCount()):
+                index = self.schema_model.index(row, 0)
+                self.schema_tree.setExpanded(index, self.schema_model.hasChildren(index))
+
+    def on_schema_activated(self, index):
+        node = self.schema_model.node(index)
+        if node.kind in ("table", "view"):
+            self.show_table(node.name)
 
     def show_table(self, table_name):
-        """Shows all data from the selected table"""
-        query = f"SELECT * FROM {table_name}"
-        self.query_input.setText(query)
-        self.execute_query()
+        """Відкриває таблицю в режимі перегляду: сторінки за ключем, сортування і фільтри в SQL"""
+        from PyQt6.QtWidgets import QMessageBox
+        try:
+            info = self.catalog.table(self.db_path, table_name)
+        except sqlite3.Error as e:
+            QMessageBox.warning(self, "Помилка", f"Не вдалося прочитати схему: {e}")
+            return
+        if info is None:
+            return
+        if not self.check_permissions(f"SELECT * FROM {quote_identifier(table_name)}"):
+            QMessageBox.warning(self, "Помилка прав доступу", "У вас немає прав на виконання цього запиту")
+            return
+        if not self.confirm_discard_changes():
+            return
+        self.stop_query_worker()
+        self.reset_results()
+        self.query_status_label.setText("")
+        panel = TableBrowserPanel(self.connections, self.db_path, TableBrowser(info), self.authorizer,
+                                  self.result_cache)
+        entry = {"view": panel, "model": panel.model, "source": panel.source()}
+        self.results.append(entry)
+        self.result_model = panel.model
+
+        def update_source(source):
+            entry["source"] = source
+            if self.result_tabs.currentWidget() is panel:
+                self.result_source = source
+
+        panel.source_changed.connect(update_source)
+        self.result_tabs.addTab(panel, f"📋 {table_name}")
+        self.result_tabs.setCurrentWidget(panel)
 
     def load_database_tables(self):
         """Завантаження таблиць з поточної бази даних"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-            tables = cursor.fetchall()
-            conn.close()
-            
-            # Update the table buttons UI
-            self.update_table_buttons(tables)
+            self.update_schema_tree()
         except Exception as e:
             print(f"Помилка при завантаженні таблиць: {e}")
 
+    def refresh_schema_if_changed(self):
+        """Оновлює дерево схеми, якщо запит змінив схему (дешева перевірка schema_version)"""
+        try:
+            self.update_schema_tree()
+        except sqlite3.Error:
+            pass
+
     def execute_query(self):
         query = self.query_input.text()
         if not query:
@@ -541,70 +2479,375 @@ class SQLApp(QWidget):
             QMessageBox.warning(self, "Помилка прав доступу", 
                               "У вас немає прав на виконання цього запиту")
             return
+        if not self.confirm_discard_changes():
+            return
         
-        # Додавання запиту в історію (змінено для JSON)
-        if query not in self.history:
-            self.history.insert(0, query)  # Додаємо на початок для хронологічного порядку
-            if len(self.history) > 50:  # Обмежуємо кількість записів
-                self.history = self.history[:50]
-                
-            # Оновлюємо UI
-            self.history_list.clear()
-            for q in self.history:
-                self.history_list.addItem(q[:50] + ("..." if len(q) > 50 else ""))
-                
-            # Зберігаємо історію в JSON
-            self.save_history_to_json()
-        
-        # Split the query into multiple statements
-        queries = [q.strip() for q in query.split(';') if q.strip()]
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        results = []
-        last_columns = []
+        # Додавання запиту в історію: один INSERT замість перезапису файлу
+        executed_at = time.time()
         try:
-            # Execute each query separately
-            for q in queries:
-                cursor.execute(q)
-                try:
-                    rows = cursor.fetchall()
-                    if cursor.description:  # If this query returns results
-                        columns = [desc[0] for desc in cursor.description]
-                        results.extend(rows)
-                        last_columns = columns
-                except sqlite3.Error:
-                    # This might be an INSERT/UPDATE/DELETE that doesn't return results
-                    pass
-            
-            # Commit all changes at once
-            conn.commit()
-        except Exception as e:
-            results = []
-            last_columns = []
-            print(f"Помилка запиту: {e}")
-        finally:
-            conn.close()
-
-        # Clear the table
-        self.table.clear()
-        
-        # Display results if any
-        if last_columns:
-            self.table.setColumnCount(len(last_columns))
-            self.table.setHorizontalHeaderLabels(last_columns)
+            history_id = self.history_store.append(self.user_id, query, self.db_path, executed_at)
+            self.history_model.prepend(history_id, query, self.db_path, executed_at)
+        except sqlite3.Error as e:
+            print(f"Помилка збереження історії запитів: {e}")
+            history_id = None
+        
+        # Split the query into separate statements
+        queries = split_sql_statements(query)
+        self.start_query_worker(queries, query, history_id)
+
+    def start_query_worker(self, queries, query_text, history_id=None):
+        """Запускає виконання запитів у фоновому потоці"""
+        self.stop_query_worker()
+        self.reset_results()
+        self.running_source = {"db_path": self.db_path, "query": query_text, "count": len(queries),
+                               "statements": queries, "history_id": history_id}
+        self.batch_log = []
+        self.render_times = {}
+        self.profile_model.clear()
+        self.profile_summary_label.setText("")
+        self.memory_button.setEnabled(False)
+
+        self.query_run_id += 1
+        worker = QueryWorker(self.query_run_id, self.connections, self.db_path, queries, self.authorizer,
+                             cache=self.result_cache)
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.statement_done.connect(self.on_statement_done)
+        worker.batch_ready.connect(self.on_query_batch)
+        worker.failed.connect(self.on_query_failed)
+        worker.truncated.connect(self.on_query_truncated)
+        worker.profiled.connect(self.on_query_profiled)
+        worker.finished.connect(self.on_query_finished)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+
+        self.query_worker = worker
+        self.query_thread = thread
+        self.cancel_button.setEnabled(True)
+        self.query_elapsed.start()
+        self.query_status_timer.start()
+        self.update_query_status()
+        thread.start()
+
+    def stop_query_worker(self):
+        """Перериває поточний фоновий запит і звільняє його з'єднання"""
+        worker = self.query_worker
+        if worker is None:
+            return
+        self.query_worker = None
+        self.query_run_id += 1  # Сигнали старого виконавця більше не приймаються
+        self.query_status_timer.stop()
+        self.cancel_button.setEnabled(False)
+        try:
+            self.result_model.fetch_requested.disconnect(worker.fetch_more)
+        except (TypeError, RuntimeError):
+            pass
+        try:
+            worker.cancel()
+            QMetaObject.invokeMethod(worker, "close", Qt.ConnectionType.QueuedConnection)
+        except RuntimeError:
+            # Виконавець уже завершився і був видалений
+            pass
+
+    def park_query_cursor(self):
+        """Перед записом у базу: відкритий курсор результату не повинен тримати блокування"""
+        if self.query_worker is None:
+            return
+        try:
+            QMetaObject.invokeMethod(self.query_worker, "park", Qt.ConnectionType.QueuedConnection)
+        except RuntimeError:
+            pass
+
+    def cancel_query(self):
+        """Обробник кнопки скасування"""
+        if self.ai_worker is not None:
+            self.cancel_ai_query()
+            return
+        if self.query_worker is None:
+            return
+        self.stop_query_worker()
+        self.query_status_label.setText(f"⏹ Запит скасовано · рядків: {self.result_model.rowCount()}")
+
+    def update_query_status(self):
+        seconds = self.query_elapsed.elapsed() / 1000
+        self.query_status_label.setText(
+            f"⏳ Виконується: {seconds:.1f} с · рядків: {self.result_model.rowCount()}")
+
+    # === RESULT TABS ===
+    def reset_results(self):
+        """Прибирає вкладки результатів попереднього запуску"""
+        self.results = []
+        self.result_source = None
+        while self.result_tabs.count():
+            view = self.result_tabs.widget(0)
+            if isinstance(view, TableBrowserPanel):
+                view.stop()
+            self.result_tabs.removeTab(0)
+            view.deleteLater()
+        self.result_model = ResultTableModel(self)
+
+    def add_result_tab(self, title, columns, rows, has_more=False, source=None, index=None):
+        """Нова вкладка з таблицею результатів; повертає її модель"""
+        view = QTableView()
+        model = ResultTableModel(view)
+        model.set_result(columns, rows, has_more)
+        view.setModel(model)
+        view.verticalHeader().setVisible(False)  # Ховаємо номери рядків
+        self.results.append({"view": view, "model": model, "source": source})
+        if index is None:
+            self.result_tabs.addTab(view, title)
         else:
-            self.table.setColumnCount(0)
-        
-        # Display results
-        self.table.setRowCount(len(results))
-        # Ховаємо номери рядків 
-        self.table.setVerticalHeaderLabels([""] * len(results))
-        
-        for i, row in enumerate(results):
-            for j, value in enumerate(row):
-                self.table.setItem(i, j, QTableWidgetItem(str(value)))
+            self.result_tabs.insertTab(index, view, title)
+        return model
+
+    def on_result_tab_changed(self, index):
+        view = self.result_tabs.widget(index)
+        entry = next((r for r in self.results if r["view"] is view), None)
+        # Експорт працює з результатом на активній вкладці
+        self.result_source = entry["source"] if entry else None
+
+    def on_statement_done(self, run_id, result):
+        if run_id != self.query_run_id:
+            return
+        render_started = time.perf_counter()
+        index = result["index"]
+        if result.get("cached"):
+            self.running_source["cached"] = True
+        if result["columns"]:
+            # Повторно (для експорту, графіка) виконується лише інструкція, перед якою в пакеті не було
+            # змін даних і тимчасових таблиць; інакше експортуються вже отримані рядки
+            rerunnable = is_read_only_sql(self.running_source["statements"][:index + 1])
+            source = dict(self.running_source, statements=[result["statement"]], rerunnable=rerunnable,
+                          truncated=result["truncated"])
+            title = f"Результат {index + 1}" if self.running_source["count"] > 1 else "Результат"
+            model = self.add_result_tab(title, result["columns"], result["rows"], result["has_more"], source)
+            self.result_model = model
+            if result["has_more"]:
+                # Запити моделі на нові рядки виконуються у потоці виконавця
+                model.fetch_requested.connect(self.query_worker.fetch_more)
+            self.result_tabs.setCurrentIndex(self.result_tabs.count() - 1)
+
+        rows = f"{result['rowcount']}{'+' if result['has_more'] or result['truncated'] else ''}"
+        if not result["columns"] and result["rowcount"] < 0:
+            rows = "-"
+        statement = " ".join(result["statement"].split())
+        self.batch_log.append((index + 1, statement[:120], rows, round(result["elapsed"] * 1000, 1)))
+
+        if index == self.running_source["count"] - 1:
+            self.query_status_timer.stop()
+            self.query_seconds = self.query_elapsed.elapsed() / 1000
+            # Журнал пакета: кількість рядків і час кожної інструкції
+            if self.running_source["count"] > 1 or not result["columns"]:
+                self.add_result_tab("Журнал", ["#", "Інструкція", "Рядків", "Час, мс"], self.batch_log, index=0)
+            self.show_query_done_status()
+        # Відображення закінчується, коли цикл подій обробив перемальовування таблиці
+        QTimer.singleShot(0, lambda: self.on_statement_rendered(run_id, index, render_started))
+
+    def on_statement_rendered(self, run_id, index, render_started):
+        if run_id == self.query_run_id:
+            self.render_times[index] = round((time.perf_counter() - render_started) * 1000, 3)
+
+    def on_query_profiled(self, run_id, profile):
+        if run_id != self.query_run_id:
+            return
+        # Таймери відображення інструкцій поставлені в чергу раніше і спрацюють першими
+        QTimer.singleShot(0, lambda: self.finish_profile(run_id, profile))
+
+    def finish_profile(self, run_id, profile):
+        if run_id != self.query_run_id:
+            return
+        for index, statement in enumerate(profile["statements"]):
+            statement["render_ms"] = self.render_times.get(index, 0.0)
+        profile["render_ms"] = round(sum(s["render_ms"] for s in profile["statements"]), 2)
+        self.show_profile(profile)
+        self.record_history_stats(profile)
+        self.memory_button.setEnabled(is_read_only_sql(self.running_source["statements"]))
+
+    def on_query_batch(self, run_id, rows, has_more):
+        if run_id != self.query_run_id:
+            return
+        self.result_model.append_rows(rows, has_more)
+        self.show_query_done_status()
+
+    def on_query_failed(self, run_id, message):
+        if run_id != self.query_run_id:
+            return
+        self.query_status_timer.stop()
+        self.reset_results()
+        print(f"Помилка запиту: {message}")
+        self.query_status_label.setText(f"❌ Помилка: {message}")
+        if is_authorization_error(message):
+            from PyQt6.QtWidgets import QMessageBox
+            QMessageBox.warning(self, "Помилка прав доступу",
+                              "У вас немає прав на виконання цього запиту")
+
+    def on_query_truncated(self, run_id, reason):
+        if run_id != self.query_run_id:
+            return
+        self.query_status_label.setText(
+            f"⚠️ Показано рядків: {self.result_model.rowCount()} - {reason}")
+        source = next((r["source"] for r in self.results if r["model"] is self.result_model), None)
+        if source is not None:
+            # Завантажені рядки - не весь результат: експорт без повторного виконання їх не візьме
+            source["truncated"] = True
+
+    def on_query_finished(self, run_id):
+        if run_id != self.query_run_id:
+            return
+        self.query_worker = None
+        self.query_thread = None
+        self.cancel_button.setEnabled(False)
+        self.refresh_schema_if_changed()
+        if self.result_model.has_more:
+            self.result_model.append_rows([], False)
+
+    def show_profile(self, profile):
+        memory = profile["peak_memory_kb"]
+        self.profile_summary_label.setText(
+            ("з кешу · " if profile.get("cached") else "") +
+            f"підготовка {profile['prepare_ms']:.1f} мс · виконання {profile['execute_ms']:.1f} мс · "
+            f"вибірка {profile['fetch_ms']:.1f} мс · відображення {profile['render_ms']:.1f} мс · "
+            f"VM ≈ {profile['vm_steps']}" + (f" · пам'ять {memory:.0f} КБ" if memory is not None else ""))
+        rows = []
+        for index, (statement, phases) in enumerate(zip(self.running_source["statements"], profile["statements"]),
+                                                    start=1):
+            rows.append((index, " ".join(statement.split())[:120], phases["prepare_ms"], phases["execute_ms"],
+                         phases["fetch_ms"], phases["render_ms"], phases["vm_steps"], phases["rows"]))
+        self.profile_model.set_result(
+            ["#", "Інструкція", "Підготовка, мс", "Виконання, мс", "Вибірка, мс", "Відображення, мс",
+             "VM-кроків ≈", "Рядків"], rows)
+
+    def measure_memory(self):
+        """Пікова пам'ять читання результату останнього запиту - окремим повторним проходом"""
+        if self.memory_thread is not None or not self.running_source:
+            return
+        source = self.running_source
+        worker = MemoryProfileWorker(self.query_run_id, self.connections, source["db_path"],
+                                     source["statements"], self.authorizer)
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.done.connect(self.on_memory_measured)
+        worker.failed.connect(lambda run_id, message: self.on_memory_measured(run_id, None, message))
+        worker.done.connect(thread.quit)
+        worker.failed.connect(thread.quit)
+        thread.finished.connect(self.on_memory_thread_finished)
+        self.memory_button.setEnabled(False)
+        self.memory_worker, self.memory_thread = worker, thread
+        thread.start()
+
+    def on_memory_measured(self, run_id, kilobytes, error=None):
+        if run_id != self.query_run_id:
+            return
+        text = f"пам'ять: помилка ({error})" if error else f"пам'ять {kilobytes:.0f} КБ (окремий прохід)"
+        self.profile_summary_label.setText(f"{self.profile_summary_label.text()} · {text}")
+
+    def on_memory_thread_finished(self):
+        self.memory_worker = None
+        self.memory_thread = None
+
+    def toggle_profile_panel(self, expanded):
+        self.profile_toggle.setArrowType(Qt.ArrowType.DownArrow if expanded else Qt.ArrowType.RightArrow)
+        self.profile_view.setVisible(expanded)
+
+    def record_history_stats(self, profile):
+        """Час виконання пакета, кількість рядків останньої інструкції та профіль - в історію"""
+        history_id = self.running_source.get("history_id")
+        if history_id is None:
+            return
+        elapsed_ms = round(self.query_seconds * 1000, 1)
+        last_rows = profile["statements"][-1]["rows"] if profile["statements"] else -1
+        row_count = last_rows if last_rows >= 0 else None
+        try:
+            self.history_store.update_stats(history_id, elapsed_ms, row_count, profile)
+            self.history_model.update_stats(history_id, elapsed_ms, row_count)
+        except sqlite3.Error as e:
+            print(f"Помилка збереження історії запитів: {e}")
+
+    # === QUERY PLAN AND INDEXES ===
+    def explain_query(self):
+        """Показує план виконання кожної інструкції поточного запиту"""
+        from PyQt6.QtWidgets import QMessageBox
+        query = self.query_input.text()
+        statements = split_sql_statements(query)
+        if not statements:
+            return
+        if not self.check_permissions(query):
+            QMessageBox.warning(self, "Помилка прав доступу", "У вас немає прав на виконання цього запиту")
+            return
+        plans = []
+        try:
+            conn = self.connections.get(self.db_path)
+            for statement in statements:
+                if first_keyword(statement) in NO_TRANSACTION_KEYWORDS + ("explain",):
+                    continue
+                plans.append((statement, explain_plan(conn, statement)))
+        except sqlite3.Error as e:
+            QMessageBox.warning(self, "Помилка", f"Не вдалося отримати план запиту: {e}")
+            return
+        QueryPlanDialog(plans, self).exec()
+
+    def open_index_advisor(self):
+        """Аналізує історію запитів до поточної бази; адміністратор бачить історію всіх користувачів"""
+        from PyQt6.QtWidgets import QMessageBox
+        is_admin = self.user_role == "admin"
+        try:
+            workload = self.history_store.workload(self.db_path, None if is_admin else self.user_id)
+        except sqlite3.Error as e:
+            QMessageBox.warning(self, "Помилка", f"Не вдалося прочитати історію запитів: {e}")
+            return
+        if not workload:
+            QMessageBox.information(self, "Поради щодо індексів", "В історії немає запитів до цієї бази даних")
+            return
+        if self.advisor_dialog is not None:
+            self.advisor_dialog.close()
+        self.advisor_dialog = IndexAdvisorDialog(self.db_path, workload, is_admin, self)
+        self.advisor_dialog.apply_requested.connect(self.apply_index)
+        self.advisor_dialog.show()
+
+    def apply_index(self, sql):
+        """Створює запропонований індекс як звичайний запит - з історією та профілем"""
+        self.query_input.setText(sql)
+        self.execute_query()
+
+    def show_query_done_status(self):
+        more = "+" if self.result_model.has_more else ""
+        count = self.running_source["count"]
+        statements = f"{count} інструкцій " if count > 1 else ""
+        cached = " · з кешу" if self.running_source.get("cached") else ""
+        self.query_status_label.setText(
+            f"✅ Виконано {statements}за {self.query_seconds:.2f} с · рядків: {self.result_model.rowCount()}{more}"
+            f"{cached}")
+
+    def closeEvent(self, event):
+        """Зупиняє фонові запити перед закриттям вікна"""
+        thread = self.query_thread
+        self.stop_query_worker()
+        if self.export_worker is not None:
+            self.export_worker.cancel()
+        ai_thread = self.ai_thread
+        self.stop_ai_worker()
+        for dialog in (self.advisor_dialog, self.chart_dialog, self.import_dialog):
+            if dialog is not None:
+                dialog.close()
+        for entry in self.results:
+            if isinstance(entry["view"], TableBrowserPanel):
+                entry["view"].stop()
+        for t in (thread, self.export_thread, ai_thread, self.memory_thread):
+            if t is None:
+                continue
+            try:
+                t.quit()
+                t.wait(2000)
+            except RuntimeError:
+                pass
+        self.connections.close_all()
+        self.ai_cache.close()
+        self.result_cache.close()
+        self.history_store.close()
+        super().closeEvent(event)
 
     def check_permissions(self, query):
         """Перевірка прав доступу для виконання запиту"""
@@ -612,97 +2855,36 @@ class SQLApp(QWidget):
             # Адміністратор має всі права
             return True
         
-        if not self.user_id:
+        if not self.user_id or self.permissions is None:
             # Якщо користувач не авторизований
             return False
-        
-        # Аналіз типу запиту
-        query_lower = query.lower().strip()
-        operation = None
-        table_name = None
-        
-        if query_lower.startswith("select"):
-            operation = "select"
-        elif query_lower.startswith("insert"):
-            operation = "insert"
-        elif query_lower.startswith("update"):
-            operation = "update"
-        elif query_lower.startswith("delete"):
-            operation = "delete"
-        
-        if operation:
-            # Спрощений пошук назви таблиці
-            # Це примітивний підхід, для складних запитів потрібен повноцінний SQL парсер
-            if operation == "select":
-                parts = query_lower.split("from")
-                if len(parts) > 1:
-                    table_part = parts[1].strip().split(" ")[0].split(";")[0]
-                    table_name = table_part
-            elif operation == "insert":
-                parts = query_lower.split("into")
-                if len(parts) > 1:
-                    table_part = parts[1].strip().split(" ")[0].split("(")[0].split(";")[0]
-                    table_name = table_part
-            elif operation == "update":
-                parts = query_lower.split("update")
-                if len(parts) > 1:
-                    table_part = parts[1].strip().split(" ")[0].split("set")[0].split(";")[0]
-                    table_name = table_part
-            elif operation == "delete":
-                parts = query_lower.split("from")
-                if len(parts) > 1:
-                    table_part = parts[1].strip().split(" ")[0].split("where")[0].split(";")[0]
-                    table_name = table_part
-        
-        if operation and table_name:
-            # Перевірка прав доступу в базі
-            try:
-                conn = sqlite3.connect("user_management.db")
-                cursor = conn.cursor()
-                
-                # Створити таблицю прав, якщо не існує
-                cursor.execute('''
-                CREATE TABLE IF NOT EXISTS user_permissions (
-                    permission_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    table_name TEXT NOT NULL,
-                    can_select BOOLEAN DEFAULT 1,
-                    can_insert BOOLEAN DEFAULT 0,
-                    can_update BOOLEAN DEFAULT 0,
-                    can_delete BOOLEAN DEFAULT 0,
-                    FOREIGN KEY (user_id) REFERENCES users(user_id)
-                )''')
-                
-                # Перевірка прав
-                permission_field = f"can_{operation}"
-                cursor.execute(f"SELECT {permission_field} FROM user_permissions WHERE user_id=? AND table_name=?", 
-                             (self.user_id, table_name))
-                result = cursor.fetchone()
-                
-                if not result:
-                    # Якщо немає правила, створити дефолтне
-                    defaults = {"can_select": 1, "can_insert": 0, "can_update": 0, "can_delete": 0}
-                    cursor.execute(
-                        "INSERT INTO user_permissions (user_id, table_name, can_select, can_insert, can_update, can_delete) VALUES (?, ?, ?, ?, ?, ?)", 
-                        (self.user_id, table_name, defaults["can_select"], defaults["can_insert"], defaults["can_update"], defaults["can_delete"])
-                    )
-                    conn.commit()
-                    conn.close()
-                    return defaults.get(permission_field, 0) == 1
-                
-                conn.close()
-                return result[0] == 1
-            except Exception as e:
-                print(f"Помилка перевірки прав доступу: {e}")
-        
-        # За замовчуванням дозволяємо SELECT і забороняємо інші операції
-        if operation == "select":
-            return True
-        return False
+
+        # Права перевіряє сам SQLite під час підготовки запиту - з урахуванням JOIN, підзапитів і CTE
+        statements = split_sql_statements(query)
+        try:
+            return self.permissions.check_statements(self.connections.get(self.db_path), statements)
+        except sqlite3.Error as e:
+            print(f"Помилка перевірки прав доступу: {e}")
+            return False
+
+    @property
+    def authorizer(self):
+        """Права для з'єднань, на яких виконуються запити користувача (None для адміністратора).
+
+        ConnectionManager.acquire прив'язує PermissionSet до з'єднання через bind_authorizer.
+        """
+        if self.user_role == "admin" or self.permissions is None:
+            return None
+        return self.permissions
 
     # === AI FEATURES ===
     def voice_input(self):
         """Функція для голосового введення запиту."""
+        try:
+            import speech_recognition as sr
+        except ImportError:
+            self.query_input.setText("Голосове введення недоступне: не встановлено speech_recognition")
+            return
         recognizer = sr.Recognizer()
         self.query_input.setText("Listening...")
         
@@ -725,52 +2907,130 @@ class SQLApp(QWidget):
 
     def ai_query(self):
         query_text = self.query_input.text()
-        
-        # First validate the query
-        is_valid, message = self.validate_ai_query(query_text)
-        if not is_valid:
+
+        if query_text.lower() == "exit":
+            return
+
+        try:
+            schema = self.catalog.get(self.db_path)
+        except sqlite3.Error as e:
             from PyQt6.QtWidgets import QMessageBox
-            QMessageBox.warning(self, "Валідація запиту", message)
+            QMessageBox.critical(self, "Помилка ШІ", f"Не вдалося прочитати схему бази: {str(e)}")
+            return
+
+        # Те саме питання до тієї ж схеми вже було - відповідь береться з кешу без звернення до ШІ
+        cached_sql = self.ai_cache.get(query_text, schema.fingerprint)
+        if cached_sql:
+            self.last_ai_question = (query_text, schema.fingerprint)
+            self.ai_regenerate_button.setEnabled(True)
+            self.show_ai_cache_status("відповідь з кешу")
+            self.query_input.setText(cached_sql)
+            self.execute_query()
             return
         
-        # If valid, proceed with the regular AI query processing
+        # До промпту йдуть лише релевантні питанню таблиці та їхні сусіди за FK
+        selected = self.schema_pruner.select(schema, query_text, self.history_store.recent_queries(self.user_id))
+        debug_print(f"AI prompt: {len(selected)}/{len(schema.tables)} tables")
+        tables = [(name,) for name in selected]
+        schemas = {name: schema.objects[name].columns for name in selected}
+
+        # Валідація та генерація виконуються паралельно у фоновому потоці
+        self.start_ai_worker(query_text, schema.fingerprint,
+                             lambda: self.validate_ai_query(query_text),
+                             lambda: self.try_mysql(tables, schemas, query_text))
+
+    def start_ai_worker(self, query_text, fingerprint, validate, generate):
+        """Запускає конвеєр ШІ у фоновому потоці"""
+        self.stop_ai_worker()
+        self.ai_run_id += 1
+        worker = AIQueryWorker(self.ai_run_id, validate, generate)
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.generated.connect(self.on_ai_generated)
+        worker.rejected.connect(self.on_ai_rejected)
+        worker.failed.connect(self.on_ai_failed)
+        worker.finished.connect(self.on_ai_finished)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+
+        self.ai_worker = worker
+        self.ai_thread = thread
+        self.ai_request = (query_text, fingerprint)
+        self.ai_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.ai_status_label.setText("ШІ: генерую запит...")
+        thread.start()
+
+    def stop_ai_worker(self):
+        worker = self.ai_worker
+        if worker is None:
+            return
+        self.ai_worker = None
+        self.ai_thread = None
+        self.ai_run_id += 1  # Запізнілі відповіді скасованого запиту ігноруються
+        self.ai_button.setEnabled(True)
+        self.cancel_button.setEnabled(self.query_worker is not None)
         try:
-            # 1) Connect and gather table info
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-            tables = cursor.fetchall()
-            schemas = {}
-            for table in tables:
-                table_name = table[0]
-                cursor.execute(f"PRAGMA table_info({table_name})")
-                columns = cursor.fetchall()
-                schemas[table_name] = columns
-            conn.close()
+            worker.cancel()
+        except RuntimeError:
+            pass
 
-            # 2) Generate query from g4f
-            if query_text.lower() == "exit":
-                return
-            
-            # Show that processing is happening
-            original_text = query_text
-            self.query_input.setText("Генерую запит...")
-            QApplication.processEvents()  # Update UI immediately
-            
-            # Process with updated mysql function
-            sql_query = self.try_mysql(tables, schemas, query_text)
-            print("Generated SQL:", sql_query)
+    def cancel_ai_query(self):
+        self.stop_ai_worker()
+        self.ai_status_label.setText("ШІ: генерацію скасовано")
 
-            # 3) Execute and update table
-            self.query_input.setText(sql_query)
-            self.execute_query()
-            
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            from PyQt6.QtWidgets import QMessageBox
-            QMessageBox.critical(self, "Помилка ШІ", f"Помилка при генерації запиту: {str(e)}")
-            self.query_input.setText(original_text)  # Restore original query
+    def on_ai_generated(self, run_id, sql_query):
+        if run_id != self.ai_run_id:
+            return
+        question, fingerprint = self.ai_request
+        print("Generated SQL:", sql_query)
+        if not is_ai_error_sql(sql_query):
+            self.ai_cache.put(question, fingerprint, sql_query)
+            self.last_ai_question = (question, fingerprint)
+            self.ai_regenerate_button.setEnabled(True)
+        self.show_ai_cache_status("згенеровано ШІ")
+
+        # Execute and update table
+        self.query_input.setText(sql_query)
+        self.execute_query()
+
+    def on_ai_rejected(self, run_id, message):
+        if run_id != self.ai_run_id:
+            return
+        from PyQt6.QtWidgets import QMessageBox
+        self.ai_status_label.setText("")
+        QMessageBox.warning(self, "Валідація запиту", message)
+
+    def on_ai_failed(self, run_id, message):
+        if run_id != self.ai_run_id:
+            return
+        from PyQt6.QtWidgets import QMessageBox
+        self.ai_status_label.setText("")
+        QMessageBox.critical(self, "Помилка ШІ", f"Помилка при генерації запиту: {message}")
+
+    def on_ai_finished(self, run_id):
+        if run_id != self.ai_run_id:
+            return
+        self.ai_worker = None
+        self.ai_thread = None
+        self.ai_button.setEnabled(True)
+        self.cancel_button.setEnabled(self.query_worker is not None)
+
+    def regenerate_ai_query(self):
+        """Видаляє з кешу відповідь на останнє питання та генерує її заново"""
+        if not self.last_ai_question:
+            return
+        question, fingerprint = self.last_ai_question
+        self.ai_cache.invalidate(question, fingerprint)
+        self.query_input.setText(question)
+        self.ai_query()
+
+    def show_ai_cache_status(self, source):
+        stats = self.ai_cache.stats()
+        self.ai_status_label.setText(
+            f"ШІ: {source} · кеш: {stats['entries']} записів, влучань {stats['hits']}, промахів {stats['misses']}")
 
     def validate_ai_query(self, query_text):
         """Validate if a query is suitable for AI processing"""
@@ -795,6 +3055,7 @@ class SQLApp(QWidget):
         
         # If it's very short and doesn't look like a question, validate with AI
         try:
+            from g4f.client import Client
             client = Client()
             response = client.chat.completions.create(
                 model="gpt-4",  # Using a smaller model for quick validation
@@ -834,17 +3095,7 @@ class SQLApp(QWidget):
                 table_name = table[0]
                 if table_name == "sqlite_sequence":  # Skip system tables
                     continue
-                    
-                columns_info = []
-                for col in schemas[table_name]:
-                    # Format: (id, name, type, notnull, default_value, primary_key)
-                    col_id, col_name, col_type, not_null, default_val, is_pk = col
-                    col_desc = f"{col_name} ({col_type})"
-                    if is_pk:
-                        col_desc += " PRIMARY KEY"
-                    columns_info.append(col_desc)
-                    
-                db_schema.append(f"Table: {table_name}\nColumns: {', '.join(columns_info)}")
+                db_schema.append(format_table_schema(table_name, schemas[table_name]))
             
             # Join all schema information
             schema_text = "\n\n".join(db_schema)
@@ -868,6 +3119,7 @@ class SQLApp(QWidget):
 Поверни лише SQL-запит без додаткового тексту."""
             
             # Use g4f to generate SQL
+            from g4f.client import Client
             client = Client()
             response = client.chat.completions.create(
                 model="gpt-4",  # Using a more powerful model for SQL generation
@@ -916,22 +3168,49 @@ class SQLApp(QWidget):
             return f"""SELECT 'Error generating SQL: {str(e).replace("'", "''")}'"""
 
     # === DATA MODIFICATION ===
-    def insert_row(self):
-        # Тут користувач може додавати свій INSERT-запит у self.query_input
-        self.query_input.setText("INSERT INTO your_table (...) VALUES (...);")
-
-    def delete_row(self):
-        # Тут можна додавати DELETE-запит
-        self.query_input.setText("DELETE FROM your_table WHERE id=...;")
+    def confirm_discard_changes(self):
+        """True, якщо у вкладках таблиць немає незбережених змін або користувач погодився їх відкинути"""
+        from PyQt6.QtWidgets import QMessageBox
+        count = sum(len(entry["view"].model.changes) for entry in self.results
+                    if isinstance(entry["view"], TableBrowserPanel) and entry["view"].has_unsaved_changes())
+        if not count:
+            return True
+        answer = QMessageBox.question(self, "Незбережені зміни",
+                                      f"Незбережених змін у таблицях: {count}. Відкинути їх?",
+                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        return answer == QMessageBox.StandardButton.Yes
 
-    def update_row(self):
-        # Тут можна додавати UPDATE-запит
-        self.query_input.setText("UPDATE your_table SET column=value WHERE id=...;")
+    def import_file(self):
+        """Потоковий імпорт файлу у нову або наявну таблицю"""
+        from PyQt6.QtWidgets import QMessageBox
+        if self.import_dialog is not None and self.import_dialog.thread is not None:
+            self.import_dialog.raise_()
+            return
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "Імпорт даних", "", "Дані (*.csv *.tsv *.tab *.txt *.jsonl *.ndjson);;Усі файли (*)")
+        if not filename:
+            return
+        try:
+            source = ImportSource(filename)
+        except Exception as e:
+            QMessageBox.critical(self, "Імпорт даних", f"Не вдалося прочитати файл.\nПомилка: {e}")
+            return
+        if self.import_dialog is not None:
+            self.import_dialog.close()
+        self.import_dialog = ImportDialog(self.connections, self.db_path, source, self.catalog,
+                                          self.check_permissions, self.authorizer, self)
+        self.import_dialog.imported.connect(self.on_imported)
+        self.import_dialog.starting.connect(self.park_query_cursor)
+        self.import_dialog.show()
+
+    def on_imported(self, table, rows):
+        print(f"Імпортовано {rows} рядків у {table}")
+        self.refresh_schema_if_changed()
 
     # === HISTORY AND FAVORITES ===
-    def load_from_history(self, item):
+    def load_from_history(self, index):
         """Load a query from history into the input field"""
-        self.query_input.setText(item.text())
+        self.query_input.setText(index.data(Qt.ItemDataRole.UserRole))
     
     def load_from_favorites(self, item):
         """Load a query from favorites into the input field and execute it"""
@@ -1038,6 +3317,7 @@ class SQLApp(QWidget):
             
             # Спроба генерації через ШІ
             print("Генерую назву файлу за допомогою ШІ...")
+            from g4f.client import Client
             client = Client()
             response = client.chat.completions.create(
                 model="gpt-4",
@@ -1079,263 +3359,139 @@ class SQLApp(QWidget):
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             return f"sql_export_{timestamp}.pdf"
 
-    def export_to_pdf(self):
-        try:
-            from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-            from reportlab.lib import colors
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.lib.pagesizes import A4, landscape, portrait
-            from reportlab.lib.units import mm
-            from PyQt6.QtWidgets import QFileDialog, QMessageBox
-            from datetime import datetime
-            from reportlab.pdfbase.ttfonts import TTFont
-            from reportlab.pdfbase import pdfmetrics
-
-            # Try to register Arial, fallback to Helvetica if not found
-            arial_path = "C:/Windows/Fonts/arial.ttf"
-            arial_bold_path = "C:/Windows/Fonts/arialbd.ttf"
-            try:
-                pdfmetrics.registerFont(TTFont("Arial", arial_path))
-                pdfmetrics.registerFont(TTFont("Arial-Bold", arial_bold_path))
-                font_name = "Arial"
-                font_bold = "Arial-Bold"
-            except Exception:
-                font_name = "Helvetica"
-                font_bold = "Helvetica-Bold"
-
-            query = self.query_input.text()
-            if not query:
-                QMessageBox.warning(self, "PDF Export", "Немає даних для експорту!")
-                return
-
-            suggested_name = self.generate_pdf_filename(query)
-            if not self.pdf_export_path or not os.path.exists(self.pdf_export_path):
-                self.pdf_export_path = os.path.expanduser("~/Documents")
-            suggested_path = os.path.join(self.pdf_export_path, suggested_name)
-
-            filename, _ = QFileDialog.getSaveFileName(
-                self,
-                "Зберегти як PDF",
-                suggested_path,
-                "PDF Files (*.pdf)"
-            )
-            if not filename:
-                return
-
-            new_path = os.path.dirname(filename)
-            self.pdf_export_path = new_path
-            self.save_user_preferences()
-
-            col_count = self.table.columnCount()
-            row_count = self.table.rowCount()
-            if col_count == 0:
-                QMessageBox.warning(self, "PDF Export", "Немає даних для експорту!")
-                return
-
-            headers = [self.table.horizontalHeaderItem(i).text() for i in range(col_count)]
-            data = [headers]
-            for row in range(row_count):
-                row_data = []
-                for col in range(col_count):
-                    item = self.table.item(row, col)
-                    row_data.append(item.text() if item else "")
-                data.append(row_data)
-
-            # --- PDF page size/orientation logic ---
-            PAGE_MARGIN = 20 * mm
-            max_width = 160  # max width per column in points
-            # Estimate total table width
-            col_widths = []
-            for col in range(col_count):
-                maxlen = max([len(str(data[row][col])) for row in range(len(data))])
-                width = min(40 + maxlen * 6, max_width)
-                col_widths.append(width)
-            table_width = sum(col_widths)
-            # If table too wide for portrait, use landscape
-            if table_width > (A4[0] - 2 * PAGE_MARGIN):
-                pagesize = landscape(A4)
-                available_width = pagesize[0] - 2 * PAGE_MARGIN
-            else:
-                pagesize = portrait(A4)
-                available_width = pagesize[0] - 2 * PAGE_MARGIN
-            # Scale columns if needed
-            scale = min(1.0, available_width / table_width)
-            col_widths = [w * scale for w in col_widths]
-
-            doc = SimpleDocTemplate(filename, pagesize=pagesize, rightMargin=PAGE_MARGIN, leftMargin=PAGE_MARGIN, topMargin=PAGE_MARGIN, bottomMargin=PAGE_MARGIN)
-            elements = []
-
-            styles = getSampleStyleSheet()
-            styles.add(ParagraphStyle(name='QueryHeader', fontName=font_bold, fontSize=16, spaceAfter=10, textColor=colors.darkblue, alignment=1))
-            styles.add(ParagraphStyle(name='NormalCustom', fontName=font_name, fontSize=11, spaceAfter=8))
-
-            elements.append(Paragraph("Результати SQL-запиту", styles['QueryHeader']))
-            elements.append(Paragraph(f"<b>SQL запит:</b> {query}", styles['NormalCustom']))
-            elements.append(Paragraph(f"<b>Час створення:</b> {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}", styles['NormalCustom']))
-            elements.append(Spacer(1, 10))
-
-            pdf_table = Table(data, colWidths=col_widths, repeatRows=1)
-            style = TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#1976d2")),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), font_bold),
-                ('FONTSIZE', (0, 0), (-1, 0), 11),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('FONTNAME', (0, 1), (-1, -1), font_name),
-                ('FONTSIZE', (0, 1), (-1, -1), 10),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ])
-            pdf_table.setStyle(style)
-            elements.append(pdf_table)
-            doc.build(elements)
-            QMessageBox.information(self, "PDF Export", f"Файл успішно збережено як:\n{filename}")
-        except Exception as e:
-            print(f"Помилка при експорті в PDF: {e}")
-            from PyQt6.QtWidgets import QMessageBox
-            QMessageBox.critical(self, "Помилка експорту", f"Не вдалося створити PDF файл.\nПомилка: {str(e)}")
+    def ask_export_filename(self, title, caption, extension, file_filter):
+        """Пропонує назву файлу і запитує шлях збереження; None, якщо експортувати нічого"""
+        from PyQt6.QtWidgets import QMessageBox
 
-    def export_to_word(self):
-        from PyQt6.QtWidgets import QFileDialog, QMessageBox
-        from datetime import datetime
-        import docx
-        from docx.shared import RGBColor
-        
-        query = self.query_input.text()
-        if not query:
-            QMessageBox.warning(self, "Word Export", "Немає даних для експорту!")
-            return
+        query = self.result_source["query"] if self.result_source else ""
+        if not query or not self.result_source["statements"]:
+            QMessageBox.warning(self, title, "Немає даних для експорту!")
+            return None
 
-        suggested_name = self.generate_pdf_filename(query).replace('.pdf', '.docx')
+        suggested_name = self.generate_pdf_filename(query).replace('.pdf', extension)
         if not self.pdf_export_path or not os.path.exists(self.pdf_export_path):
             self.pdf_export_path = os.path.expanduser("~/Documents")
         suggested_path = os.path.join(self.pdf_export_path, suggested_name)
 
-        filename, _ = QFileDialog.getSaveFileName(
-            self,
-            "Зберегти як Word",
-            suggested_path,
-            "Word Files (*.docx)"
-        )
+        filename, _ = QFileDialog.getSaveFileName(self, caption, suggested_path, file_filter)
         if not filename:
+            return None
+
+        self.pdf_export_path = os.path.dirname(filename)
+        self.save_user_preferences()
+        return filename
+
+    def start_export(self, writer, title):
+        """Запускає потоковий експорт поточного результату у фоновому потоці"""
+        from PyQt6.QtWidgets import QProgressDialog, QMessageBox
+
+        if self.export_worker is not None:
+            QMessageBox.information(self, title, "Попередній експорт ще виконується")
             return
 
-        try:
-            doc = Document()
-            doc.add_heading("Результати SQL-запиту", 0)
-            doc.add_paragraph(f"SQL запит: {query}")
-            doc.add_paragraph(f"Час створення: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}")
-            doc.add_paragraph("")  # Відступ
-
-            col_count = self.table.columnCount()
-            row_count = self.table.rowCount()
-            if col_count == 0:
-                QMessageBox.warning(self, "Word Export", "Немає даних для експорту!")
+        source = self.result_source
+        if source.get("rerunnable", True):
+            worker = ExportWorker(self.connections, source["db_path"], source["statements"], writer, self.authorizer)
+        else:
+            model = next(r["model"] for r in self.results if r["source"] is source)
+            if model.has_more:
+                QMessageBox.information(
+                    self, title, "Цей результат отримано разом зі змінами даних, тож запит не виконується "
+                    "повторно. Експортуються лише завантажені рядки, а їх ще не всі - прокрутіть таблицю до кінця.")
                 return
+            if source.get("truncated"):
+                QMessageBox.information(
+                    self, title, "Цей результат отримано разом зі змінами даних, тож запит не виконується "
+                    "повторно, а завантажені рядки - не весь результат.")
+                return
+            worker = ExportWorker(self.connections, source["db_path"], source["statements"], writer,
+                                  columns=model.columns, rows=list(model.rows))
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(self.on_export_progress)
+        worker.status.connect(self.on_export_status)
+        worker.done.connect(self.on_export_done)
+        worker.failed.connect(self.on_export_failed)
+        worker.done.connect(thread.quit)
+        worker.failed.connect(thread.quit)
+        thread.finished.connect(self.on_export_thread_finished)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+
+        self.export_progress = QProgressDialog("Експорт...", "Скасувати", 0, 0, self)
+        self.export_progress.setWindowTitle(title)
+        self.export_progress.setWindowModality(Qt.WindowModality.WindowModal)
+        self.export_progress.canceled.connect(worker.cancel)
+        self.export_progress.show()
+
+        self.export_title = title
+        self.export_worker = worker
+        self.export_thread = thread
+        thread.start()
+
+    def on_export_progress(self, exported):
+        if self.export_progress is not None:
+            self.export_progress.setLabelText(f"Експортовано рядків: {exported}")
+
+    def on_export_status(self, text):
+        if self.export_progress is not None:
+            self.export_progress.setLabelText(text)
+
+    def on_export_done(self, filename):
+        from PyQt6.QtWidgets import QMessageBox
+        self.finish_export()
+        QMessageBox.information(self, self.export_title, f"Файл успішно збережено як:\n{filename}")
 
-            table = doc.add_table(rows=row_count + 1, cols=col_count)
-            table.style = 'Table Grid'
-
-            # Заголовки (без використання XML напряму)
-            hdr_cells = table.rows[0].cells
-            for i in range(col_count):
-                cell = hdr_cells[i]
-                cell.text = self.table.horizontalHeaderItem(i).text()
-                for paragraph in cell.paragraphs:
-                    paragraph.alignment = 1  # CENTER
-                    for run in paragraph.runs:
-                        run.font.bold = True
-                        run.font.size = Pt(11)
-
-            # Дані
-            for row in range(row_count):
-                row_cells = table.rows[row + 1].cells
-                for col in range(col_count):
-                    item = self.table.item(row, col)
-                    row_cells[col].text = item.text() if item else ""
-                    for p in row_cells[col].paragraphs:
-                        p.alignment = 1  # CENTER
-                        for run in p.runs:
-                            run.font.size = Pt(10)
-
-            doc.save(filename)
-            QMessageBox.information(self, "Word Export", f"Файл успішно збережено як:\n{filename}")
-            
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            QMessageBox.critical(self, "Помилка експорту", f"Не вдалося створити Word файл.\nПомилка: {str(e)}")
+    def on_export_failed(self, message):
+        from PyQt6.QtWidgets import QMessageBox
+        self.finish_export()
+        print(f"Помилка експорту: {message}")
+        QMessageBox.critical(self, "Помилка експорту", f"Не вдалося створити файл.\nПомилка: {message}")
 
-    def export_to_excel(self):
-        from PyQt6.QtWidgets import QFileDialog, QMessageBox
-        from datetime import datetime
-        from openpyxl.styles import PatternFill
+    def on_export_thread_finished(self):
+        self.export_thread = None
 
-        query = self.query_input.text()
-        if not query:
-            QMessageBox.warning(self, "Excel Export", "Немає даних для експорту!")
-            return
+    def finish_export(self):
+        self.export_worker = None
+        if self.export_progress is not None:
+            self.export_progress.canceled.disconnect()
+            self.export_progress.close()
+            self.export_progress = None
 
-        suggested_name = self.generate_pdf_filename(query).replace('.pdf', '.xlsx')
-        if not self.pdf_export_path or not os.path.exists(self.pdf_export_path):
-            self.pdf_export_path = os.path.expanduser("~/Documents")
-        suggested_path = os.path.join(self.pdf_export_path, suggested_name)
+    def export_to_pdf(self):
+        filename = self.ask_export_filename("PDF Export", "Зберегти як PDF", ".pdf", "PDF Files (*.pdf)")
+        if filename:
+            self.start_export(PdfExportWriter(filename, self.result_source["query"]), "PDF Export")
 
-        filename, _ = QFileDialog.getSaveFileName(
-            self,
-            "Зберегти як Excel",
-            suggested_path,
-            "Excel Files (*.xlsx)"
-        )
-        if not filename:
-            return
+    def export_to_word(self):
+        filename = self.ask_export_filename("Word Export", "Зберегти як Word", ".docx", "Word Files (*.docx)")
+        if filename:
+            self.start_export(DocxExportWriter(filename, self.result_source["query"]), "Word Export")
 
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "SQL Results"
-
-        col_count = self.table.columnCount()
-        row_count = self.table.rowCount()
-        if col_count == 0:
-            QMessageBox.warning(self, "Excel Export", "Немає даних для експорту!")
-            return
-
-        # Заголовки
-        headers = [self.table.horizontalHeaderItem(i).text() for i in range(col_count)]
-        ws.append(headers)
-        header_fill = PatternFill(start_color="1976d2", end_color="1976d2", fill_type="solid")
-        for cell in ws[1]:
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-            cell.fill = header_fill
-
-        # Дані
-        for row in range(row_count):
-            row_data = []
-            for col in range(col_count):
-                item = self.table.item(row, col)
-                row_data.append(item.text() if item else "")
-            ws.append(row_data)
-
-        # Автоширина колонок
-        for col in ws.columns:
-            max_length = 0
-            col_letter = col[0].column_letter
-            for cell in col:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except Exception:
-                    pass
-            ws.column_dimensions[col_letter].width = max(10, min(max_length + 2, 40))
+    def show_chart(self):
+        """Графік результату на активній вкладці; дані агрегує SQLite, а не Python"""
+        from PyQt6.QtWidgets import QMessageBox
+        source = self.result_source
+        entry = next((r for r in self.results if r["source"] is source), None)
+        if not source or not source["statements"] or entry is None or not entry["model"].columns:
+            QMessageBox.information(self, "Графік", "Немає результату для побудови графіка")
+            return
+        statement = source["statements"][-1]
+        if not is_read_only_sql([statement]) or not source.get("rerunnable", True):
+            QMessageBox.information(self, "Графік", "Графік можна побудувати лише для запиту SELECT, "
+                                    "який не залежить від змін, зроблених раніше в тому ж пакеті")
+            return
+        if self.chart_dialog is not None:
+            self.chart_dialog.close()
+        self.chart_dialog = ChartDialog(self.connections, source["db_path"], statement, entry["model"].columns,
+                                        self.authorizer, self)
+        self.chart_dialog.show()
 
-        try:
-            wb.save(filename)
-            QMessageBox.information(self, "Excel Export", f"Файл успішно збережено як:\n{filename}")
-        except Exception as e:
-            QMessageBox.critical(self, "Помилка експорту", f"Не вдалося створити Excel файл.\nПомилка: {str(e)}")
+    def export_to_excel(self):
+        filename = self.ask_export_filename("Excel Export", "Зберегти як Excel", ".xlsx", "Excel Files (*.xlsx)")
+        if filename:
+            self.start_export(XlsxExportWriter(filename, self.result_source["query"]), "Excel Export")
 
 # === Add these debug functions at the bottom of the file, before the if __name__ == "__main__": block ===
 def debug_print(message):
@@ -1414,17 +3570,70 @@ def initialize_database():
         debug_print(f"Error initializing database: {e}")
         raise
 
+# Модулі, що завантажуються лише під час першого використання відповідної функції
+DEFERRED_MODULES = [
+    ("ШІ (g4f)", "g4f.client"),
+    ("Голосове введення", "speech_recognition"),
+    ("Експорт PDF", "reportlab.platypus"),
+    ("Експорт Word", "docx"),
+    ("Експорт Excel", "openpyxl"),
+    ("Графіки", "PyQt6.QtCharts"),
+]
+
+class StartupProfiler:
+    """Позначки часу запуску для --profile-startup, відлік від початку імпорту mix.py"""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.marks = [("Імпорт модуля", time.perf_counter())]
+
+    def mark(self, label):
+        if self.enabled:
+            self.marks.append((label, time.perf_counter()))
+
+    def report(self):
+        if not self.enabled:
+            return
+        print("=== Профіль запуску ===")
+        previous = STARTUP_STARTED
+        for label, moment in self.marks:
+            print(f"{label:<32}{(moment - previous) * 1000:9.1f} мс  (від старту {(moment - STARTUP_STARTED) * 1000:.1f} мс)")
+            previous = moment
+        loaded = [module for _, module in DEFERRED_MODULES if module in sys.modules]
+        print(f"Відкладені модулі, завантажені до входу: {', '.join(loaded) or 'немає'}")
+        # Ціна кожної відкладеної підсистеми при першому використанні
+        for label, module in DEFERRED_MODULES:
+            started = time.perf_counter()
+            try:
+                importlib.import_module(module)
+                status = f"{(time.perf_counter() - started) * 1000:9.1f} мс"
+            except Exception as e:
+                status = f"недоступно ({e.__class__.__name__})"
+            print(f"  {label:<30}{status}")
+
 # Update the main execution block with debug statements
 if __name__ == "__main__":
     try:
+        profiler = StartupProfiler("--profile-startup" in sys.argv)
+        if profiler.enabled:
+            sys.argv.remove("--profile-startup")
         debug_print("Starting application")
         app = QApplication(sys.argv)
+        profiler.mark("QApplication")
         
         debug_print("Initializing database")
         initialize_database()
+        profiler.mark("Ініціалізація баз даних")
         
         debug_print("Creating login dialog")
         login_dialog = LoginDialog()
+        profiler.mark("Створення вікна входу")
+        if profiler.enabled:
+            # Перша ітерація циклу подій після показу діалогу
+            def on_login_visible():
+                profiler.mark("Вікно входу показано")
+                profiler.report()
+            QTimer.singleShot(0, on_login_visible)
         debug_print("Showing login dialog")
         result = login_dialog.exec()
         debug_print(f"Login dialog result: {result}")
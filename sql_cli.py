@@ -0,0 +1,178 @@
+"""Командний рядок SQL Viewer: виконання SQL-файлів і закріплених запитів без графічного інтерфейсу.
+
+Приклади:
+    python sql_cli.py --db project_management.db --user admin --sql report.sql -o report.xlsx
+    python sql_cli.py --db project_management.db --user admin --favorite "Проєкти" --format pdf
+    python sql_cli.py --db project_management.db --user admin --sql a.sql b.sql --jobs 4 --output-dir out
+"""
+import argparse
+import getpass
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from sql_core import (
+    EXPORT_WRITERS, ConnectionManager, PermissionSet, QueryExport, authenticate, is_read_only_sql,
+    load_favorites, split_sql_statements
+)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Виконує SQL-файли або закріплені запити та зберігає результат у CSV/XLSX/PDF/DOCX")
+    parser.add_argument("--db", required=True, help="шлях до бази даних SQLite")
+    parser.add_argument("--user", required=True, help="ім'я користувача з user_management.db")
+    parser.add_argument("--password", help="пароль (або змінна середовища SQL_VIEWER_PASSWORD)")
+    parser.add_argument("--users-db", default="user_management.db", help="база користувачів і прав доступу")
+    parser.add_argument("--sql", nargs="+", default=[], metavar="FILE", help="SQL-файли, кожен - окреме завдання")
+    parser.add_argument("--query", action="append", default=[], help="SQL-запит прямо в командному рядку")
+    parser.add_argument("--favorite", action="append", default=[], metavar="NAME",
+                        help="назва закріпленого запиту")
+    parser.add_argument("--all-favorites", action="store_true", help="виконати всі закріплені запити")
+    parser.add_argument("--list-favorites", action="store_true", help="показати закріплені запити та вийти")
+    parser.add_argument("--format", choices=sorted(EXPORT_WRITERS), help="формат результату (типово csv)")
+    parser.add_argument("-o", "--output", help="файл результату для одного завдання; '-' - CSV у stdout")
+    parser.add_argument("--output-dir", default=".", help="каталог для результатів кількох завдань")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="скільки завдань виконувати паралельно")
+    return parser.parse_args(argv)
+
+def collect_jobs(args, user_id):
+    """Список завдань (назва, SQL) у порядку аргументів"""
+    jobs = []
+    for path in args.sql:
+        with open(path, "r", encoding="utf-8") as f:
+            jobs.append((os.path.splitext(os.path.basename(path))[0], f.read()))
+    for i, query in enumerate(args.query, start=1):
+        jobs.append((f"query_{i}", query))
+    if args.favorite or args.all_favorites:
+        favorites = load_favorites(user_id, args.users_db)
+        by_name = {name: query for name, query in favorites if name}
+        if args.all_favorites:
+            for i, (name, query) in enumerate(favorites, start=1):
+                jobs.append((name or f"favorite_{i}", query))
+        for name in args.favorite:
+            if name not in by_name:
+                raise ValueError(f"Закріплений запит '{name}' не знайдено")
+            jobs.append((name, by_name[name]))
+    return jobs
+
+def output_paths(args, jobs, fmt):
+    """Ім'я файлу для кожного завдання; однакові назви отримують суфікс"""
+    if args.output:
+        return [args.output]
+    paths = []
+    used = set()
+    for name, _ in jobs:
+        stem = re.sub(r"[^\w\-]+", "_", name).strip("_") or "result"
+        candidate, n = stem, 1
+        while candidate in used:
+            n += 1
+            candidate = f"{stem}_{n}"
+        used.add(candidate)
+        paths.append(os.path.join(args.output_dir, f"{candidate}.{fmt}"))
+    return paths
+
+def run_job(connections, db_path, permissions, name, sql, filename, fmt, allow_writes=True):
+    """Виконує одне завдання; повертає кількість рядків, тривалість і чи створено файл результату"""
+    statements = split_sql_statements(sql)
+    if not statements:
+        raise ValueError("Порожній запит")
+    if permissions is not None:
+        conn = connections.acquire(db_path, readonly=True)
+        try:
+            if not permissions.check_statements(conn, statements):
+                raise PermissionError("У вас немає прав на виконання цього запиту")
+        finally:
+            connections.release(conn)
+    started = time.perf_counter()
+    writer = EXPORT_WRITERS[fmt](filename, sql)
+    if filename != "-":
+        writer.status_callback = lambda text: print(f"[{name}] {text}", file=sys.stderr)
+    # CLI виконує SQL-файли як сценарії: зміни даних у них застосовуються
+    export = QueryExport(connections, db_path, statements, writer,
+                         permissions, allow_writes=allow_writes)
+    rows = export.run()
+    return rows, time.perf_counter() - started, export.opened
+
+def main(argv=None):
+    args = parse_args(argv)
+    password = args.password or os.environ.get("SQL_VIEWER_PASSWORD")
+    if password is None:
+        password = getpass.getpass("Пароль: ")
+    user = authenticate(args.user, password, args.users_db)
+    if not user:
+        print("Невірний логін або пароль", file=sys.stderr)
+        return 2
+    user_id, role = user
+
+    if args.list_favorites:
+        for name, query in load_favorites(user_id, args.users_db):
+            print(f"{name or '-'}\t{' '.join(query.split())}")
+        return 0
+
+    if not os.path.exists(args.db):
+        print(f"База даних не знайдена: {args.db}", file=sys.stderr)
+        return 2
+    try:
+        jobs = collect_jobs(args, user_id)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    if not jobs:
+        print("Немає завдань: вкажіть --sql, --query, --favorite або --all-favorites", file=sys.stderr)
+        return 2
+    if args.output and len(jobs) > 1:
+        print("--output можна вказати лише для одного завдання, для кількох - --output-dir", file=sys.stderr)
+        return 2
+
+    fmt = args.format
+    if fmt is None and args.output and args.output != "-":
+        fmt = os.path.splitext(args.output)[1].lstrip(".").lower()
+    fmt = fmt or "csv"
+    if fmt not in EXPORT_WRITERS:
+        print(f"Невідомий формат: {fmt}", file=sys.stderr)
+        return 2
+    if args.output == "-" and fmt != "csv":
+        print("У stdout можна виводити лише CSV", file=sys.stderr)
+        return 2
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    # Адміністратор має всі права, для інших діє той самий authorizer, що й у графічному застосунку
+    try:
+        permissions = None if role == "admin" else PermissionSet.load(user_id, args.users_db)
+    except sqlite3.Error as e:
+        print(f"Не вдалося завантажити права доступу з {args.users_db}: {e}", file=sys.stderr)
+        return 2
+    db_path = os.path.abspath(args.db)
+    # Якщо жодне завдання не змінює дані, база відкривається лише з mode=ro - файл (і режим журналу)
+    # лишається незмінним. journal_mode серед PRAGMA ConnectionManager за замовчуванням немає
+    allow_writes = not all(is_read_only_sql(split_sql_statements(sql)) for _, sql in jobs)
+    connections = ConnectionManager()
+    failed = 0
+    # Кожне завдання виконується на власному з'єднанні з пулу
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        futures = {
+            executor.submit(run_job, connections, db_path, permissions, name, sql, filename, fmt,
+                            allow_writes): (name, filename)
+            for (name, sql), filename in zip(jobs, output_paths(args, jobs, fmt))
+        }
+        for future in as_completed(futures):
+            name, filename = futures[future]
+            try:
+                rows, seconds, written = future.result()
+                if written:
+                    print(f"✅ {name}: {rows} рядків -> {filename} ({seconds:.2f} с)", file=sys.stderr)
+                else:
+                    print(f"✅ {name}: зміни застосовано, рядків для експорту немає ({seconds:.2f} с)",
+                          file=sys.stderr)
+            except Exception as e:
+                failed += 1
+                print(f"❌ {name}: {e}", file=sys.stderr)
+    connections.close_all()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
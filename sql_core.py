@@ -0,0 +1,2957 @@
+"""Незалежне від GUI ядро SQL Viewer: з'єднання, права доступу, схема, історія та експорт.
+
+Використовується графічним застосунком (mix.py) і командним рядком (sql_cli.py).
+"""
+import sys
+import sqlite3
+import os
+import json
+import re
+import time
+import hashlib
+import math
+import csv
+import io
+import itertools
+from difflib import SequenceMatcher
+import threading
+import tracemalloc
+from xml.sax.saxutils import escape
+from urllib.request import pathname2url
+
+# Інструкції, які самі керують транзакцією і не можуть виконуватися всередині BEGIN ... COMMIT
+NO_TRANSACTION_KEYWORDS = ("begin", "commit", "end", "rollback", "savepoint", "release",
+                           "vacuum", "attach", "detach")
+
+# Шрифти з кирилицею для PDF: (звичайний, жирний) у порядку переваги
+PDF_FONT_CANDIDATES = [
+    ("C:/Windows/Fonts/arial.ttf", "C:/Windows/Fonts/arialbd.ttf"),
+    ("/Library/Fonts/Arial.ttf", "/Library/Fonts/Arial Bold.ttf"),
+    ("/System/Library/Fonts/Supplemental/Arial.ttf", "/System/Library/Fonts/Supplemental/Arial Bold.ttf"),
+    ("/usr/share/fonts/truetype/msttcorefonts/Arial.ttf", "/usr/share/fonts/truetype/msttcorefonts/Arial_Bold.ttf"),
+    ("/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+     "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf"),
+    ("/usr/share/fonts/liberation-sans/LiberationSans-Regular.ttf",
+     "/usr/share/fonts/liberation-sans/LiberationSans-Bold.ttf"),
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/dejavu-sans-fonts/DejaVuSans.ttf", "/usr/share/fonts/dejavu-sans-fonts/DejaVuSans-Bold.ttf"),
+]
+_pdf_fonts = None
+
+def register_pdf_fonts():
+    """Реєструє шрифт для PDF при першому експорті; повертає (звичайний, жирний)"""
+    global _pdf_fonts
+    if _pdf_fonts is not None:
+        return _pdf_fonts
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    for regular, bold in PDF_FONT_CANDIDATES:
+        if not (os.path.exists(regular) and os.path.exists(bold)):
+            continue
+        try:
+            pdfmetrics.registerFont(TTFont("Arial", regular))
+            pdfmetrics.registerFont(TTFont("Arial-Bold", bold))
+            _pdf_fonts = ("Arial", "Arial-Bold")
+            return _pdf_fonts
+        except Exception as e:
+            print(f"Не вдалося зареєструвати шрифт {regular}: {e}")
+    # Вбудований Helvetica не містить кирилиці, але експорт не падає
+    _pdf_fonts = ("Helvetica", "Helvetica-Bold")
+    return _pdf_fonts
+
+def split_sql_statements(script):
+    """Розбиває SQL-скрипт на інструкції; крапка з комою в рядках, коментарях і тригерах не розриває інструкцію"""
+    statements = []
+    buffer = ""
+    for part in script.split(";"):
+        buffer += part + ";"
+        # sqlite3.complete_statement враховує лапки, коментарі та BEGIN ... END тригерів
+        if sqlite3.complete_statement(buffer):
+            statement = buffer.strip()[:-1].strip()
+            if not is_blank_sql(statement):
+                statements.append(statement)
+            buffer = ""
+    tail = buffer[:-1].strip()  # Остання інструкція без крапки з комою
+    if not is_blank_sql(tail):
+        statements.append(tail)
+    return statements
+
+def is_blank_sql(text):
+    """Чи містить фрагмент лише пробіли та коментарі ("SELECT 1; -- примітка" дає такий хвіст)"""
+    text = text.lstrip()
+    while text:
+        if text.startswith("--"):
+            end = text.find("\n")
+            text = "" if end == -1 else text[end + 1:].lstrip()
+        elif text.startswith("/*"):
+            end = text.find("*/", 2)
+            text = "" if end == -1 else text[end + 2:].lstrip()
+        else:
+            return False
+    return True
+
+def first_keyword(statement):
+    words = statement.lstrip("( \t\r\n").split(None, 1)
+    return words[0].lower() if words else ""
+
+def is_read_only_sql(queries):
+    """Чи складається пакет лише із запитів на читання (без зміни даних чи схеми)"""
+    write_keywords = ("insert", "update", "delete", "replace", "create", "drop", "alter")
+    for q in queries:
+        words = q.lstrip("( \t\r\n").lower().split()
+        if not words:
+            continue
+        if words[0] in ("select", "values", "explain"):
+            continue
+        if words[0] == "with" and not any(w in write_keywords for w in words):
+            continue
+        return False
+    return True
+
+def is_authorization_error(message):
+    """Чи є помилка SQLite відмовою authorizer-а"""
+    return "not authorized" in message or "is prohibited" in message
+
+class PermissionSet:
+    """Table permissions of one user, loaded once at login and enforced through Connection.set_authorizer"""
+    # Якщо для таблиці немає правила: читати можна, змінювати - ні
+    DEFAULTS = {"select": True, "insert": False, "update": False, "delete": False}
+    # Дії, що не стосуються доступу до даних конкретних таблиць
+    ALWAYS_ALLOWED = {
+        sqlite3.SQLITE_SELECT, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_TRANSACTION,
+        sqlite3.SQLITE_SAVEPOINT, sqlite3.SQLITE_RECURSIVE,
+    }
+    TABLE_ACTIONS = {
+        sqlite3.SQLITE_READ: "select",
+        sqlite3.SQLITE_INSERT: "insert",
+        sqlite3.SQLITE_UPDATE: "update",
+        sqlite3.SQLITE_DELETE: "delete",
+    }
+
+    def __init__(self, user_id, rules=None):
+        self.user_id = user_id
+        self.rules = rules or {}  # table name (lower case) -> {"select": bool, ...}
+
+    @classmethod
+    def load(cls, user_id, db_path="user_management.db"):
+        """Читає всі правила користувача одним запитом"""
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute(
+                "SELECT table_name, can_select, can_insert, can_update, can_delete "
+                "FROM user_permissions WHERE user_id=?", (user_id,)).fetchall()
+        finally:
+            conn.close()
+        rules = {}
+        for table_name, can_select, can_insert, can_update, can_delete in rows:
+            rules[table_name.lower()] = {"select": can_select == 1, "insert": can_insert == 1,
+                                         "update": can_update == 1, "delete": can_delete == 1}
+        return cls(user_id, rules)
+
+    def allows(self, table_name, operation):
+        rule = self.rules.get(table_name.lower(), self.DEFAULTS)
+        return rule.get(operation, False)
+
+    def authorizer_for(self, conn):
+        """Callback для set_authorizer на цьому з'єднанні; викликається SQLite для кожної таблиці запиту.
+
+        П'ятий аргумент SQLite - найглибший тригер або представлення, через яке йде доступ. Без перевірки
+        лишаються тільки тіла справжніх тригерів бази; читання через представлення перевіряється
+        за таблицею під ним.
+        """
+        triggers = {name for name, in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='trigger' "
+            "UNION SELECT name FROM sqlite_temp_master WHERE type='trigger' "
+            "EXCEPT SELECT name FROM sqlite_master WHERE type='view' "
+            "EXCEPT SELECT name FROM sqlite_temp_master WHERE type='view'")}
+
+        def authorizer(action, arg1, arg2, db_name, source):
+            return self.check_action(action, arg1, source is not None and source in triggers)
+        return authorizer
+
+    def check_action(self, action, table_name, in_trigger=False):
+        if action in self.ALWAYS_ALLOWED:
+            return sqlite3.SQLITE_OK
+        operation = self.TABLE_ACTIONS.get(action)
+        if operation is None:
+            # DDL, PRAGMA, ATTACH тощо доступні лише адміністратору
+            return sqlite3.SQLITE_DENY
+        if in_trigger:
+            # Дії всередині тригерів визначив адміністратор - перевіряється лише сам запит користувача
+            return sqlite3.SQLITE_OK
+        if operation == "select" and table_name.startswith("sqlite_"):
+            return sqlite3.SQLITE_OK
+        return sqlite3.SQLITE_OK if self.allows(table_name, operation) else sqlite3.SQLITE_DENY
+
+    def check_statements(self, conn, statements):
+        """Pre-flight check: preparing EXPLAIN <stmt> runs the authorizer without executing anything"""
+        conn.set_authorizer(self.authorizer_for(conn))
+        try:
+            for statement in statements:
+                try:
+                    conn.execute(f"EXPLAIN {statement}").fetchall()
+                except sqlite3.DatabaseError as e:
+                    if is_authorization_error(str(e)):
+                        return False
+                    # Інші помилки (напр. таблиця створюється раніше в пакеті) покаже саме виконання
+        finally:
+            conn.set_authorizer(None)
+        return True
+
+def bind_authorizer(conn, authorizer):
+    """Callback для set_authorizer: PermissionSet прив'язується до з'єднання (список його тригерів)"""
+    if authorizer is not None and hasattr(authorizer, "authorizer_for"):
+        return authorizer.authorizer_for(conn)
+    return authorizer
+
+class ConnectionManager:
+    """Keeps warm SQLite connections per db_path so the page cache and parsed schema survive between queries"""
+    DEFAULT_PRAGMAS = {
+        "cache_size": -65536,       # від'ємне значення - розмір у KiB (64 MiB)
+        "mmap_size": 268435456,     # 256 MiB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,       # мс
+    }
+    # journal_mode навмисно не задається: WAL зберігається у файлі й назавжди змінив би базу
+    # користувача (плюс файли -wal/-shm поруч). Увімкнути можна явно: pragmas={"journal_mode": "WAL"}
+    MAX_IDLE_PER_DB = 4
+
+    def __init__(self, pragmas=None):
+        self.pragmas = dict(self.DEFAULT_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+        self._main = {}   # db_path -> з'єднання для GUI-потоку
+        self._idle = {}   # (db_path, readonly) -> вільні з'єднання для фонових виконавців
+        self._lock = threading.Lock()
+
+    def get(self, db_path):
+        """Постійне з'єднання для коротких запитів з GUI-потоку (схема, службові запити)"""
+        conn = self._main.get(db_path)
+        if conn is None:
+            conn = self._open(db_path, readonly=False, check_same_thread=True)
+            self._main[db_path] = conn
+        return conn
+
+    def acquire(self, db_path, readonly=True, authorizer=None):
+        """Видає з'єднання з пулу для фонового потоку; повертати через release()"""
+        key = (db_path, readonly)
+        conn = None
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+        if conn is None:
+            conn = self._open(db_path, readonly=readonly, check_same_thread=False)
+            conn.pool_key = key
+        conn.set_authorizer(bind_authorizer(conn, authorizer))
+        return conn
+
+    def release(self, conn):
+        """Повертає з'єднання в пул; незавершена транзакція відкочується"""
+        try:
+            conn.set_authorizer(None)
+            conn.set_trace_callback(None)
+            conn.set_progress_handler(None, 0)
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        with self._lock:
+            idle = self._idle.setdefault(conn.pool_key, [])
+            if len(idle) < self.MAX_IDLE_PER_DB:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        """Закриває всі з'єднання (під час виходу з програми)"""
+        with self._lock:
+            pooled = [c for conns in self._idle.values() for c in conns]
+            self._idle.clear()
+        for conn in pooled + list(self._main.values()):
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._main.clear()
+
+    def _open(self, db_path, readonly, check_same_thread):
+        # isolation_level=None: транзакціями керують виконавці явними BEGIN/COMMIT
+        if readonly:
+            uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+            conn = _PooledConnection(uri, uri=True, check_same_thread=check_same_thread, isolation_level=None)
+        else:
+            conn = _PooledConnection(db_path, check_same_thread=check_same_thread, isolation_level=None)
+        for name, value in self.pragmas.items():
+            # Режим журналу зберігається у файлі БД - з'єднання лише для читання його не змінюють
+            if readonly and name == "journal_mode":
+                continue
+            try:
+                conn.execute(f"PRAGMA {name}={value}").fetchall()
+            except sqlite3.Error as e:
+                print(f"Не вдалося застосувати PRAGMA {name}: {e}")
+        return conn
+
+class _PooledConnection(sqlite3.Connection):
+    """sqlite3.Connection, якому можна присвоїти ключ пулу"""
+    pool_key = None
+
+class QueryProfiler:
+    """Фази виконання кожної інструкції: підготовка, виконання, вибірка рядків, а також кроки VM і пам'ять.
+
+    Початок виконання фіксує trace callback (SQLite викликає його на першому кроці вже підготовленої
+    інструкції), обсяг роботи рахує progress handler. tracemalloc уповільнює всі потоки процесу
+    в рази, тож пам'ять за замовчуванням не відстежується - для неї є окремий прохід measure_query_memory().
+    """
+    PROGRESS_INTERVAL = 1000  # VM-інструкцій між викликами progress handler
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.statements = []
+        self._owns_tracemalloc = False
+        self._started = None
+        self._traced = None
+        self._executed = None
+        self._progress_calls = 0
+        self._fetch = 0.0
+        self._run_started = None
+
+    def attach(self, conn):
+        self._run_started = time.perf_counter()
+        conn.set_trace_callback(self._on_trace)
+        conn.set_progress_handler(self._on_progress, self.PROGRESS_INTERVAL)
+        if self.track_memory:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                self._owns_tracemalloc = True
+            self._memory_start = tracemalloc.get_traced_memory()[0]
+
+    def detach(self, conn):
+        """Знімає обробники; повертає підсумок усього пакета"""
+        conn.set_trace_callback(None)
+        conn.set_progress_handler(None, 0)
+        summary = {
+            "total_ms": round((time.perf_counter() - self._run_started) * 1000, 2),
+            "vm_steps": sum(s["vm_steps"] for s in self.statements),
+            "rows": sum(s["rows"] for s in self.statements),
+            "peak_memory_kb": None,
+        }
+        for phase in ("prepare_ms", "execute_ms", "fetch_ms"):
+            summary[phase] = round(sum(s[phase] for s in self.statements), 2)
+        if self.track_memory and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            summary["peak_memory_kb"] = round(max(0, peak - self._memory_start) / 1024, 1)
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+                self._owns_tracemalloc = False
+        return summary
+
+    def _on_trace(self, statement):
+        # Тригери та вкладені інструкції теж потрапляють сюди - враховується лише перший виклик
+        if self._traced is None:
+            self._traced = time.perf_counter()
+
+    def _on_progress(self):
+        self._progress_calls += 1
+        return 0  # Ненульове значення перервало б запит
+
+    def begin_statement(self):
+        self._started = time.perf_counter()
+        self._traced = None
+        self._executed = None
+        self._progress_calls = 0
+        self._fetch = 0.0
+
+    def executed(self):
+        """Викликається одразу після cursor.execute()"""
+        self._executed = time.perf_counter()
+
+    def add_fetch(self, seconds):
+        self._fetch += seconds
+
+    def end_statement(self, rows):
+        traced = self._traced or self._executed
+        profile = {
+            "prepare_ms": round((traced - self._started) * 1000, 3),
+            "execute_ms": round((self._executed - traced) * 1000, 3),
+            "fetch_ms": round(self._fetch * 1000, 3),
+            "vm_steps": self._progress_calls * self.PROGRESS_INTERVAL,
+            "rows": rows,
+        }
+        self.statements.append(profile)
+        return profile
+
+def measure_query_memory(conn, statements):
+    """Пікова пам'ять Python (КБ) для читання всіх рядків пакета - окремим проходом під tracemalloc.
+
+    Час цього проходу не вимірюється: під tracemalloc він нерепрезентативний. Лише для пакетів без змін даних.
+    """
+    if not is_read_only_sql(statements):
+        raise ValueError("Пам'ять вимірюється лише для запитів, що не змінюють дані")
+    owns = not tracemalloc.is_tracing()
+    if owns:
+        tracemalloc.start()
+    else:
+        tracemalloc.reset_peak()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        for statement in statements:
+            rows = conn.execute(statement).fetchall()
+            del rows
+        return round(max(0, tracemalloc.get_traced_memory()[1] - start) / 1024, 1)
+    finally:
+        if owns:
+            tracemalloc.stop()
+
+def quote_identifier(name):
+    """Екранує ім'я таблиці чи колонки для підстановки в SQL"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+class TableInfo:
+    """Опис таблиці чи представлення в каталозі схеми"""
+
+    def __init__(self, name, kind, sql):
+        self.name = name
+        self.kind = kind            # 'table' або 'view'
+        self.sql = sql
+        self.columns = []           # PRAGMA table_info rows: (cid, name, type, notnull, default, pk)
+        self.indexes = {}           # index name -> {"unique": bool, "columns": [...]}
+        self.foreign_keys = []      # (column, ref_table, ref_column)
+
+    @property
+    def column_names(self):
+        return [col[1] for col in self.columns]
+
+class DatabaseSchema:
+    """Знімок схеми однієї бази даних на певному PRAGMA schema_version"""
+
+    def __init__(self, version):
+        self.version = version
+        self.fingerprint = ""  # хеш DDL усіх об'єктів - не залежить від шляху до файлу
+        self.objects = {}  # name -> TableInfo
+
+    @property
+    def tables(self):
+        """Таблиці користувача (без службових sqlite_*)"""
+        return [name for name, info in self.objects.items()
+                if info.kind == "table" and not name.startswith("sqlite_")]
+
+    @property
+    def views(self):
+        return [name for name, info in self.objects.items() if info.kind == "view"]
+
+class SchemaCatalog:
+    """Caches table, column, index and foreign key metadata per database until PRAGMA schema_version changes"""
+
+    def __init__(self, connections):
+        self.connections = connections
+        self._schemas = {}  # db_path -> DatabaseSchema
+        self._listings = {}  # db_path -> (schema_version, [(type, name, tbl_name)])
+
+    def get(self, db_path):
+        """Актуальна схема бази; повторне читання лише якщо схема змінилась"""
+        conn = self.connections.get(db_path)
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        schema = self._schemas.get(db_path)
+        if schema is None or schema.version != version:
+            schema = self._load(conn, version)
+            self._schemas[db_path] = schema
+        return schema
+
+    def objects(self, db_path):
+        """(schema_version, [(тип, назва, таблиця)]) усіх об'єктів - одним запитом, без стовпців та індексів"""
+        conn = self.connections.get(db_path)
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        listing = self._listings.get(db_path)
+        if listing is None or listing[0] != version:
+            listing = (version, conn.execute(
+                "SELECT type, name, tbl_name FROM sqlite_master WHERE name NOT LIKE 'sqlite\\_%' ESCAPE '\\' "
+                "ORDER BY name COLLATE NOCASE").fetchall())
+            self._listings[db_path] = listing
+        return listing
+
+    def table(self, db_path, name):
+        """TableInfo однієї таблиці чи представлення; без завантаження всієї схеми, якщо її ще немає в кеші"""
+        conn = self.connections.get(db_path)
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        schema = self._schemas.get(db_path)
+        if schema is not None and schema.version == version:
+            return schema.objects.get(name)
+        row = conn.execute("SELECT type, sql FROM sqlite_master WHERE name = ? AND type IN ('table', 'view')",
+                           (name,)).fetchone()
+        if row is None:
+            return None
+        info = TableInfo(name, row[0], row[1])
+        info.columns = conn.execute(
+            "SELECT cid, name, type, \"notnull\", dflt_value, pk FROM pragma_table_info(?) ORDER BY cid",
+            (name,)).fetchall()
+        for index, unique, column in conn.execute(
+                "SELECT il.name, il.\"unique\", ii.name FROM pragma_index_list(?) il, pragma_index_info(il.name) ii "
+                "ORDER BY il.name, ii.seqno", (name,)):
+            info.indexes.setdefault(index, {"unique": bool(unique), "columns": []})["columns"].append(column)
+        info.foreign_keys = conn.execute(
+            "SELECT \"from\", \"table\", \"to\" FROM pragma_foreign_key_list(?) ORDER BY id, seq",
+            (name,)).fetchall()
+        return info
+
+    def invalidate(self, db_path=None):
+        if db_path is None:
+            self._schemas.clear()
+            self._listings.clear()
+        else:
+            self._schemas.pop(db_path, None)
+            self._listings.pop(db_path, None)
+
+    def _load(self, conn, version):
+        # Табличні функції pragma_* дають усю схему кількома запитами замість запиту на кожну таблицю
+        schema = DatabaseSchema(version)
+        digest = hashlib.sha256()
+        for name, kind, sql in conn.execute(
+                "SELECT name, type, sql FROM sqlite_master ORDER BY type, name"):
+            digest.update(f"{kind}:{name}:{sql}\n".encode("utf-8"))
+            if kind in ("table", "view"):
+                schema.objects[name] = TableInfo(name, kind, sql)
+        schema.fingerprint = digest.hexdigest()
+
+        for table, cid, name, col_type, notnull, default, pk in conn.execute(
+                "SELECT m.name, p.cid, p.name, p.type, p.\"notnull\", p.dflt_value, p.pk "
+                "FROM sqlite_master m, pragma_table_info(m.name) p "
+                "WHERE m.type IN ('table', 'view') ORDER BY m.name, p.cid"):
+            schema.objects[table].columns.append((cid, name, col_type, notnull, default, pk))
+
+        for table, index, unique, column in conn.execute(
+                "SELECT m.name, il.name, il.\"unique\", ii.name "
+                "FROM sqlite_master m, pragma_index_list(m.name) il, pragma_index_info(il.name) ii "
+                "WHERE m.type = 'table' ORDER BY m.name, il.name, ii.seqno"):
+            info = schema.objects[table].indexes.setdefault(index, {"unique": bool(unique), "columns": []})
+            info["columns"].append(column)
+
+        for table, column, ref_table, ref_column in conn.execute(
+                "SELECT m.name, fk.\"from\", fk.\"table\", fk.\"to\" "
+                "FROM sqlite_master m, pragma_foreign_key_list(m.name) fk "
+                "WHERE m.type = 'table' ORDER BY m.name, fk.id, fk.seq"):
+            schema.objects[table].foreign_keys.append((column, ref_table, ref_column))
+        return schema
+
+# === Table browsing ===
+def sql_literal(value):
+    """SQL-літерал значення - для відтворюваного тексту запиту (експорт, історія)"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, bytes):
+        return f"X'{value.hex()}'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+class TableBrowser:
+    """Посторінковий перегляд таблиці: keyset-пагінація за rowid або первинним ключем.
+
+    Межа сторінки - значення стовпця сортування та ключа в останньому (першому) рядку,
+    тож наступна сторінка - це пошук в індексі, а не OFFSET. Сортування і фільтри
+    виконує SQLite; значення фільтрів передаються параметрами.
+    Рядки сторінки містять у кінці приховані стовпці (стовпець сортування і ключ).
+    Представлення не мають ключа - для них лишається OFFSET.
+    """
+    PAGE_SIZE = 200
+    FILTER_OPERATORS = ("<=", ">=", "!=", "<>", "=", "<", ">")
+
+    def __init__(self, info, page_size=None):
+        self.info = info
+        self.table = info.name
+        self.columns = info.column_names
+        self.notnull = {col[1]: bool(col[3] or col[5]) for col in info.columns}
+        self.page_size = page_size or self.PAGE_SIZE
+        without_rowid = re.search(r"\)\s*WITHOUT\s+ROWID\s*;?\s*$", info.sql or "", re.IGNORECASE)
+        if info.kind != "table":
+            self.key = []
+        elif without_rowid:
+            self.key = [col[1] for col in sorted(info.columns, key=lambda c: c[5]) if col[5]]
+        else:
+            # Стовпець користувача може затінити rowid - тоді беремо інший псевдонім
+            self.key = [next(alias for alias in ("rowid", "_rowid_", "oid") if alias not in self.columns)]
+        self.uses_rowid = info.kind == "table" and not without_rowid
+        self.sort = None        # (стовпець, за спаданням)
+        self.filters = {}       # стовпець -> (оператор, значення)
+        self.page = 0           # номер поточної сторінки, з 1
+        self.first_row = None   # приховані значення першого і останнього рядка сторінки
+        self.last_row = None
+        self.offset = 0         # лише для представлень
+
+    @property
+    def hidden(self):
+        """Скільки прихованих стовпців у кінці кожного рядка"""
+        return len(self._boundary_columns())
+
+    @property
+    def has_key(self):
+        return bool(self.key)
+
+    def set_sort(self, column, descending=False):
+        self.sort = (column, descending) if column is not None else None
+
+    def set_filter(self, column, text):
+        """Текст фільтра: 'значення' (містить), '=5', '>=2024-01-01', 'NULL', '!NULL'; порожній - прибрати"""
+        text = text.strip()
+        if not text:
+            self.filters.pop(column, None)
+            return
+        upper = text.upper()
+        if upper == "NULL":
+            self.filters[column] = ("IS NULL", None)
+        elif upper in ("!NULL", "NOT NULL"):
+            self.filters[column] = ("IS NOT NULL", None)
+        else:
+            operator = next((op for op in self.FILTER_OPERATORS if text.startswith(op)), None)
+            if operator:
+                self.filters[column] = (operator, text[len(operator):].strip())
+            else:
+                self.filters[column] = ("LIKE", text)
+
+    def clear_filters(self):
+        self.filters.clear()
+
+    def describe_filters(self):
+        return ", ".join(f"{column} {op}{'' if value is None else ' ' + repr(value)}"
+                         for column, (op, value) in self.filters.items())
+
+    def _boundary_columns(self):
+        columns = list(self.key)
+        if self.sort is not None:
+            columns.insert(0, self.sort[0])
+        return columns
+
+    def _where(self, inline=False):
+        """Умови фільтрів і їхні параметри; inline=True - значення вставлені в SQL як літерали"""
+        clauses, params = [], []
+        for column, (operator, value) in self.filters.items():
+            quoted = quote_identifier(column)
+            if value is None:
+                clauses.append(f"{quoted} {operator}")
+                continue
+            if operator == "LIKE":
+                escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                value = f"%{escaped}%"
+            placeholder = sql_literal(value) if inline else "?"
+            if not inline:
+                params.append(value)
+            if operator == "LIKE":
+                clauses.append(f"{quoted} LIKE {placeholder} ESCAPE '\\'")
+            else:
+                clauses.append(f"{quoted} {operator} {placeholder}")
+        return clauses, params
+
+    def _expr(self, column):
+        return column if self.uses_rowid and column == self.key[0] else quote_identifier(column)
+
+    def _order(self, descending):
+        direction = "DESC" if descending else "ASC"
+        return ", ".join(f"{self._expr(c)} {direction}" for c in self._boundary_columns())
+
+    def _seek(self, boundary, descending):
+        """Умова "після межі" у напрямку обходу; NULL у SQLite йдуть першими за зростанням"""
+        keys = [self._expr(c) for c in self.key]
+        key_values = list(boundary[-len(keys):])
+        op = "<" if descending else ">"
+        key_seek = f"({', '.join(keys)}) {op} ({', '.join('?' * len(keys))})"
+        if self.sort is None:
+            return key_seek, key_values
+        column = quote_identifier(self.sort[0])
+        value = boundary[0]
+        if value is None:
+            if descending:
+                return f"{column} IS NULL AND {key_seek}", key_values
+            return f"({column} IS NULL AND {key_seek} OR {column} IS NOT NULL)", key_values
+        seek = f"({column}, {', '.join(keys)}) {op} (?, {', '.join('?' * len(keys))})"
+        if descending and not self.notnull.get(self.sort[0]):
+            seek = f"({seek} OR {column} IS NULL)"
+        return seek, [value] + key_values
+
+    def build_query(self, boundary=None, backward=False, offset=None, limit=None, hidden_only=False):
+        """SELECT сторінки: boundary - приховані значення рядка, після якого починається сторінка"""
+        descending = bool(self.sort and self.sort[1]) != backward
+        clauses, params = self._where()
+        if boundary is not None:
+            seek, seek_params = self._seek(boundary, descending)
+            clauses.append(seek)
+            params += seek_params
+        hidden = [self._expr(c) for c in self._boundary_columns()]
+        selected = hidden if hidden_only else ["*"] + hidden
+        sql = f"SELECT {', '.join(selected)} FROM {quote_identifier(self.table)}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if self._boundary_columns():
+            sql += f" ORDER BY {self._order(descending)}"
+        sql += " LIMIT ?"
+        params.append(limit or self.page_size)
+        if offset:
+            sql += " OFFSET ?"
+            params.append(offset)
+        return sql, params
+
+    def export_sql(self):
+        """Поточний вигляд таблиці (усі сторінки) як SQL зі вставленими значеннями"""
+        clauses, _ = self._where(inline=True)
+        where = " AND ".join(clauses)
+        sql = f"SELECT * FROM {quote_identifier(self.table)}"
+        if where:
+            sql += f" WHERE {where}"
+        if self.sort is not None:
+            sql += f" ORDER BY {quote_identifier(self.sort[0])} {'DESC' if self.sort[1] else 'ASC'}"
+        return sql
+
+    def _fetch(self, conn, boundary=None, backward=False, offset=None):
+        sql, params = self.build_query(boundary, backward, offset)
+        rows = conn.execute(sql, params).fetchall()
+        if backward:
+            rows.reverse()
+        if rows:
+            hidden = self.hidden
+            self.first_row = rows[0][len(rows[0]) - hidden:]
+            self.last_row = rows[-1][len(rows[-1]) - hidden:]
+        return rows
+
+    def first(self, conn):
+        self.page, self.offset = 1, 0
+        return self._fetch(conn)
+
+    def next(self, conn):
+        if not self.has_key:
+            self.offset += self.page_size
+            rows = self._fetch(conn, offset=self.offset)
+        else:
+            rows = self._fetch(conn, self.last_row)
+        if rows:
+            self.page += 1
+        elif not self.has_key:
+            self.offset -= self.page_size
+        return rows
+
+    def previous(self, conn):
+        if self.page <= 2:
+            return self.first(conn)
+        self.page -= 1
+        if not self.has_key:
+            self.offset -= self.page_size
+            return self._fetch(conn, offset=self.offset)
+        return self._fetch(conn, self.first_row, backward=True)
+
+    def last(self, conn):
+        """Остання сторінка - перша при зворотному порядку; номер сторінки оцінюється"""
+        pages = self.estimate_pages(conn)
+        if not self.has_key:
+            self.offset = max(0, (pages - 1) * self.page_size)
+            self.page = pages
+            return self._fetch(conn, offset=self.offset)
+        rows = self._fetch(conn, backward=True)
+        self.page = pages
+        return rows
+
+    def jump(self, conn, page):
+        """Перехід на сторінку за номером.
+
+        Без сортування і фільтрів межа обчислюється з діапазону rowid - один пошук в індексі
+        (точно, якщо rowid ідуть без пропусків). Інакше межу знаходить OFFSET по прихованих стовпцях.
+        """
+        page = max(1, page)
+        if page == 1:
+            return self.first(conn)
+        skip = (page - 1) * self.page_size
+        if not self.has_key:
+            self.page, self.offset = page, skip
+            return self._fetch(conn, offset=skip)
+        if self.uses_rowid and self.sort is None and not self.filters:
+            low = conn.execute(f"SELECT min({self.key[0]}) FROM {quote_identifier(self.table)}").fetchone()[0]
+            boundary = ((low or 0) + skip - 1,)
+        else:
+            # Індекс, що покриває приховані стовпці, дозволяє пропустити рядки без читання таблиці
+            row = conn.execute(*self.build_query(offset=skip - 1, limit=1, hidden_only=True)).fetchone()
+            if row is None:
+                return self.last(conn)
+            boundary = tuple(row)
+        rows = self._fetch(conn, boundary)
+        if not rows:
+            return self.last(conn)
+        self.page = page
+        return rows
+
+    def estimate_pages(self, conn):
+        """Кількість сторінок; без фільтрів для rowid-таблиць - з діапазону rowid, без підрахунку рядків"""
+        if self.uses_rowid and not self.filters:
+            # Окремі min() і max() - кожен лише один крок по B-дереву
+            low, high = conn.execute(
+                f"SELECT (SELECT min({self.key[0]}) FROM {quote_identifier(self.table)}), "
+                f"(SELECT max({self.key[0]}) FROM {quote_identifier(self.table)})").fetchone()
+            total = 0 if low is None else high - low + 1
+        else:
+            clauses, params = self._where()
+            sql = f"SELECT COUNT(*) FROM {quote_identifier(self.table)}"
+            if clauses:
+                sql += " WHERE " + " AND ".join(clauses)
+            total = conn.execute(sql, params).fetchone()[0]
+        return max(1, math.ceil(total / self.page_size))
+
+class ChangeConflict(Exception):
+    """Рядки змінено або видалено іншим з'єднанням після того, як їх прочитали"""
+    def __init__(self, keys):
+        self.keys = keys
+        super().__init__(f"Рядків змінено або видалено після читання: {len(keys)}")
+
+def editor_value(text, col_type):
+    """Значення з редактора комірки: порожній текст у нетекстовому стовпці - NULL, решту перетворює affinity"""
+    if text == "" and not any(word in (col_type or "").upper() for word in ("CHAR", "CLOB", "TEXT")):
+        return None
+    return text
+
+class ChangeSet:
+    """Незбережені зміни таблиці, відкритої в TableBrowser: комірки, нові та видалені рядки.
+
+    Рядки ідентифікуються ключем (rowid або первинний ключ) з прихованих стовпців сторінки,
+    тож зміни переживають перехід між сторінками. apply() виконує все однією транзакцією:
+    однакові за формою інструкції йдуть одним executemany. Перед записом значення, які
+    редагувалися (для видалених рядків - увесь рядок), звіряються з базою.
+    """
+    CHECK_CHUNK = 500   # ключів в одному SELECT перевірки конфліктів
+
+    def __init__(self, browser):
+        self.table = browser.table
+        self.key = list(browser.key)
+        self.columns = list(browser.columns)
+        self.positions = {column: i for i, column in enumerate(self.columns)}
+        self.types = {col[1]: col[2] for col in browser.info.columns}
+        self.key_expr = [browser._expr(c) for c in self.key]
+        self.updates = {}    # ключ -> {стовпець: нове значення}
+        self.originals = {}  # ключ -> значення рядка на момент читання
+        self.deletes = set()
+        self.inserts = []    # [{стовпець: значення}]
+
+    def row_key(self, row):
+        return tuple(row[len(row) - len(self.key):])
+
+    def __len__(self):
+        """Кількість змінених рядків: видалений рядок рахується один раз, навіть якщо його редагували"""
+        return len(self.updates.keys() - self.deletes) + len(self.deletes) + len(self.inserts)
+
+    def clear(self):
+        self.updates.clear()
+        self.originals.clear()
+        self.deletes.clear()
+        self.inserts.clear()
+
+    def value(self, row, column):
+        """Значення комірки з урахуванням незбережених змін"""
+        changed = self.updates.get(self.row_key(row))
+        if changed and column in changed:
+            return changed[column]
+        return row[self.positions[column]]
+
+    def is_dirty(self, row, column):
+        changed = self.updates.get(self.row_key(row))
+        return bool(changed) and column in changed
+
+    def is_deleted(self, row):
+        return self.row_key(row) in self.deletes
+
+    def set_value(self, row, column, value):
+        """Змінює комірку прочитаного рядка; повернення до початкового значення знімає зміну"""
+        key = self.row_key(row)
+        original = row[self.positions[column]]
+        changed = self.updates.setdefault(key, {})
+        if value == original or (value is not None and original is not None and str(value) == str(original)):
+            changed.pop(column, None)
+        else:
+            changed[column] = value
+        if changed:
+            self.originals[key] = tuple(row[:len(self.columns)])
+        else:
+            self.updates.pop(key, None)
+            if key not in self.deletes:
+                self.originals.pop(key, None)
+
+    def toggle_delete(self, row):
+        key = self.row_key(row)
+        if key in self.deletes:
+            self.deletes.discard(key)
+            if key not in self.updates:
+                self.originals.pop(key, None)
+        else:
+            self.deletes.add(key)
+            self.originals[key] = tuple(row[:len(self.columns)])
+
+    def add_row(self):
+        self.inserts.append({})
+        return len(self.inserts) - 1
+
+    def set_insert_value(self, index, column, value):
+        self.inserts[index][column] = value
+
+    def remove_insert(self, index):
+        del self.inserts[index]
+
+    def _where_key(self):
+        return " AND ".join(f"{expr} = ?" for expr in self.key_expr)
+
+    def statements(self):
+        """[(sql, [параметри, ...])]: по одній інструкції на кожну форму змін"""
+        table = quote_identifier(self.table)
+        grouped = {}
+        for key, changed in self.updates.items():
+            if key in self.deletes:
+                continue
+            columns = tuple(changed)
+            grouped.setdefault(("update", columns), []).append([changed[c] for c in columns] + list(key))
+        for values in self.inserts:
+            columns = tuple(values)
+            grouped.setdefault(("insert", columns), []).append([values[c] for c in columns])
+        result = []
+        if self.deletes:
+            result.append((f"DELETE FROM {table} WHERE {self._where_key()}", [list(k) for k in self.deletes]))
+        for (kind, columns), params in grouped.items():
+            names = ", ".join(quote_identifier(c) for c in columns)
+            if kind == "update":
+                assignments = ", ".join(f"{quote_identifier(c)} = ?" for c in columns)
+                sql = f"UPDATE {table} SET {assignments} WHERE {self._where_key()}"
+            elif columns:
+                sql = f"INSERT INTO {table} ({names}) VALUES ({', '.join('?' * len(columns))})"
+            else:
+                sql = f"INSERT INTO {table} DEFAULT VALUES"
+            result.append((sql, params))
+        return result
+
+    def conflicts(self, conn):
+        """Ключі рядків, чиї значення в базі вже не збігаються з прочитаними"""
+        checked = {}
+        for key in self.deletes:
+            checked[key] = self.columns
+        for key, changed in self.updates.items():
+            checked.setdefault(key, list(changed))
+        keys = list(checked)
+        current = {}
+        selected = ", ".join(self.key_expr + [quote_identifier(c) for c in self.columns])
+        for start in range(0, len(keys), self.CHECK_CHUNK):
+            chunk = keys[start:start + self.CHECK_CHUNK]
+            placeholders = ", ".join(f"({', '.join('?' * len(self.key))})" for _ in chunk)
+            rows = conn.execute(
+                f"SELECT {selected} FROM {quote_identifier(self.table)} "
+                f"WHERE ({', '.join(self.key_expr)}) IN (VALUES {placeholders})",
+                [value for key in chunk for value in key]).fetchall()
+            for row in rows:
+                current[tuple(row[:len(self.key)])] = row[len(self.key):]
+        conflicts = []
+        for key, columns in checked.items():
+            row = current.get(key)
+            original = self.originals[key]
+            if row is None or any(row[self.positions[c]] != original[self.positions[c]] for c in columns):
+                conflicts.append(key)
+        return conflicts
+
+    def apply(self, conn, cancelled=None):
+        """Записує всі зміни однією транзакцією; ChangeConflict або скасування - нічого не записано.
+
+        cancelled() перевіряється перед кожною інструкцією та перед COMMIT (conn.interrupt() не
+        зупиняє інструкцію, яка ще не почалася). Зміни не очищаються: після успіху їх прибирає
+        clear() у потоці, що їх показує.
+        """
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # BEGIN IMMEDIATE тримає блокування запису: між перевіркою і записом рядки не зміняться
+            conflicts = self.conflicts(conn)
+            if conflicts:
+                raise ChangeConflict(conflicts)
+            changed = 0
+            for sql, params in self.statements():
+                if cancelled is not None and cancelled():
+                    raise sqlite3.OperationalError("interrupted")
+                changed += conn.executemany(sql, params).rowcount
+            if cancelled is not None and cancelled():
+                raise sqlite3.OperationalError("interrupted")
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        return changed
+
+# === Column profiling ===
+def _hash64(value):
+    """64-бітний хеш значення: hash() Python, перемішаний splitmix64 (hash цілих - саме число)"""
+    x = hash(value) & 0xFFFFFFFFFFFFFFFF
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return x ^ (x >> 31)
+
+class HyperLogLog:
+    """Оцінка кількості різних значень за один прохід; похибка ≈ 1.04 / sqrt(2^p)"""
+
+    def __init__(self, p=12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, value):
+        h = _hash64(value)
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = 64 - self.p - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        m = self.m
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # Лінійний підрахунок для малих кардинальностей
+        return int(round(estimate))
+
+class TopK:
+    """Часті значення за алгоритмом Misra-Gries: лічильники - нижні межі, похибка ≤ n / (capacity + 1)"""
+
+    def __init__(self, k=5, capacity=100):
+        self.k = k
+        self.capacity = capacity
+        self.counts = {}
+
+    def add(self, value):
+        counts = self.counts
+        if value in counts:
+            counts[value] += 1
+        elif len(counts) < self.capacity:
+            counts[value] = 1
+        else:
+            # Зменшуємо всі лічильники на одиницю - амортизовано O(1) на значення
+            for key in list(counts):
+                counts[key] -= 1
+                if not counts[key]:
+                    del counts[key]
+
+    def top(self):
+        return sorted(self.counts.items(), key=lambda item: -item[1])[:self.k]
+
+class ColumnProfiler:
+    """Статистика стовпців таблиці: частка NULL, кількість різних значень, мін/макс і часті значення.
+
+    Малі таблиці рахуються точно в SQL, середні - одним проходом з HyperLogLog і Misra-Gries,
+    великі - за випадковою вибіркою рядків (за rowid) з оцінкою кількості різних значень Duj1.
+    Мін/макс для стовпців з індексом завжди точні - це один крок по індексу.
+    Результат кешується в ResultCache і лишається дійсним, доки не зміниться data_version.
+    """
+    EXACT_ROWS = 100000
+    SKETCH_CELLS = 3000000   # рядків × стовпців для проходу з ескізами
+    SAMPLE_ROWS = 20000
+    TOP_VALUES = 3
+    COLUMNS = ["Стовпець", "Тип", "Рядків", "NULL, %", "Різних", "Мін", "Макс", "Часті значення", "Метод"]
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.cancelled = False
+        self.conn = None
+
+    def cancel(self):
+        self.cancelled = True
+        conn = self.conn
+        if conn is not None:
+            try:
+                conn.interrupt()
+            except sqlite3.Error:
+                pass
+
+    def profile(self, conn, db_path, info, progress=None):
+        """Рядки таблиці профілю (див. COLUMNS) для таблиці чи представлення info"""
+        report = progress or (lambda text: None)
+        key = [f"/* column profile */ {quote_identifier(info.name)}"]
+        fingerprint = None
+        if self.cache is not None:
+            fingerprint = self.cache.fingerprint(db_path)
+            entry = self.cache.get(db_path, key, fingerprint)
+            if entry is not None:
+                report("З кешу: дані не змінювалися")
+                return [tuple(row) for row in entry["results"][0]["rows"]]
+        self.conn = conn
+        try:
+            rows = self._profile(conn, info, report)
+        finally:
+            self.conn = None
+        if self.cache is not None:
+            self.cache.put(db_path, key, fingerprint, [{"columns": self.COLUMNS, "rows": list(rows),
+                                                       "has_more": False, "truncated": False,
+                                                       "rowcount": len(rows)}])
+        return rows
+
+    def _profile(self, conn, info, report):
+        table = quote_identifier(info.name)
+        columns = info.column_names
+        uses_rowid = info.kind == "table" and not re.search(r"WITHOUT\s+ROWID", info.sql or "", re.IGNORECASE)
+        estimate = None
+        if uses_rowid:
+            low, high = conn.execute(f"SELECT (SELECT min(rowid) FROM {table}), "
+                                     f"(SELECT max(rowid) FROM {table})").fetchone()
+            estimate = 0 if low is None else high - low + 1
+        if estimate is None or estimate <= max(self.EXACT_ROWS, self.SKETCH_CELLS // max(1, len(columns))) * 2:
+            report("Підрахунок рядків...")
+            total = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        else:
+            total = None  # Великі rowid-таблиці не рахуємо повністю
+
+        if total is not None and total <= self.EXACT_ROWS:
+            stats = self._exact(conn, table, columns, total, report)
+            method = "точно"
+        elif total is not None and total * len(columns) <= self.SKETCH_CELLS:
+            stats = self._sketch(conn, table, columns, total, report)
+            method = "ескіз"
+        else:
+            stats, total = self._sample(conn, table, columns, uses_rowid, low if uses_rowid else None,
+                                        estimate, total, report)
+            method = "вибірка"
+
+        indexed = {index["columns"][0] for index in info.indexes.values()}
+        if uses_rowid:
+            indexed |= {col[1] for col in info.columns if col[5] == 1 and (col[2] or "").upper() == "INTEGER"}
+        types = {col[1]: col[2] for col in info.columns}
+        rows = []
+        for column, stat in zip(columns, stats):
+            if method != "точно" and column in indexed:
+                # Мін/макс за індексом - точні й миттєві
+                quoted = quote_identifier(column)
+                stat["min"], stat["max"] = conn.execute(
+                    f"SELECT (SELECT min({quoted}) FROM {table}), (SELECT max({quoted}) FROM {table})").fetchone()
+                stat["approx_range"] = False
+            prefix = "≈" if method != "точно" else ""
+            range_prefix = "≈" if stat.get("approx_range") else ""
+            top = ", ".join(f"{value} ({share:.0%})" for value, share in stat["top"] if share >= 0.01)
+            rows.append((column, types.get(column) or "", f"{'≈' if method == 'вибірка' else ''}{total}",
+                         round(stat["null_ratio"] * 100, 2), f"{prefix}{stat['distinct']}",
+                         f"{range_prefix}{stat['min']}" if stat["min"] is not None else "",
+                         f"{range_prefix}{stat['max']}" if stat["max"] is not None else "",
+                         f"{prefix}{top}" if top else "", method))
+        return rows
+
+    def _check(self):
+        if self.cancelled:
+            raise sqlite3.OperationalError("interrupted")
+
+    def _exact(self, conn, table, columns, total, report):
+        stats = []
+        for number, column in enumerate(columns, start=1):
+            self._check()
+            report(f"Стовпець {number}/{len(columns)}: {column}")
+            quoted = quote_identifier(column)
+            non_null, distinct, low, high = conn.execute(
+                f"SELECT COUNT({quoted}), COUNT(DISTINCT {quoted}), MIN({quoted}), MAX({quoted}) "
+                f"FROM {table}").fetchone()
+            top = conn.execute(
+                f"SELECT {quoted}, COUNT(*) AS n FROM {table} WHERE {quoted} IS NOT NULL "
+                f"GROUP BY {quoted} ORDER BY n DESC LIMIT ?", (self.TOP_VALUES,)).fetchall()
+            stats.append({"null_ratio": (total - non_null) / total if total else 0.0, "distinct": distinct,
+                          "min": low, "max": high, "top": [(v, n / total) for v, n in top if n > 1]})
+        return stats
+
+    def _sketch(self, conn, table, columns, total, report):
+        """Один прохід таблицею: HyperLogLog і Misra-Gries на стовпець, мін/макс - у SQL"""
+        width = len(columns)
+        nulls = [0] * width
+        sketches = [HyperLogLog() for _ in columns]
+        tops = [TopK(self.TOP_VALUES) for _ in columns]
+        cursor = conn.execute(f"SELECT {', '.join(quote_identifier(c) for c in columns)} FROM {table}")
+        seen = 0
+        while True:
+            self._check()
+            batch = cursor.fetchmany(20000)
+            if not batch:
+                break
+            for i in range(width):
+                add_distinct, add_top = sketches[i].add, tops[i].add
+                for row in batch:
+                    value = row[i]
+                    if value is None:
+                        nulls[i] += 1
+                    else:
+                        add_distinct(value)
+                        add_top(value)
+            seen += len(batch)
+            report(f"Прочитано рядків: {seen} з {total}")
+        ranges = conn.execute("SELECT " + ", ".join(f"MIN({quote_identifier(c)}), MAX({quote_identifier(c)})"
+                                                    for c in columns) + f" FROM {table}").fetchone()
+        stats = []
+        for i in range(width):
+            non_null = total - nulls[i]
+            stats.append({"null_ratio": nulls[i] / total if total else 0.0,
+                          "distinct": min(sketches[i].count(), non_null),
+                          "min": ranges[2 * i], "max": ranges[2 * i + 1],
+                          "top": [(v, n / total) for v, n in tops[i].top() if n > 1]})
+        return stats
+
+    def _sample(self, conn, table, columns, uses_rowid, low, estimate, total, report):
+        """Випадкова вибірка: для rowid-таблиць - випадкові rowid, інакше - фільтр random() у SQL"""
+        import random
+        select = f"SELECT {', '.join(quote_identifier(c) for c in columns)} FROM {table}"
+        sample = []
+        if uses_rowid:
+            probed = set()
+            # Рядки з видаленими rowid не знаходяться - частка влучань уточнює кількість рядків
+            while len(sample) < self.SAMPLE_ROWS and len(probed) < min(estimate, self.SAMPLE_ROWS * 20):
+                self._check()
+                # Вибірка без повторень: повторно вибраний рядок спотворив би оцінку кількості різних значень
+                ids = {random.randrange(low, low + estimate) for _ in range(500)} - probed
+                probed |= ids
+                sample += conn.execute(f"{select} WHERE rowid IN ({', '.join('?' * len(ids))})",
+                                       list(ids)).fetchall()
+                report(f"Вибірка: {len(sample)} з {self.SAMPLE_ROWS} рядків")
+            total = round(estimate * len(sample) / len(probed)) if probed else 0
+        else:
+            step = max(1, total // self.SAMPLE_ROWS)
+            report(f"Вибірка: кожен ≈{step}-й рядок")
+            sample = conn.execute(f"{select} WHERE abs(random()) % ? = 0 LIMIT ?",
+                                  (step, self.SAMPLE_ROWS)).fetchall()
+        n = len(sample)
+        stats = []
+        for i in range(len(columns)):
+            values = [row[i] for row in sample if row[i] is not None]
+            counts = {}
+            for value in values:
+                counts[value] = counts.get(value, 0) + 1
+            frequencies = {}
+            for count in counts.values():
+                frequencies[count] = frequencies.get(count, 0) + 1
+            null_ratio = (n - len(values)) / n if n else 0.0
+            population = total * (1 - null_ratio)
+            # Оцінка Duj1 (Haas та ін.): d / (1 - (1 - q) * f1 / n), де f1 - значення, що трапились раз
+            distinct = len(counts)
+            if values and population:
+                fraction = min(1.0, len(values) / population)
+                denominator = 1 - (1 - fraction) * frequencies.get(1, 0) / len(values)
+                estimate = distinct / denominator if denominator > 0 else population
+                distinct = int(min(max(estimate, distinct), population))
+            top = sorted(counts.items(), key=lambda item: -item[1])[:self.TOP_VALUES]
+            stats.append({"null_ratio": null_ratio, "distinct": distinct,
+                          "min": min(self._same_class(values), default=None),
+                          "max": max(self._same_class(values, highest=True), default=None),
+                          "approx_range": True, "top": [(v, c / n) for v, c in top if c > 1]})
+        return stats, total
+
+    @staticmethod
+    def _same_class(values, highest=False):
+        """Значення найменшого (найбільшого) класу зберігання: у SQLite числа < текст < BLOB"""
+        kinds = ((int, float), str, bytes)
+        for kind in reversed(kinds) if highest else kinds:
+            chosen = [v for v in values if isinstance(v, kind)]
+            if chosen:
+                return chosen
+        return []
+
+# === Charts ===
+CHART_FUNCTIONS = ("COUNT", "SUM", "AVG", "MIN", "MAX")
+
+def chart_categories(conn, statement, x, y=None, function="COUNT", limit=30):
+    """Агрегація для стовпчикової/кругової діаграми виконується в SQLite.
+
+    Повертає ([(категорія, значення)], чи є ще категорії) - найбільші limit значень.
+    """
+    if function not in CHART_FUNCTIONS:
+        raise ValueError(f"Невідома функція агрегації: {function}")
+    value = "COUNT(*)" if y is None else f"{function}({quote_identifier(y)})"
+    rows = conn.execute(
+        f"SELECT {quote_identifier(x)}, {value} AS chart_value FROM ({statement}\n) "
+        f"GROUP BY 1 ORDER BY chart_value DESC LIMIT ?", (limit + 1,)).fetchall()
+    return rows[:limit], len(rows) > limit
+
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets: threshold точок, що зберігають форму лінії"""
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+    sampled = [points[0]]
+    every = (len(points) - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Середня точка наступного кошика - третя вершина трикутника
+        start = int((i + 1) * every) + 1
+        end = min(int((i + 2) * every) + 1, len(points))
+        bucket = points[start:end]
+        avg_x = sum(p[0] for p in bucket) / len(bucket)
+        avg_y = sum(p[1] for p in bucket) / len(bucket)
+        ax, ay = points[a]
+        best, best_area = None, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            px, py = points[j]
+            area = abs((ax - avg_x) * (py - ay) - (ax - px) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+def chart_line(conn, statement, x, y, width=800):
+    """Точки лінії, обмежені шириною графіка в пікселях.
+
+    Якщо рядків більше, ніж 4 × width, SQLite групує їх у кошики за x і повертає для кожного
+    середнє x та мінімум і максимум y (піки не губляться); далі LTTB зводить їх до ≈ width точок.
+    Текстові дати по осі x перетворюються на мілісекунди Unix. Повертає (точки, інформація).
+    """
+    quoted_x, quoted_y = quote_identifier(x), quote_identifier(y)
+    # Перенесення рядка перед ")": коментар "--" у кінці запиту інакше поглине дужку
+    first = conn.execute(f"SELECT typeof({quoted_x}), julianday({quoted_x}) FROM ({statement}\n) "
+                         f"WHERE {quoted_x} IS NOT NULL LIMIT 1").fetchone()
+    is_time = bool(first and first[0] == "text" and first[1] is not None)
+    x_expr = f"(julianday({quoted_x}) - 2440587.5) * 86400000.0" if is_time else quoted_x
+    source = (f"SELECT {x_expr} AS chart_x, {quoted_y} AS chart_y FROM ({statement}\n) "
+              f"WHERE chart_x IS NOT NULL AND chart_y IS NOT NULL")
+    low, high, total = conn.execute(f"SELECT MIN(chart_x), MAX(chart_x), COUNT(*) FROM ({source})").fetchone()
+    info = {"rows": total, "is_time": is_time, "buckets": 0}
+    buckets = 4 * max(1, width)
+    if not total:
+        return [], info
+    if total <= buckets or high == low:
+        points = conn.execute(f"SELECT chart_x, chart_y FROM ({source}) ORDER BY chart_x LIMIT ?",
+                              (buckets,)).fetchall()
+    else:
+        rows = conn.execute(
+            f"SELECT MIN(CAST((chart_x - ?) * ? / ? AS INTEGER), ? - 1) AS bucket, AVG(chart_x), "
+            f"MIN(chart_y), MAX(chart_y) FROM ({source}) GROUP BY bucket ORDER BY bucket",
+            (low, buckets, high - low, buckets)).fetchall()
+        info["buckets"] = len(rows)
+        points = []
+        for _, bucket_x, min_y, max_y in rows:
+            points.append((bucket_x, min_y))
+            if max_y != min_y:
+                points.append((bucket_x, max_y))
+    points = [(float(px), float(py)) for px, py in points if isinstance(py, (int, float))]
+    return lttb(points, max(3, width)), info
+
+# === Query plans and index advice ===
+PLAN_WARNINGS = {
+    "full_scan": "повне сканування таблиці",
+    "temp_btree": "тимчасове B-дерево",
+    "automatic_index": "автоматичний індекс",
+}
+
+def plan_warning(detail):
+    """Тип проблеми у рядку EXPLAIN QUERY PLAN або None"""
+    if "AUTOMATIC" in detail:
+        return "automatic_index"
+    if "USE TEMP B-TREE" in detail:
+        return "temp_btree"
+    if (detail.startswith("SCAN ") and " USING " not in detail and "VIRTUAL TABLE" not in detail
+            and not detail.startswith("SCAN CONSTANT ROW")):
+        return "full_scan"
+    return None
+
+def explain_plan(conn, statement):
+    """EXPLAIN QUERY PLAN як дерево вузлів {"detail", "warning", "children"}"""
+    nodes = {}
+    roots = []
+    for node_id, parent, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall():
+        node = {"detail": detail, "warning": plan_warning(detail), "children": []}
+        nodes[node_id] = node
+        (nodes[parent]["children"] if parent in nodes else roots).append(node)
+    return roots
+
+class IndexAdvisor:
+    """Пропонує (покривні) індекси за історією запитів і оцінює їх на вибірковій копії бази.
+
+    Стовпці, які читає запит, повідомляє authorizer під час підготовки EXPLAIN; які з них
+    стоять в умовах WHERE/ON/ORDER BY, визначається регулярними виразами. Кожен кандидат
+    створюється на копії з SAMPLE_ROWS рядків на таблицю, і запити з історії виконуються до і після.
+    """
+    SAMPLE_ROWS = 100000
+    MAX_INDEX_COLUMNS = 5
+    MAX_CANDIDATES = 10
+    MAX_QUERIES_PER_CANDIDATE = 5
+    MIN_SPEEDUP = 1.2
+    TIMING_RUNS = 3
+    QUERY_TIMEOUT = 5.0  # с на один вимір одного запиту
+
+    _STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+    _PREDICATE_LEFT = re.compile(
+        r"(?:\b(\w+)\.)?\b([A-Za-z_]\w*)\s*(==|=|<=|>=|<|>|\bIN\b|\bBETWEEN\b|\bIS\b(?!\s+NOT))", re.IGNORECASE)
+    _PREDICATE_RIGHT = re.compile(r"(==|=|<=|>=|<|>)\s*(?:\b(\w+)\.)?\b([A-Za-z_]\w*)\b(?!\s*\()", re.IGNORECASE)
+    _ORDER_BY = re.compile(r"\b(?:ORDER|GROUP)\s+BY\s+(.+?)(?:\bLIMIT\b|\bHAVING\b|\bORDER\b|$)",
+                           re.IGNORECASE | re.DOTALL)
+    _UPDATE = re.compile(r"^\s*UPDATE\s+(?:OR\s+\w+\s+)?(\S+)\s+SET\s+.*?\b(WHERE\b.*)$", re.IGNORECASE | re.DOTALL)
+    _DELETE = re.compile(r"^\s*DELETE\s+FROM\s+(\S+)\s+(WHERE\b.*)$", re.IGNORECASE | re.DOTALL)
+    _EQUALITY_OPERATORS = {"=", "==", "in", "is"}
+    _KEYWORDS = {"where", "on", "join", "left", "right", "inner", "outer", "cross", "natural", "group",
+                 "order", "limit", "set", "using", "and", "or", "not", "null", "as", "union", "select",
+                 "values", "having", "window", "except", "intersect", "full"}
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.cancelled = False
+        self._sample = None
+
+    def cancel(self):
+        self.cancelled = True
+        sample = self._sample
+        if sample is not None:
+            try:
+                sample.interrupt()
+            except sqlite3.Error:
+                pass
+
+    def analyze(self, workload, progress=None):
+        """workload - список (запит, кількість виконань); повертає пропозиції від найкориснішої"""
+        report = progress or (lambda text: None)
+        conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro", uri=True)
+        try:
+            existing = self._existing_indexes(conn)
+            candidates = {}
+            statements = 0
+            for query, count in workload:
+                for statement in split_sql_statements(query):
+                    if first_keyword(statement) not in ("select", "with", "update", "delete"):
+                        continue
+                    statements += 1
+                    try:
+                        found, tables = self.candidates_for(conn, statement)
+                    except sqlite3.Error:
+                        continue  # Запит з історії вже не відповідає схемі
+                    for table, columns, covering in found:
+                        if self._already_indexed(existing.get(table, []), columns):
+                            continue
+                        entry = candidates.setdefault((table, columns),
+                                                      {"queries": {}, "tables": set(), "covering": covering})
+                        entry["queries"][statement] = entry["queries"].get(statement, 0) + count
+                        entry["tables"] |= tables
+            report(f"Проаналізовано інструкцій: {statements}, кандидатів: {len(candidates)}")
+        finally:
+            conn.close()
+        if not candidates:
+            return []
+
+        # Найчастіше потрібні кандидати перевіряються першими
+        ranked = sorted(candidates.items(), key=lambda item: -sum(item[1]["queries"].values()))
+        ranked = ranked[:self.MAX_CANDIDATES]
+        tables = set()
+        for _, entry in ranked:
+            tables |= entry["tables"]
+        return self._what_if(ranked, tables, report)
+
+    def candidates_for(self, conn, statement):
+        """Кандидати (таблиця, стовпці, покривний) для однієї інструкції та множина таблиць, які вона читає"""
+        reads = {}
+
+        def authorizer(action, arg1, arg2, db_name, trigger):
+            if action == sqlite3.SQLITE_READ and trigger is None and db_name == "main" and arg2:
+                reads.setdefault(arg1, set()).add(arg2)
+            return sqlite3.SQLITE_OK
+
+        conn.set_authorizer(authorizer)
+        try:
+            conn.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall()
+        finally:
+            conn.set_authorizer(None)
+        reads = {table: columns for table, columns in reads.items() if not table.startswith("sqlite_")}
+        if not reads:
+            return [], set()
+
+        text = self._STRING_LITERAL.sub("?", statement)
+        update = self._UPDATE.match(text)
+        if update:
+            text = f"SELECT 1 FROM {update.group(1)} {update.group(2)}"
+        aliases = self._aliases(text, reads)
+
+        def resolve(qualifier, column):
+            if qualifier:
+                table = aliases.get(qualifier.lower())
+                return table if table and column in reads[table] else None
+            owners = [table for table, columns in reads.items() if column in columns]
+            return owners[0] if len(owners) == 1 else None
+
+        equality, ranges, ordering = {}, {}, {}
+        for qualifier, column, operator in self._PREDICATE_LEFT.findall(text):
+            table = resolve(qualifier, column)
+            if table:
+                target = equality if operator.lower() in self._EQUALITY_OPERATORS else ranges
+                target.setdefault(table, []).append(column)
+        for operator, qualifier, column in self._PREDICATE_RIGHT.findall(text):
+            table = resolve(qualifier, column)
+            if table:
+                target = equality if operator in ("=", "==") else ranges
+                target.setdefault(table, []).append(column)
+        for clause in self._ORDER_BY.findall(text):
+            for term in clause.split(","):
+                match = re.match(r"\s*(?:(\w+)\.)?(\w+)", term)
+                if match:
+                    table = resolve(match.group(1), match.group(2))
+                    if table:
+                        ordering.setdefault(table, []).append(match.group(2))
+
+        found = []
+        for table in reads:
+            eq = list(dict.fromkeys(equality.get(table, [])))
+            rng = [c for c in dict.fromkeys(ranges.get(table, [])) if c not in eq]
+            order = [c for c in dict.fromkeys(ordering.get(table, [])) if c not in eq]
+            # Рівності, потім одна умова діапазону; без діапазону індекс може дати й порядок сортування
+            columns = eq + (rng[:1] if rng else order)
+            columns = columns[:self.MAX_INDEX_COLUMNS]
+            if not columns:
+                continue
+            # Покривний індекс: решта стовпців, які читає запит, дописуються в кінець
+            rest = sorted(reads[table] - set(columns))
+            covering = len(columns) + len(rest) <= self.MAX_INDEX_COLUMNS
+            if covering:
+                columns = columns + rest
+            found.append((table, tuple(columns), covering))
+        return found, set(reads)
+
+    def _aliases(self, text, reads):
+        aliases = {table.lower(): table for table in reads}
+        for table in reads:
+            pattern = rf'(?:\b|"){re.escape(table)}"?\s+(?:AS\s+)?([A-Za-z_]\w*)'
+            for alias in re.findall(pattern, text, re.IGNORECASE):
+                if alias.lower() not in self._KEYWORDS:
+                    aliases[alias.lower()] = table
+        return aliases
+
+    @staticmethod
+    def _existing_indexes(conn):
+        """Таблиця -> кортежі стовпців наявних індексів; INTEGER PRIMARY KEY - як (None, стовпець)"""
+        indexes = {}
+        for table, index, column in conn.execute(
+                "SELECT m.name, il.name, ii.name FROM sqlite_master m, pragma_index_list(m.name) il, "
+                "pragma_index_info(il.name) ii WHERE m.type = 'table' ORDER BY m.name, il.name, ii.seqno"):
+            indexes.setdefault(table, {}).setdefault(index, []).append(column)
+        result = {table: [tuple(columns) for columns in by_name.values()] for table, by_name in indexes.items()}
+        for table, column in conn.execute(
+                "SELECT m.name, p.name FROM sqlite_master m, pragma_table_info(m.name) p "
+                "WHERE m.type = 'table' AND p.pk = 1 AND upper(p.type) = 'INTEGER'"):
+            result.setdefault(table, []).append((None, column))
+        return result
+
+    @staticmethod
+    def _already_indexed(existing, columns):
+        # Пошук за INTEGER PRIMARY KEY (rowid) вже оптимальний, інші індекси мають починатися з тих самих стовпців
+        return any(columns[0] == index[1] if index[0] is None else index[:len(columns)] == columns
+                   for index in existing)
+
+    def _timed_statement(self, statement):
+        """Запит для виміру: UPDATE/DELETE замінюються на SELECT з тією ж умовою"""
+        for pattern in (self._UPDATE, self._DELETE):
+            match = pattern.match(statement)
+            if match:
+                return f"SELECT rowid FROM {match.group(1)} {match.group(2)}"
+        return statement if is_read_only_sql([statement]) else None
+
+    def _time(self, conn, statement):
+        """Найкращий час виконання з повною вибіркою, мс; None, якщо запит не виконується на копії"""
+        best = None
+        for _ in range(self.TIMING_RUNS):
+            deadline = time.perf_counter() + self.QUERY_TIMEOUT
+            conn.set_progress_handler(lambda: time.perf_counter() > deadline or self.cancelled, 10000)
+            started = time.perf_counter()
+            try:
+                cursor = conn.execute(statement)
+                while cursor.fetchmany(1000):
+                    pass
+            except sqlite3.OperationalError as e:
+                if self.cancelled:
+                    raise
+                if "interrupted" in str(e):
+                    return self.QUERY_TIMEOUT * 1000
+                return None
+            except sqlite3.Error:
+                return None
+            finally:
+                conn.set_progress_handler(None, 0)
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def _build_sample(self, conn, tables, report):
+        """Копія потрібних таблиць з кожним k-м рядком (за rowid) та наявними індексами"""
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(f"ATTACH DATABASE 'file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro' AS src")
+        fractions = {}
+        for table in sorted(tables):
+            if self.cancelled:
+                raise sqlite3.OperationalError("interrupted")
+            row = conn.execute("SELECT sql FROM src.sqlite_master WHERE type = 'table' AND name = ?",
+                               (table,)).fetchone()
+            if not row or not row[0]:
+                continue
+            conn.execute(row[0])
+            quoted = quote_identifier(table)
+            total = conn.execute(f"SELECT COUNT(*) FROM src.{quoted}").fetchone()[0]
+            step = max(1, math.ceil(total / self.SAMPLE_ROWS))
+            if "WITHOUT ROWID" in row[0].upper():
+                conn.execute(f"INSERT INTO main.{quoted} SELECT * FROM src.{quoted} LIMIT ?", (self.SAMPLE_ROWS,))
+            else:
+                conn.execute(f"INSERT INTO main.{quoted} SELECT * FROM src.{quoted} WHERE rowid % ? = 0", (step,))
+            fractions[table] = 1 / step
+            for (index_sql,) in conn.execute(
+                    "SELECT sql FROM src.sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                    (table,)).fetchall():
+                conn.execute(index_sql)
+            report(f"Копія {table}: кожен {step}-й рядок з {total}")
+        conn.execute("DETACH DATABASE src")
+        conn.execute("ANALYZE")
+        return fractions
+
+    def _what_if(self, ranked, tables, report):
+        import tempfile
+        fd, sample_path = tempfile.mkstemp(prefix="sql_viewer_whatif_", suffix=".db")
+        os.close(fd)
+        conn = sqlite3.connect(sample_path, isolation_level=None, check_same_thread=False)
+        self._sample = conn
+        suggestions = []
+        try:
+            fractions = self._build_sample(conn, tables, report)
+            baseline = {}
+            for number, ((table, columns), entry) in enumerate(ranked, start=1):
+                if self.cancelled:
+                    raise sqlite3.OperationalError("interrupted")
+                report(f"Кандидат {number}/{len(ranked)}: {table}({', '.join(columns)})")
+                queries = sorted(entry["queries"].items(), key=lambda item: -item[1])
+                queries = [(self._timed_statement(q), q, count) for q, count in queries]
+                queries = [item for item in queries if item[0]][:self.MAX_QUERIES_PER_CANDIDATE]
+                for timed, _, _ in queries:
+                    if timed not in baseline:
+                        baseline[timed] = self._time(conn, timed)
+                queries = [item for item in queries if baseline[item[0]] is not None]
+                if not queries or table not in fractions:
+                    continue
+                column_list = ", ".join(quote_identifier(c) for c in columns)
+                conn.execute(f"CREATE INDEX advisor_candidate ON {quote_identifier(table)} ({column_list})")
+                conn.execute("ANALYZE advisor_candidate")
+                try:
+                    after = {timed: self._time(conn, timed) for timed, _, _ in queries}
+                finally:
+                    conn.execute("DROP INDEX advisor_candidate")
+                before_ms = sum(baseline[timed] for timed, _, _ in queries)
+                after_ms = sum(after[timed] if after[timed] is not None else baseline[timed]
+                               for timed, _, _ in queries)
+                saved_ms = sum(count * (baseline[timed] - (after[timed] if after[timed] is not None
+                                                            else baseline[timed]))
+                               for timed, _, count in queries)
+                speedup = before_ms / after_ms if after_ms > 0 else float("inf")
+                if speedup < self.MIN_SPEEDUP or saved_ms <= 0:
+                    continue
+                name = re.sub(r"\W+", "_", f"idx_{table}_{'_'.join(columns)}")[:60]
+                suggestions.append({
+                    "table": table,
+                    "columns": list(columns),
+                    "covering": entry["covering"],
+                    "sql": f"CREATE INDEX IF NOT EXISTS {quote_identifier(name)} "
+                           f"ON {quote_identifier(table)} ({column_list})",
+                    "executions": sum(entry["queries"].values()),
+                    "examples": [q for _, q, _ in queries],
+                    "before_ms": round(before_ms, 2),
+                    "after_ms": round(after_ms, 2),
+                    "speedup": round(speedup, 1),
+                    "saved_ms": round(saved_ms, 2),
+                    "sample_fraction": fractions[table],
+                })
+        finally:
+            self._sample = None
+            conn.close()
+            os.remove(sample_path)
+        suggestions.sort(key=lambda s: -s["saved_ms"])
+        return suggestions
+
+
+def format_table_schema(table_name, columns):
+    """Опис таблиці для промпту ШІ"""
+    columns_info = []
+    for col in columns:
+        # Format: (id, name, type, notnull, default_value, primary_key)
+        col_id, col_name, col_type, not_null, default_val, is_pk = col
+        col_desc = f"{col_name} ({col_type})"
+        if is_pk:
+            col_desc += " PRIMARY KEY"
+        columns_info.append(col_desc)
+    return f"Table: {table_name}\nColumns: {', '.join(columns_info)}"
+
+UKRAINIAN_TRANSLITERATION = {
+    "а": "a", "б": "b", "в": "v", "г": "h", "ґ": "g", "д": "d", "е": "e", "є": "ie", "ж": "zh",
+    "з": "z", "и": "y", "і": "i", "ї": "i", "й": "i", "к": "k", "л": "l", "м": "m", "н": "n",
+    "о": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "shch", "ь": "", "ю": "iu", "я": "ia", "'": "", "ё": "io", "ы": "y", "э": "e",
+}
+
+def transliterate(text):
+    return "".join(UKRAINIAN_TRANSLITERATION.get(ch, ch) for ch in text.lower())
+
+class SchemaPruner:
+    """Chooses which tables go into the AI prompt: lexical/transliteration match, query history and FK neighbours"""
+    TOP_K = 8               # Скільки найрелевантніших таблиць брати до промпту
+    TOKEN_BUDGET = 3000     # Приблизна межа розміру схеми в токенах (~4 символи на токен)
+    MIN_SIMILARITY = 0.6
+
+    def __init__(self, top_k=None, token_budget=None):
+        self.top_k = top_k or self.TOP_K
+        self.token_budget = token_budget or self.TOKEN_BUDGET
+
+    @staticmethod
+    def _tokens(text):
+        """Слова тексту в нижньому регістрі; snake_case розбивається на частини"""
+        words = re.findall(r"\w+", text.lower())
+        return {part for word in words for part in [word] + word.split("_") if len(part) > 2}
+
+    def _similar(self, word, candidates):
+        for candidate in candidates:
+            if word == candidate or (min(len(word), len(candidate)) >= 4
+                                     and (word.startswith(candidate) or candidate.startswith(word))):
+                return True
+            # Дорожче нечітке порівняння - лише для слів з однаковою першою літерою
+            if word[0] == candidate[0] and SequenceMatcher(None, word, candidate).ratio() >= self.MIN_SIMILARITY:
+                return True
+        return False
+
+    def score_tables(self, schema, question, history=()):
+        """Relevance per table: (lexical score, history score)"""
+        question_words = self._tokens(question)
+        question_words |= {transliterate(word) for word in question_words}
+        scores = {}
+        for name in schema.tables:
+            info = schema.objects[name]
+            name_words = self._tokens(name)
+            column_words = self._tokens(" ".join(info.column_names))
+            score = 0.0
+            for word in question_words:
+                if self._similar(word, name_words):
+                    score += 3
+                elif self._similar(word, column_words):
+                    score += 1
+            # Таблиці, до яких часто зверталися раніше, трохи вищі в рейтингу
+            pattern = re.compile(rf"\b{re.escape(name.lower())}\b")
+            uses = sum(1 for q in history if pattern.search(q.lower()))
+            scores[name] = (score, min(2.0, 0.5 * math.log1p(uses)))
+        return scores
+
+    def select(self, schema, question, history=()):
+        """Назви таблиць для промпту в порядку пріоритету, в межах top_k і бюджету токенів"""
+        tables = schema.tables
+        if not tables:
+            return []
+        scores = self.score_tables(schema, question, history)
+        ranked = sorted(tables, key=lambda name: (-sum(scores[name]), name))
+        relevant = [name for name in ranked if scores[name][0] > 0][:self.top_k]
+        if not relevant or len(tables) <= self.top_k:
+            # Мала схема або жодного збігу - віддаємо всі таблиці за рейтингом, скільки влізе в бюджет
+            relevant = ranked
+
+        # Сусіди за зовнішніми ключами потрібні для JOIN
+        selected = list(relevant)
+        for name in relevant:
+            for neighbour in self._neighbours(schema, name):
+                if neighbour not in selected:
+                    selected.append(neighbour)
+
+        chosen = []
+        used = 0
+        for name in selected:
+            cost = len(format_table_schema(name, schema.objects[name].columns)) // 4 + 1
+            if chosen and used + cost > self.token_budget:
+                continue
+            chosen.append(name)
+            used += cost
+        return chosen
+
+    @staticmethod
+    def _neighbours(schema, name):
+        neighbours = [ref for _, ref, _ in schema.objects[name].foreign_keys if ref in schema.objects]
+        for other in schema.tables:
+            if any(ref == name for _, ref, _ in schema.objects[other].foreign_keys):
+                neighbours.append(other)
+        return neighbours
+
+def is_ai_error_sql(sql_query):
+    """try_mysql повертає помилки у вигляді SELECT 'Error...' - такі відповіді не кешуються"""
+    return sql_query.startswith(("SELECT 'Error", "SELECT 'No tables found"))
+
+class AIResponseCache:
+    """On-disk cache of generated SQL keyed by the normalized question and the schema fingerprint"""
+
+    def __init__(self, path, max_entries=1000, ttl_seconds=14 * 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS ai_cache (
+            cache_key TEXT PRIMARY KEY,
+            question TEXT NOT NULL,
+            schema_fingerprint TEXT NOT NULL,
+            sql_query TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL,
+            hits INTEGER DEFAULT 0
+        )''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ai_cache_last_used ON ai_cache(last_used)")
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS ai_cache_stats (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )''')
+        self.conn.commit()
+
+    @staticmethod
+    def normalize_question(question):
+        """Регістр, зайві пробіли та кінцеві розділові знаки не впливають на ключ"""
+        return " ".join(question.lower().split()).rstrip(" ?!.;")
+
+    def make_key(self, question, schema_fingerprint):
+        raw = f"{self.normalize_question(question)}\n{schema_fingerprint}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, question, schema_fingerprint):
+        """Збережений SQL або None; прострочені записи видаляються"""
+        key = self.make_key(question, schema_fingerprint)
+        now = time.time()
+        row = self.conn.execute("SELECT sql_query, created_at FROM ai_cache WHERE cache_key=?", (key,)).fetchone()
+        if row and now - row[1] > self.ttl_seconds:
+            self.conn.execute("DELETE FROM ai_cache WHERE cache_key=?", (key,))
+            row = None
+        if row:
+            self.conn.execute("UPDATE ai_cache SET last_used=?, hits=hits+1 WHERE cache_key=?", (now, key))
+        self._bump_stat("hits" if row else "misses")
+        self.conn.commit()
+        return row[0] if row else None
+
+    def put(self, question, schema_fingerprint, sql_query):
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO ai_cache (cache_key, question, schema_fingerprint, sql_query, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (self.make_key(question, schema_fingerprint), question, schema_fingerprint, sql_query, now, now))
+        # Витісняємо найдавніше використані записи понад ліміт
+        self.conn.execute(
+            "DELETE FROM ai_cache WHERE cache_key IN "
+            "(SELECT cache_key FROM ai_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,))
+        self.conn.commit()
+
+    def invalidate(self, question, schema_fingerprint):
+        """Видаляє один запис; True, якщо він існував"""
+        cursor = self.conn.execute("DELETE FROM ai_cache WHERE cache_key=?",
+                                   (self.make_key(question, schema_fingerprint),))
+        self.conn.commit()
+        return cursor.rowcount > 0
+
+    def clear(self):
+        self.conn.execute("DELETE FROM ai_cache")
+        self.conn.execute("DELETE FROM ai_cache_stats")
+        self.conn.commit()
+
+    def stats(self):
+        """Статистика кешу: hits, misses, entries"""
+        stats = dict(self.conn.execute("SELECT name, value FROM ai_cache_stats").fetchall())
+        entries = self.conn.execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0]
+        return {"hits": stats.get("hits", 0), "misses": stats.get("misses", 0), "entries": entries}
+
+    def _bump_stat(self, name):
+        self.conn.execute(
+            "INSERT INTO ai_cache_stats (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+
+    def close(self):
+        self.conn.close()
+
+class ResultCache:
+    """Кеш результатів запитів на читання з обмеженням за розміром (LRU) і скиданням на диск.
+
+    Ключ - шлях до бази та нормалізований SQL. Запис дійсний, доки не змінилися PRAGMA data_version
+    окремого з'єднання-спостерігача та mtime/розмір файлу бази: data_version змінюється після
+    кожного коміту інших з'єднань, mtime - коли файл замінили або змінили в обхід SQLite.
+    Частково прочитаний результат теж кешується - разом з ознакою has_more.
+    """
+    # Функції, результат яких залежить не лише від даних
+    VOLATILE = re.compile(
+        r"\b(random|randomblob|changes|total_changes|last_insert_rowid|current_time|current_date|"
+        r"current_timestamp)\b|'now'", re.IGNORECASE)
+    _LITERAL_OR_SPACE = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\])|\s+")
+
+    def __init__(self, max_bytes=64 * 2**20, max_entry_bytes=16 * 2**20, spill_dir=None,
+                 max_spill_bytes=256 * 2**20):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = max_spill_bytes
+        self.entries = {}    # ключ -> запис у пам'яті; порядок вставки = порядок використання
+        self.spilled = {}    # ключ -> (файл, розмір) для записів, витіснених на диск
+        self.memory_bytes = 0
+        self.spill_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._monitors = {}  # шлях до бази -> з'єднання для PRAGMA data_version
+        self._lock = threading.Lock()
+
+    @classmethod
+    def is_cacheable(cls, statements):
+        """Кешуються лише пакети з SELECT/WITH/VALUES без недетермінованих функцій"""
+        return (bool(statements) and is_read_only_sql(statements)
+                and all(first_keyword(s) in ("select", "with", "values") for s in statements)
+                and not any(cls.VOLATILE.search(s) for s in statements))
+
+    @classmethod
+    def normalize_sql(cls, statement):
+        """Зайві пробіли поза рядками та ідентифікаторами в лапках не впливають на ключ"""
+        return cls._LITERAL_OR_SPACE.sub(lambda m: m.group(1) or " ", statement).strip().rstrip(";").strip()
+
+    def make_key(self, db_path, statements):
+        return os.path.abspath(db_path), tuple(self.normalize_sql(s) for s in statements)
+
+    def fingerprint(self, db_path):
+        """(data_version, mtime_ns, розмір) бази або None, якщо файл недоступний"""
+        path = os.path.abspath(db_path)
+        try:
+            stat = os.stat(path)
+            with self._lock:
+                monitor = self._monitors.get(path)
+                if monitor is None:
+                    monitor = sqlite3.connect(f"file:{pathname2url(path)}?mode=ro", uri=True,
+                                              check_same_thread=False)
+                    self._monitors[path] = monitor
+                version = monitor.execute("PRAGMA data_version").fetchone()[0]
+        except (OSError, sqlite3.Error):
+            return None
+        return version, stat.st_mtime_ns, stat.st_size
+
+    def get(self, db_path, statements, fingerprint=None):
+        """Збережений запис {"fingerprint", "results", "bytes"} або None"""
+        key = self.make_key(db_path, statements)
+        fingerprint = fingerprint or self.fingerprint(db_path)
+        with self._lock:
+            entry = self.entries.pop(key, None)
+            if entry is None and key in self.spilled:
+                entry = self._load_spilled(key)
+            if entry is not None and fingerprint is not None and entry["fingerprint"] == fingerprint:
+                self.entries[key] = entry
+                self.hits += 1
+                self._evict()
+                return entry
+            if entry is not None:
+                self.memory_bytes -= entry["bytes"]
+            self.misses += 1
+            return None
+
+    def put(self, db_path, statements, fingerprint, results):
+        """Зберігає результати; fingerprint треба взяти до виконання запиту"""
+        if fingerprint is None:
+            return
+        key = self.make_key(db_path, statements)
+        size = sum(self._estimate(result["rows"]) + 100 * len(result["columns"]) for result in results)
+        with self._lock:
+            self._discard(key)
+            if size > self.max_entry_bytes:
+                return
+            self.entries[key] = {"fingerprint": fingerprint, "results": results, "bytes": size}
+            self.memory_bytes += size
+            self._evict()
+
+    def extend(self, db_path, statements, rows, has_more):
+        """Дописує дочитану порцію рядків до результату останньої інструкції"""
+        key = self.make_key(db_path, statements)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return
+            last = entry["results"][-1]
+            last["rows"].extend(rows)
+            last["rowcount"] = len(last["rows"])
+            last["has_more"] = has_more
+            size = self._estimate(rows)
+            entry["bytes"] += size
+            self.memory_bytes += size
+            if entry["bytes"] > self.max_entry_bytes:
+                self._discard(key)
+            self._evict()
+
+    def invalidate(self, db_path, statements):
+        with self._lock:
+            self._discard(self.make_key(db_path, statements))
+
+    def clear(self):
+        with self._lock:
+            for key in list(self.entries) + list(self.spilled):
+                self._discard(key)
+
+    def stats(self):
+        """Статистика кешу: hits, misses, entries, memory_bytes, spilled, spill_bytes"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries),
+                    "memory_bytes": self.memory_bytes, "spilled": len(self.spilled),
+                    "spill_bytes": self.spill_bytes}
+
+    def close(self):
+        self.clear()
+        with self._lock:
+            for monitor in self._monitors.values():
+                monitor.close()
+            self._monitors.clear()
+        if self.spill_dir is not None:
+            try:
+                os.rmdir(self.spill_dir)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _estimate(rows):
+        """Приблизний розмір рядків у пам'яті, байт"""
+        size = 0
+        for row in rows:
+            size += 56 + 8 * len(row)
+            for value in row:
+                size += len(value) + 49 if isinstance(value, (str, bytes)) else 24
+        return size
+
+    def _discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.memory_bytes -= entry["bytes"]
+        spilled = self.spilled.pop(key, None)
+        if spilled is not None:
+            self.spill_bytes -= spilled[1]
+            try:
+                os.remove(spilled[0])
+            except OSError:
+                pass
+
+    def _evict(self):
+        """Найдавніше використані записи переносяться на диск (якщо задано spill_dir) або видаляються"""
+        while self.memory_bytes > self.max_bytes and self.entries:
+            key = next(iter(self.entries))
+            entry = self.entries.pop(key)
+            self.memory_bytes -= entry["bytes"]
+            if self.spill_dir is not None:
+                self._spill(key, entry)
+        while self.spill_bytes > self.max_spill_bytes and self.spilled:
+            self._discard(next(iter(self.spilled)))
+
+    def _spill(self, key, entry):
+        import pickle
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, hashlib.sha256(repr(key).encode("utf-8")).hexdigest() + ".pickle")
+        try:
+            with open(path, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        self.spilled[key] = (path, size)
+        self.spill_bytes += size
+
+    def _load_spilled(self, key):
+        """Повертає запис з диска в пам'ять; розмір у пам'яті враховується знову"""
+        import pickle
+        path, size = self.spilled.pop(key)
+        self.spill_bytes -= size
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            entry = None
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        if entry is not None:
+            self.memory_bytes += entry["bytes"]
+        return entry
+
+class HistoryStore:
+    """Append-only історія запитів у SQLite з повнотекстовим пошуком (FTS5)"""
+    PAGE_SIZE = 200
+
+    def __init__(self, path="user_management.db"):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS query_history (
+            history_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            query TEXT NOT NULL,
+            db_path TEXT,
+            executed_at REAL NOT NULL,
+            elapsed_ms REAL,
+            row_count INTEGER,
+            profile TEXT
+        )''')
+        # Бази, створені до появи профілювання
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(query_history)")}
+        if "profile" not in columns:
+            self.conn.execute("ALTER TABLE query_history ADD COLUMN profile TEXT")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS query_history_user ON query_history(user_id, history_id DESC)")
+        self.has_fts = True
+        try:
+            # Зовнішній FTS-індекс зберігає лише токени, текст береться з query_history
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS query_history_fts USING fts5("
+                "query, content='query_history', content_rowid='history_id')")
+            self.conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS query_history_ai AFTER INSERT ON query_history BEGIN
+                INSERT INTO query_history_fts(rowid, query) VALUES (new.history_id, new.query);
+            END''')
+            self.conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS query_history_ad AFTER DELETE ON query_history BEGIN
+                INSERT INTO query_history_fts(query_history_fts, rowid, query)
+                VALUES ('delete', old.history_id, old.query);
+            END''')
+        except sqlite3.OperationalError as e:
+            # SQLite без FTS5 - пошук через LIKE
+            print(f"FTS5 недоступний, пошук в історії без індексу: {e}")
+            self.has_fts = False
+        self.conn.commit()
+
+    def append(self, user_id, query, db_path, executed_at=None):
+        """Додає один запис і повертає його history_id"""
+        cursor = self.conn.execute(
+            "INSERT INTO query_history (user_id, query, db_path, executed_at) VALUES (?, ?, ?, ?)",
+            (user_id, query, db_path, executed_at or time.time()))
+        self.conn.commit()
+        return cursor.lastrowid
+
+    def update_stats(self, history_id, elapsed_ms, row_count, profile=None):
+        """Час, кількість рядків і профіль виконання (JSON) після завершення пакета"""
+        self.conn.execute("UPDATE query_history SET elapsed_ms=?, row_count=?, profile=? WHERE history_id=?",
+                          (elapsed_ms, row_count,
+                           json.dumps(profile, ensure_ascii=False) if profile is not None else None,
+                           history_id))
+        self.conn.commit()
+
+    def get_profile(self, history_id):
+        row = self.conn.execute("SELECT profile FROM query_history WHERE history_id=?", (history_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    @staticmethod
+    def match_expression(search):
+        """Кожне слово пошуку - префіксна фраза FTS5: 'user_i' -> "user i"*"""
+        phrases = []
+        for word in search.split():
+            tokens = re.findall(r"[^\W_]+", word)
+            if tokens:
+                phrases.append('"' + " ".join(tokens) + '"*')
+        return " ".join(phrases)
+
+    def fetch(self, user_id, before_id=None, limit=None, search=""):
+        """Сторінка історії від нових до старих: записи з history_id < before_id"""
+        limit = limit or self.PAGE_SIZE
+        before_id = before_id if before_id is not None else sys.maxsize
+        columns = "h.history_id, h.query, h.db_path, h.executed_at, h.elapsed_ms, h.row_count"
+        match = self.match_expression(search) if self.has_fts else ""
+        if match:
+            return self.conn.execute(
+                f"SELECT {columns} FROM query_history_fts f "
+                "JOIN query_history h ON h.history_id = f.rowid "
+                "WHERE query_history_fts MATCH ? AND f.rowid < ? AND h.user_id IS ? "
+                "ORDER BY f.rowid DESC LIMIT ?",
+                (match, before_id, user_id, limit)).fetchall()
+        if search.strip() and not self.has_fts:
+            pattern = "%" + search.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            return self.conn.execute(
+                f"SELECT {columns} FROM query_history h "
+                "WHERE h.user_id IS ? AND h.history_id < ? AND h.query LIKE ? ESCAPE '\\' "
+                "ORDER BY h.history_id DESC LIMIT ?",
+                (user_id, before_id, pattern, limit)).fetchall()
+        return self.conn.execute(
+            f"SELECT {columns} FROM query_history h "
+            "WHERE h.user_id IS ? AND h.history_id < ? ORDER BY h.history_id DESC LIMIT ?",
+            (user_id, before_id, limit)).fetchall()
+
+    def recent_queries(self, user_id, limit=50):
+        """Останні різні запити користувача - для ранжування таблиць у SchemaPruner"""
+        # Групуються лише останні записи, а не вся історія користувача
+        rows = self.conn.execute(
+            "SELECT query FROM (SELECT query, history_id FROM query_history WHERE user_id IS ? "
+            "ORDER BY history_id DESC LIMIT ?) GROUP BY query ORDER BY MAX(history_id) DESC LIMIT ?",
+            (user_id, limit * 20, limit)).fetchall()
+        return [row[0] for row in rows]
+
+    def workload(self, db_path, user_id=None, limit=2000):
+        """Різні запити до бази з кількістю виконань - навантаження для IndexAdvisor.
+
+        user_id=None - історія всіх користувачів.
+        """
+        rows = self.conn.execute(
+            "SELECT query, COUNT(*) FROM (SELECT query FROM query_history "
+            "WHERE db_path = ? AND (? IS NULL OR user_id IS ?) ORDER BY history_id DESC LIMIT ?) "
+            "GROUP BY query ORDER BY COUNT(*) DESC",
+            (db_path, user_id, user_id, limit)).fetchall()
+        return [(query, count) for query, count in rows]
+
+    def clear(self, user_id):
+        self.conn.execute("DELETE FROM query_history WHERE user_id IS ?", (user_id,))
+        self.conn.commit()
+
+    def import_json(self, user_id, json_path):
+        """Одноразове перенесення старої JSON-історії; файл перейменовується в *.migrated"""
+        if not os.path.exists(json_path):
+            return 0
+        with open(json_path, 'r', encoding='utf-8') as f:
+            queries = json.load(f)
+        # У JSON найновіші запити стоять першими
+        now = time.time()
+        rows = [(user_id, q, None, now - i) for i, q in enumerate(queries) if isinstance(q, str)]
+        self.conn.executemany(
+            "INSERT INTO query_history (user_id, query, db_path, executed_at) VALUES (?, ?, ?, ?)",
+            reversed(rows))
+        self.conn.commit()
+        os.replace(json_path, json_path + ".migrated")
+        return len(rows)
+
+    def close(self):
+        self.conn.close()
+
+def authenticate(username, password, db_path="user_management.db"):
+    """Перевіряє логін і пароль; повертає (user_id, role) або None"""
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+
+        # Створити таблицю, якщо вона не існує
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            role TEXT DEFAULT 'user'
+        )''')
+
+        # Для першого запуску: додати адміністратора
+        cursor.execute("SELECT COUNT(*) FROM users")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+                          ("admin", "admin123", "admin"))
+            conn.commit()
+
+        # Перевірити користувача
+        cursor.execute("SELECT user_id, role FROM users WHERE username=? AND password=?",
+                      (username, password))
+        return cursor.fetchone()
+    finally:
+        conn.close()
+
+def load_favorites(user_id, db_path="user_management.db"):
+    """Закріплені запити користувача як список (назва, запит), новіші першими"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT query_name, query FROM user_favorites WHERE user_id=? ORDER BY created_at DESC",
+            (user_id,)).fetchall()
+    except sqlite3.OperationalError:
+        return []  # Таблиця ще не створена
+    finally:
+        conn.close()
+
+class ExportWriter:
+    """Base streaming export writer: open(headers) -> write_rows(batch)* -> close()"""
+
+    def __init__(self, filename, query):
+        self.filename = filename
+        self.query = query
+        self.headers = []
+        self.status_callback = None  # Встановлює ExportWorker або CLI для показу прогресу
+
+    def open(self, headers):
+        self.headers = list(headers)
+
+    def report_status(self, text):
+        if self.status_callback is not None:
+            self.status_callback(text)
+
+    @staticmethod
+    def text_value(value):
+        """Текст комірки; NULL у всіх форматах експорту - порожня комірка"""
+        return "" if value is None else str(value)
+
+    def write_rows(self, rows):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class PdfExportWriter(ExportWriter):
+    """PDF export split into one reportlab table per page; column widths are estimated from a sample.
+
+    reportlab тримає весь документ у пам'яті до збереження, тож посторінковий запис не обмежив би
+    пам'ять - замість цього PDF обмежено MAX_ROWS рядками. Більші результати - у CSV або XLSX.
+    """
+    WIDTH_SAMPLE_ROWS = 500
+    MAX_ROWS = 50000
+
+    def __init__(self, filename, query):
+        super().__init__(filename, query)
+        self.rows = []
+
+    def write_rows(self, rows):
+        if len(self.rows) + len(rows) > self.MAX_ROWS:
+            # Помилка одразу, а не після читання всього результату
+            raise ValueError(f"PDF обмежено {self.MAX_ROWS} рядками; для більшого результату "
+                             "оберіть експорт у CSV або Excel")
+        # Переноси рядків прибираємо, щоб висота рядка таблиці була сталою
+        for row in rows:
+            self.rows.append([self.text_value(value).replace("\n", " ") for value in row])
+
+    def close(self):
+        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.pagesizes import A4, landscape, portrait
+        from reportlab.lib.units import mm
+        from reportlab.lib import colors
+        from datetime import datetime
+
+        font_name, font_bold = register_pdf_fonts()
+
+        col_count = len(self.headers)
+        sample = [self.headers] + self.rows[:self.WIDTH_SAMPLE_ROWS]
+
+        # --- PDF page size/orientation logic ---
+        PAGE_MARGIN = 20 * mm
+        max_width = 160  # max width per column in points
+        # Estimate total table width from the sample only
+        col_widths = []
+        for col in range(col_count):
+            maxlen = max(len(row[col]) for row in sample)
+            width = min(40 + maxlen * 6, max_width)
+            col_widths.append(width)
+        table_width = sum(col_widths)
+        # If table too wide for portrait, use landscape
+        if table_width > (A4[0] - 2 * PAGE_MARGIN):
+            pagesize = landscape(A4)
+        else:
+            pagesize = portrait(A4)
+        available_width = pagesize[0] - 2 * PAGE_MARGIN
+        available_height = pagesize[1] - 2 * PAGE_MARGIN
+        # Scale columns if needed
+        scale = min(1.0, available_width / table_width)
+        col_widths = [w * scale for w in col_widths]
+
+        doc = SimpleDocTemplate(self.filename, pagesize=pagesize, rightMargin=PAGE_MARGIN, leftMargin=PAGE_MARGIN, topMargin=PAGE_MARGIN, bottomMargin=PAGE_MARGIN)
+        elements = []
+
+        styles = getSampleStyleSheet()
+        styles.add(ParagraphStyle(name='QueryHeader', fontName=font_bold, fontSize=16, spaceAfter=10, textColor=colors.darkblue, alignment=1))
+        styles.add(ParagraphStyle(name='NormalCustom', fontName=font_name, fontSize=11, spaceAfter=8))
+
+        elements.append(Paragraph("Результати SQL-запиту", styles['QueryHeader']))
+        # Текст запиту - не розмітка: "<" чи "&" у ньому зламали б Paragraph
+        elements.append(Paragraph(f"<b>SQL запит:</b> {escape(self.query)}", styles['NormalCustom']))
+        elements.append(Paragraph(f"<b>Час створення:</b> {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}", styles['NormalCustom']))
+        elements.append(Spacer(1, 10))
+
+        style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#1976d2")),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), font_bold),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('FONTNAME', (0, 1), (-1, -1), font_name),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ])
+
+        # Висоту заголовка і рядка міряємо пробними таблицями, щоб знати, скільки рядків уміщує сторінка
+        def measure(data):
+            probe = Table(data, colWidths=col_widths)
+            probe.setStyle(style)
+            return probe.wrap(available_width, available_height)[1]
+        header_height = measure([self.headers])
+        row_height = measure([self.headers, self.rows[0] if self.rows else [""] * col_count]) - header_height
+        intro_height = 0
+        for element in elements:
+            _, height = element.wrap(available_width, available_height)
+            intro_height += height + element.getSpaceBefore() + element.getSpaceAfter()
+        rows_per_page = max(1, int((available_height - header_height) / row_height) - 1)
+        first_page_rows = max(1, int((available_height - intro_height - header_height) / row_height) - 1)
+
+        # Кожна сторінка - окрема невелика таблиця: час верстки росте лінійно з кількістю рядків
+        chunk_starts = [0] + list(range(first_page_rows, len(self.rows), rows_per_page))
+        for i, start in enumerate(chunk_starts):
+            end = chunk_starts[i + 1] if i + 1 < len(chunk_starts) else len(self.rows)
+            if i:
+                elements.append(PageBreak())
+            pdf_table = Table([self.headers] + self.rows[start:end], colWidths=col_widths, repeatRows=1)
+            pdf_table.setStyle(style)
+            elements.append(pdf_table)
+
+        self._build_total = len(elements)
+        self._build_reported = -1
+        doc.setProgressCallBack(self._on_build_progress)
+        doc.build(elements)
+        self.rows = []
+
+    def _on_build_progress(self, kind, value):
+        if kind != "PROGRESS" or not self._build_total:
+            return
+        percent = value * 100 // self._build_total
+        if percent != self._build_reported:
+            self._build_reported = percent
+            self.report_status(f"Формування PDF: {percent}%")
+
+class DocxExportWriter(ExportWriter):
+    """Word export that appends table rows as raw XML in one pass per batch, sharing one cell style"""
+    ROWS_PER_SECTION = 5000   # Велика таблиця ділиться на секції з повтором заголовка
+    MAX_ROWS = 500000         # Понад це Word відкриває документ надто довго
+    CELL_STYLE = "SQL Table Cell"
+    HEADER_STYLE = "SQL Table Header"
+    _INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+    def open(self, headers):
+        from datetime import datetime
+        from docx import Document
+        from docx.enum.style import WD_STYLE_TYPE
+        from docx.oxml.ns import nsdecls
+        from docx.shared import Pt
+        super().open(headers)
+        self.w_ns = nsdecls("w")
+        self.doc = Document()
+        self.doc.add_heading("Результати SQL-запиту", 0)
+        self.doc.add_paragraph(f"SQL запит: {self.query}")
+        self.doc.add_paragraph(f"Час створення: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}")
+        self.doc.add_paragraph("")  # Відступ
+
+        # Спільні стилі абзаців замість форматування кожної комірки окремо
+        for name, size, bold in ((self.CELL_STYLE, 10, False), (self.HEADER_STYLE, 11, True)):
+            style = self.doc.styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH)
+            style.font.size = Pt(size)
+            style.font.bold = bold
+            style.paragraph_format.alignment = 1  # CENTER
+            style.paragraph_format.space_after = Pt(0)
+        self.cell_style_id = self.doc.styles[self.CELL_STYLE].style_id
+        self.header_style_id = self.doc.styles[self.HEADER_STYLE].style_id
+
+        self.rows_written = 0
+        self.truncated = False
+        self._start_table()
+
+    def _start_table(self):
+        """Нова таблиця з рядком заголовка, що повторюється на кожній сторінці"""
+        from docx.oxml import parse_xml
+        table = self.doc.add_table(rows=0, cols=len(self.headers))
+        table.style = 'Table Grid'
+        self.tbl = table._tbl
+        col_width = int(self.doc.sections[-1].page_width - self.doc.sections[-1].left_margin
+                        - self.doc.sections[-1].right_margin) // max(1, len(self.headers))
+        # python-docx зберігає ширини в EMU, а w:tcW - у двадцятих частках пункту
+        self.cell_props = f'<w:tcPr><w:tcW w:w="{col_width // 635}" w:type="dxa"/></w:tcPr>'
+        header = self._row_xml(self.headers, self.header_style_id, '<w:trPr><w:tblHeader/></w:trPr>')
+        self.tbl.append(parse_xml(header))
+        self.section_rows = 0
+
+    def _row_xml(self, values, style_id, row_props=""):
+        cells = []
+        for value in values:
+            text = escape(self._INVALID_XML_CHARS.sub("", self.text_value(value)))
+            cells.append(f'<w:tc>{self.cell_props}<w:p><w:pPr><w:pStyle w:val="{style_id}"/></w:pPr>'
+                         f'<w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p></w:tc>')
+        return f'<w:tr {self.w_ns}>{row_props}{"".join(cells)}</w:tr>'
+
+    def write_rows(self, rows):
+        from docx.enum.section import WD_SECTION
+        from docx.oxml import parse_xml
+        rows = list(rows)
+        while rows and not self.truncated:
+            if self.rows_written >= self.MAX_ROWS:
+                self.truncated = True
+                break
+            if self.section_rows >= self.ROWS_PER_SECTION:
+                self.doc.add_section(WD_SECTION.NEW_PAGE)
+                self._start_table()
+            take = min(len(rows), self.ROWS_PER_SECTION - self.section_rows, self.MAX_ROWS - self.rows_written)
+            chunk, rows = rows[:take], rows[take:]
+            # Один розбір XML на всю порцію рядків
+            body = "".join(self._row_xml(row, self.cell_style_id) for row in chunk)
+            parsed = parse_xml(f'<w:tbl {self.w_ns}>{body}</w:tbl>')
+            for tr in list(parsed):
+                self.tbl.append(tr)
+            self.section_rows += take
+            self.rows_written += take
+
+    def close(self):
+        if self.truncated:
+            self.doc.add_paragraph(f"Показано перші {self.MAX_ROWS} рядків результату.")
+        self.doc.save(self.filename)
+
+class XlsxExportWriter(ExportWriter):
+    """Excel export in openpyxl write_only mode; column widths are measured on the leading rows"""
+    # У write_only режимі ширини колонок треба задати до першого рядка,
+    # тому початкові рядки буферизуються і по них рахується ширина
+    WIDTH_SAMPLE_ROWS = 1000
+
+    def open(self, headers):
+        from openpyxl import Workbook
+        super().open(headers)
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet("SQL Results")
+        self.max_lengths = [len(str(h)) for h in self.headers]
+        self.pending = []
+        self.header_written = False
+
+    def _cell(self, value):
+        """Значення для openpyxl: числа лишаються числами, NULL - порожньою коміркою"""
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+        if value is None or isinstance(value, (int, float)):
+            return value
+        if isinstance(value, bytes):
+            value = str(value)
+        value = ILLEGAL_CHARACTERS_RE.sub("", value)
+        if value.startswith("="):
+            # Текст з бази не має ставати формулою
+            cell = WriteOnlyCell(self.ws, value=value)
+            cell.data_type = "s"
+            return cell
+        return value
+
+    def write_rows(self, rows):
+        if self.header_written:
+            for row in rows:
+                self.ws.append([self._cell(value) for value in row])
+            return
+        for row in rows:
+            for col, value in enumerate(row):
+                if value is not None and len(str(value)) > self.max_lengths[col]:
+                    self.max_lengths[col] = len(str(value))
+            self.pending.append([self._cell(value) for value in row])
+        if len(self.pending) >= self.WIDTH_SAMPLE_ROWS:
+            self._flush_pending()
+
+    def _flush_pending(self):
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Alignment, Font, PatternFill
+        from openpyxl.utils import get_column_letter
+
+        # Автоширина колонок
+        for col, max_length in enumerate(self.max_lengths, start=1):
+            self.ws.column_dimensions[get_column_letter(col)].width = max(10, min(max_length + 2, 40))
+
+        # Заголовки
+        header_fill = PatternFill(start_color="1976d2", end_color="1976d2", fill_type="solid")
+        header_cells = []
+        for header in self.headers:
+            cell = WriteOnlyCell(self.ws, value=header)
+            cell.font = Font(bold=True, color="FFFFFF")
+            cell.alignment = Alignment(horizontal="center", vertical="center")
+            cell.fill = header_fill
+            header_cells.append(cell)
+        self.ws.append(header_cells)
+        self.header_written = True
+
+        for values in self.pending:
+            self.ws.append(values)
+        self.pending = []
+
+    def close(self):
+        if not self.header_written:
+            self._flush_pending()
+        self.wb.save(self.filename)
+
+class CsvExportWriter(ExportWriter):
+    """CSV export that writes each batch straight to the file; filename "-" means stdout"""
+
+    def open(self, headers):
+        super().open(headers)
+        if self.filename == "-":
+            self.file = sys.stdout
+        else:
+            self.file = open(self.filename, "w", encoding="utf-8", newline="")
+        self.csv = csv.writer(self.file)
+        self.csv.writerow(self.headers)
+
+    def write_rows(self, rows):
+        self.csv.writerows(["" if value is None else value for value in row] for row in rows)
+
+    def close(self):
+        if self.file is not None and self.filename != "-":
+            self.file.close()
+        self.file = None
+
+# Формат експорту за розширенням файлу
+EXPORT_WRITERS = {
+    "csv": CsvExportWriter,
+    "pdf": PdfExportWriter,
+    "docx": DocxExportWriter,
+    "xlsx": XlsxExportWriter,
+}
+
+class QueryExport:
+    """Виконує інструкції на з'єднанні з пулу та передає рядки у writer порціями.
+
+    Інструкції, що повертають рядки, пишуться в один файл. Пакети зі змінами даних виконуються
+    (однією транзакцією) лише з allow_writes=True - так працює CLI; експорт вкладки в GUI
+    лише читає. Не залежить від Qt: ExportWorker і CLI передають callback-и.
+    """
+    BATCH_SIZE = 2000
+
+    def __init__(self, connections, db_path, statements, writer, authorizer=None,
+                 progress_callback=None, batch_size=None, allow_writes=False):
+        self.connections = connections
+        self.db_path = db_path
+        self.statements = statements
+        self.writer = writer
+        self.authorizer = authorizer
+        self.progress_callback = progress_callback
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.allow_writes = allow_writes
+        self.exported = 0
+        self.opened = False  # чи повернув пакет рядки (чи створено файл результату)
+        self.cancelled = False
+        self.conn = None
+        self._conn_lock = threading.Lock()
+
+    def run(self):
+        """Повертає кількість експортованих рядків; помилки SQLite і writer-а прокидаються далі.
+
+        Пакет лише зі змінами даних (allow_writes=True) завершується успішно з 0 рядків без файлу.
+        """
+        readonly = is_read_only_sql(self.statements)
+        if not readonly and not self.allow_writes:
+            raise ValueError("Експорт повторно виконує лише запити, що не змінюють дані")
+        conn = self.connections.acquire(self.db_path, readonly=readonly, authorizer=self.authorizer)
+        with self._conn_lock:
+            self.conn = conn
+        try:
+            explicit = not readonly and not any(
+                first_keyword(q) in NO_TRANSACTION_KEYWORDS for q in self.statements)
+            if explicit:
+                conn.execute("BEGIN")
+            for statement in self.statements:
+                if self.cancelled:
+                    raise sqlite3.OperationalError("interrupted")
+                cursor = conn.execute(statement)
+                if cursor.description is None:
+                    continue
+                if not self.opened:
+                    self.writer.open([desc[0] for desc in cursor.description])
+                    self.opened = True
+                while True:
+                    if self.cancelled:
+                        raise sqlite3.OperationalError("interrupted")
+                    batch = cursor.fetchmany(self.batch_size)
+                    if not batch:
+                        break
+                    self.writer.write_rows(batch)
+                    self.exported += len(batch)
+                    if self.progress_callback is not None:
+                        self.progress_callback(self.exported)
+            # Перевірка до COMMIT: помилковий пакет не повинен встигнути застосувати зміни
+            if not self.opened and readonly:
+                raise ValueError("Запит не повертає рядків для експорту")
+            if explicit:
+                conn.execute("COMMIT")
+            if not self.opened:
+                return 0
+            self.writer.close()
+            return self.exported
+        finally:
+            with self._conn_lock:
+                self.conn = None
+            # Незавершена транзакція відкочується під час повернення з'єднання в пул
+            self.connections.release(conn)
+
+    def cancel(self):
+        """Можна викликати з іншого потоку"""
+        self.cancelled = True
+        with self._conn_lock:
+            if self.conn is not None:
+                try:
+                    self.conn.interrupt()
+                except sqlite3.Error:
+                    pass
+
+class RowsExport:
+    """Експорт уже отриманих рядків - для результатів, які не можна безпечно виконати повторно"""
+    BATCH_SIZE = QueryExport.BATCH_SIZE
+
+    def __init__(self, columns, rows, writer, progress_callback=None, batch_size=None):
+        self.columns = columns
+        self.rows = rows
+        self.writer = writer
+        self.progress_callback = progress_callback
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.exported = 0
+        self.cancelled = False
+
+    def run(self):
+        self.writer.open(self.columns)
+        for start in range(0, len(self.rows), self.batch_size):
+            if self.cancelled:
+                raise sqlite3.OperationalError("interrupted")
+            batch = self.rows[start:start + self.batch_size]
+            self.writer.write_rows(batch)
+            self.exported += len(batch)
+            if self.progress_callback is not None:
+                self.progress_callback(self.exported)
+        self.writer.close()
+        return self.exported
+
+    def cancel(self):
+        self.cancelled = True
+
+IMPORT_FORMATS = {".csv": "csv", ".txt": "csv", ".tsv": "tsv", ".tab": "tsv",
+                  ".jsonl": "jsonl", ".ndjson": "jsonl"}
+IMPORT_TYPES = ("INTEGER", "REAL", "TEXT", "BLOB")
+_INTEGER_RE = re.compile(r"[+-]?\d{1,18}\Z")
+_LEADING_ZERO_RE = re.compile(r"[+-]?0\d")
+_REAL_RE = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?\Z")
+
+def infer_column_type(values):
+    """INTEGER, REAL або TEXT за вибіркою значень; порожні значення не враховуються"""
+    kind = None
+    for value in values:
+        if value is None or value == "":
+            continue
+        if isinstance(value, (bool, int)):
+            current = "INTEGER"
+        elif isinstance(value, float):
+            current = "REAL"
+        elif not isinstance(value, str):
+            return "TEXT"
+        elif _LEADING_ZERO_RE.match(value):
+            # Провідні нулі (поштові індекси, коди) зберігаються як текст
+            return "TEXT"
+        elif _INTEGER_RE.match(value):
+            current = "INTEGER"
+        elif _REAL_RE.match(value):
+            current = "REAL"
+        else:
+            return "TEXT"
+        if kind is None or current == "REAL":
+            kind = current
+    return kind or "TEXT"
+
+def import_column_name(field, position):
+    """Назва стовпця для поля файлу"""
+    name = re.sub(r"\s+", "_", str(field).strip())
+    return name or f"column_{position + 1}"
+
+class ImportSource:
+    """Потоковий читач CSV/TSV/JSON lines: назви полів, вибірка для визначення типів і рядки-кортежі.
+
+    Файл читається послідовно, у пам'яті лише поточний рядок; tell() дає прочитані байти для прогресу.
+    """
+    SAMPLE_ROWS = 1000
+
+    def __init__(self, filename, fmt=None):
+        self.filename = filename
+        extension = os.path.splitext(filename)[1].lower()
+        if fmt is None and extension == ".json":
+            # JSON-масив не читається порядково - потоковий імпорт підтримує лише JSON Lines
+            raise ValueError("Файли .json (JSON-масив) не підтримуються - збережіть дані як JSON Lines (.jsonl)")
+        self.format = fmt or IMPORT_FORMATS.get(extension, "csv")
+        self.size = os.path.getsize(filename)
+        self.delimiter = "\t" if self.format == "tsv" else ","
+        self._raw = None
+        self.fields, self.sample = self._scan()
+        self.types = [infer_column_type(row[i] for row in self.sample) for i in range(len(self.fields))]
+
+    def _open(self):
+        self._raw = open(self.filename, "rb")
+        return io.TextIOWrapper(self._raw, encoding="utf-8-sig", newline="")
+
+    def tell(self):
+        try:
+            return self._raw.tell() if self._raw is not None and not self._raw.closed else self.size
+        except (OSError, ValueError):
+            return 0
+
+    def _scan(self):
+        with self._open() as f:
+            if self.format == "jsonl":
+                objects = []
+                for number, line in enumerate(f, start=1):
+                    if line.strip():
+                        objects.append(self._parse_json(line, number))
+                        if len(objects) >= self.SAMPLE_ROWS:
+                            break
+                # Поля - об'єднання ключів вибірки; ключі, що з'являються пізніше, не імпортуються
+                fields = list(dict.fromkeys(key for obj in objects for key in obj))
+                return fields, [self._json_row(obj, fields) for obj in objects]
+            if self.format == "csv":
+                head = f.read(65536)
+                try:
+                    self.delimiter = csv.Sniffer().sniff(head, delimiters=",;\t|").delimiter
+                except csv.Error:
+                    pass
+                f.seek(0)
+            reader = csv.reader(f, delimiter=self.delimiter)
+            header = next(reader, None)
+            if header is None:
+                raise ValueError("Файл порожній")
+            fields = [import_column_name(field, i) for i, field in enumerate(header)]
+            return fields, [self._fit(row, len(fields)) for _, row in zip(range(self.SAMPLE_ROWS), reader)]
+
+    @staticmethod
+    def _parse_json(line, number):
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Рядок {number}: некоректний JSON ({e})")
+        if not isinstance(obj, dict):
+            raise ValueError(f"Рядок {number}: очікується JSON-об'єкт")
+        return obj
+
+    @staticmethod
+    def _json_row(obj, fields):
+        row = []
+        for field in fields:
+            value = obj.get(field)
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value, ensure_ascii=False)
+            elif isinstance(value, bool):
+                value = int(value)
+            row.append(value)
+        return row
+
+    @staticmethod
+    def _fit(row, width):
+        if len(row) == width:
+            return row
+        return (row + [None] * width)[:width]
+
+    def rows(self):
+        """Генератор рядків даних (без заголовка) у порядку полів"""
+        with self._open() as f:
+            try:
+                if self.format == "jsonl":
+                    fields = self.fields
+                    for number, line in enumerate(f, start=1):
+                        if line.strip():
+                            yield self._json_row(self._parse_json(line, number), fields)
+                    return
+                reader = csv.reader(f, delimiter=self.delimiter)
+                next(reader, None)
+                width = len(self.fields)
+                for row in reader:
+                    yield row if len(row) == width else self._fit(row, width)
+            finally:
+                self._raw = None
+
+class BulkImport:
+    """Завантажує ImportSource у таблицю: executemany великими порціями в одній явній транзакції.
+
+    На час імпорту вмикаються PRAGMA synchronous=OFF і великий cache_size, а звичайні індекси таблиці
+    можна видалити й створити заново після вставки. UNIQUE-індекси та індекси обмежень лишаються:
+    дублікати відхиляються одразу, а не після завантаження всього файлу.
+    Скасування або помилка відкочують імпорт повністю.
+    """
+    BATCH_SIZE = 50000
+    IMPORT_PRAGMAS = {"synchronous": "OFF", "cache_size": -262144}  # 256 MiB
+
+    def __init__(self, connections, db_path, source, table, columns, create=False, authorizer=None,
+                 defer_indexes=True, progress_callback=None, batch_size=None):
+        self.connections = connections
+        self.db_path = db_path
+        self.source = source
+        self.table = table
+        self.columns = columns      # [(індекс поля, стовпець таблиці, тип)]
+        self.create = create
+        self.authorizer = authorizer
+        self.defer_indexes = defer_indexes
+        self.progress_callback = progress_callback
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.imported = 0
+        self.cancelled = False
+        self.conn = None
+        self._conn_lock = threading.Lock()
+
+    def create_sql(self):
+        columns = ", ".join(f"{quote_identifier(name)} {col_type}" for _, name, col_type in self.columns)
+        return f"CREATE TABLE {quote_identifier(self.table)} ({columns})"
+
+    def insert_sql(self):
+        names = ", ".join(quote_identifier(name) for _, name, _ in self.columns)
+        marks = ", ".join("?" for _ in self.columns)
+        return f"INSERT INTO {quote_identifier(self.table)} ({names}) VALUES ({marks})"
+
+    def statements(self):
+        """Інструкції для попередньої перевірки прав (check_permissions)"""
+        return [self.create_sql()] if self.create else [self.insert_sql()]
+
+    def _values(self):
+        """Рядки файлу, зведені до вибраних стовпців; порожній рядок у нетекстовому стовпці стає NULL"""
+        indexes = [field for field, _, _ in self.columns]
+        blanks = [i for i, (_, _, col_type) in enumerate(self.columns)
+                  if not any(word in col_type.upper() for word in ("CHAR", "CLOB", "TEXT"))]
+        rows = self.source.rows()
+        if indexes == list(range(len(self.source.fields))) and not blanks:
+            return rows
+        return self._convert(rows, indexes, blanks)
+
+    @staticmethod
+    def _convert(rows, indexes, blanks):
+        for row in rows:
+            values = [row[i] for i in indexes]
+            for i in blanks:
+                if values[i] == "":
+                    values[i] = None
+            yield values
+
+    def run(self):
+        """Повертає кількість вставлених рядків; помилки SQLite і читання файлу прокидаються далі"""
+        conn = self.connections.acquire(self.db_path, readonly=False)
+        with self._conn_lock:
+            self.conn = conn
+        saved = {}
+        rows = None
+        try:
+            for name, value in self.IMPORT_PRAGMAS.items():
+                saved[name] = conn.execute(f"PRAGMA {name}").fetchone()[0]
+                conn.execute(f"PRAGMA {name}={value}")
+            conn.execute("BEGIN IMMEDIATE")
+            # Права користувача перевіряються на його інструкціях; службові DROP/CREATE INDEX - без authorizer
+            authorizer = bind_authorizer(conn, self.authorizer)
+            conn.set_authorizer(authorizer)
+            if self.create:
+                conn.execute(self.create_sql())
+            conn.set_authorizer(None)
+            deferred = []
+            if self.defer_indexes and not self.create:
+                # origin 'c' - CREATE INDEX; 'u' і 'pk' - індекси обмежень UNIQUE і PRIMARY KEY
+                deferred = conn.execute(
+                    "SELECT m.name, m.sql FROM pragma_index_list(?) il JOIN sqlite_master m ON m.name = il.name "
+                    "WHERE m.type = 'index' AND il.\"unique\" = 0 AND il.origin = 'c' AND m.sql IS NOT NULL",
+                    (self.table,)).fetchall()
+                for name, _ in deferred:
+                    conn.execute(f"DROP INDEX {quote_identifier(name)}")
+            conn.set_authorizer(authorizer)
+            insert = self.insert_sql()
+            rows = self._values()
+            while True:
+                if self.cancelled:
+                    raise sqlite3.OperationalError("interrupted")
+                batch = list(itertools.islice(rows, self.batch_size))
+                if not batch:
+                    break
+                conn.executemany(insert, batch)
+                self.imported += len(batch)
+                if self.progress_callback is not None:
+                    self.progress_callback(self.imported, self.source.tell() / max(self.source.size, 1), "")
+            conn.set_authorizer(None)
+            for index, (name, sql) in enumerate(deferred, start=1):
+                if self.cancelled:
+                    raise sqlite3.OperationalError("interrupted")
+                if self.progress_callback is not None:
+                    self.progress_callback(self.imported, 1.0, f"Створення індексу {name} ({index}/{len(deferred)})")
+                conn.execute(sql)
+            conn.execute("COMMIT")
+            return self.imported
+        finally:
+            with self._conn_lock:
+                self.conn = None
+            if rows is not None:
+                rows.close()   # закриває файл, якщо імпорт перервано
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+                for name, value in saved.items():
+                    conn.execute(f"PRAGMA {name}={value}")
+            except sqlite3.Error:
+                pass
+            self.connections.release(conn)
+
+    def cancel(self):
+        """Можна викликати з іншого потоку"""
+        self.cancelled = True
+        with self._conn_lock:
+            if self.conn is not None:
+                try:
+                    self.conn.interrupt()
+                except sqlite3.Error:
+                    pass
@@ -0,0 +1,88 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sql_core
+from sql_core import AIResponseCache, is_ai_error_sql
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sql_core.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = AIResponseCache(str(tmp_path / "ai_cache.db"), max_entries=2, ttl_seconds=60)
+    yield cache
+    cache.close()
+
+
+def test_question_is_normalized_but_schema_is_part_of_key(cache):
+    cache.put("Скільки працівників?", "fp1", "SELECT COUNT(*) FROM employees")
+    assert cache.get("  скільки   ПРАЦІВНИКІВ ", "fp1") == "SELECT COUNT(*) FROM employees"
+    assert cache.get("Скільки працівників?", "fp2") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_expired_entry_is_removed(cache, clock):
+    cache.put("q", "fp", "SELECT 1")
+    clock.now += 60
+    assert cache.get("q", "fp") == "SELECT 1"
+    clock.now += 1
+    assert cache.get("q", "fp") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_is_evicted(cache, clock):
+    cache.put("a", "fp", "SELECT 'a'")
+    clock.now += 1
+    cache.put("b", "fp", "SELECT 'b'")
+    clock.now += 1
+    assert cache.get("a", "fp") == "SELECT 'a'"   # "a" тепер новіший за "b"
+    clock.now += 1
+    cache.put("c", "fp", "SELECT 'c'")
+    assert cache.get("b", "fp") is None
+    assert cache.get("a", "fp") == "SELECT 'a'"
+    assert cache.get("c", "fp") == "SELECT 'c'"
+
+
+def test_entries_survive_reopen(tmp_path, clock):
+    path = str(tmp_path / "ai_cache.db")
+    cache = AIResponseCache(path)
+    cache.put("q", "fp", "SELECT 1")
+    cache.close()
+    cache = AIResponseCache(path)
+    try:
+        assert cache.get("q", "fp") == "SELECT 1"
+    finally:
+        cache.close()
+
+
+def test_invalidate_and_clear(cache):
+    cache.put("q", "fp", "SELECT 1")
+    assert cache.invalidate("Q?", "fp")
+    assert not cache.invalidate("q", "fp")
+    cache.put("q", "fp", "SELECT 1")
+    cache.get("q", "fp")
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "entries": 0}
+
+
+def test_error_answers_are_recognized():
+    assert is_ai_error_sql("SELECT 'Error: no tables'")
+    assert is_ai_error_sql("SELECT 'No tables found'")
+    assert not is_ai_error_sql("SELECT error FROM log")
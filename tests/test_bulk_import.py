@@ -0,0 +1,109 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_core import BulkImport, ConnectionManager, ImportSource
+
+
+@pytest.fixture
+def database(tmp_path):
+    db_path = str(tmp_path / "import.db")
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE people (id INTEGER PRIMARY KEY, email TEXT, city TEXT);
+        CREATE UNIQUE INDEX people_email ON people (email);
+        CREATE INDEX people_city ON people (city);
+        INSERT INTO people (email, city) VALUES ('old@example.com', 'Kyiv');
+    """)
+    conn.close()
+    connections = ConnectionManager()
+    yield db_path, connections
+    connections.close_all()
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def people_import(connections, db_path, source, **options):
+    columns = [(0, "email", "TEXT"), (1, "city", "TEXT")]
+    return BulkImport(connections, db_path, source, "people", columns, **options)
+
+
+def indexes(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name='people'"))
+    finally:
+        conn.close()
+
+
+def count(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM people").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_csv_import_restores_deferred_indexes(tmp_path, database):
+    db_path, connections = database
+    before = indexes(db_path)
+    rows = "\n".join(f"user{i}@example.com,City {i % 5}" for i in range(1000))
+    source = ImportSource(write(tmp_path, "people.csv", "email,city\n" + rows + "\n"))
+    assert people_import(connections, db_path, source, batch_size=128).run() == 1000
+    assert count(db_path) == 1001
+    assert indexes(db_path) == before
+
+
+def test_unique_index_rejects_duplicates_and_rolls_back(tmp_path, database):
+    db_path, connections = database
+    seen = []
+    source = ImportSource(write(tmp_path, "dupes.csv",
+                                "email,city\na@example.com,Lviv\nold@example.com,Odesa\nb@example.com,Lviv\n"))
+    bulk = people_import(connections, db_path, source, batch_size=1,
+                         progress_callback=lambda rows, fraction, text: seen.append(rows))
+    with pytest.raises(sqlite3.IntegrityError):
+        bulk.run()
+    # Дублікат виявлено на другій порції, а не під час створення індексу наприкінці
+    assert seen == [1]
+    assert count(db_path) == 1
+    assert indexes(db_path)["people_city"] is not None
+
+
+def test_jsonl_import_into_new_table(tmp_path, database):
+    db_path, connections = database
+    source = ImportSource(write(tmp_path, "rows.jsonl", '{"a": 1, "b": "x"}\n\n{"a": 2}\n'))
+    assert source.format == "jsonl"
+    assert source.types == ["INTEGER", "TEXT"]
+    bulk = BulkImport(connections, db_path, source, "events",
+                      [(0, "a", "INTEGER"), (1, "b", "TEXT")], create=True)
+    assert bulk.run() == 2
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute("SELECT a, b FROM events ORDER BY a").fetchall() == [(1, "x"), (2, None)]
+    finally:
+        conn.close()
+
+
+def test_json_array_files_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="JSON Lines"):
+        ImportSource(write(tmp_path, "rows.json", '[{"a": 1}]'))
+
+
+def test_cancel_rolls_back(tmp_path, database):
+    db_path, connections = database
+    source = ImportSource(write(tmp_path, "people.csv",
+                                "email,city\n" + "\n".join(f"u{i}@example.com,X" for i in range(100)) + "\n"))
+    bulk = people_import(connections, db_path, source, batch_size=10)
+    bulk.progress_callback = lambda rows, fraction, text: bulk.cancel()
+    with pytest.raises(sqlite3.OperationalError):
+        bulk.run()
+    assert count(db_path) == 1
+    assert set(indexes(db_path)) == {"people_email", "people_city"}
@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_core import ChangeConflict, ChangeSet, ConnectionManager, SchemaCatalog, TableBrowser
+
+
+@pytest.fixture
+def grid(tmp_path):
+    """Сторінка таблиці, як її бачить редагована вкладка: рядки з прихованим rowid у кінці"""
+    db_path = str(tmp_path / "edit.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE items (name TEXT, qty INTEGER, note TEXT)")
+    conn.executemany("INSERT INTO items VALUES (?, ?, ?)",
+                     [("apple", 1, None), ("pear", 2, "ripe"), ("plum", 3, None), ("fig", 4, "dry")])
+    conn.commit()
+    conn.close()
+    connections = ConnectionManager()
+    info = SchemaCatalog(connections).table(db_path, "items")
+    browser = TableBrowser(info)
+    reader = connections.get(db_path)
+    rows = browser.first(reader)
+    writer = connections.acquire(db_path, readonly=False)
+    yield ChangeSet(browser), rows, writer, reader
+    connections.release(writer)
+    connections.close_all()
+
+
+def table(conn):
+    return conn.execute("SELECT rowid, name, qty, note FROM items ORDER BY rowid").fetchall()
+
+
+def test_apply_groups_statements_in_one_transaction(grid):
+    changes, rows, writer, reader = grid
+    changes.set_value(rows[0], "qty", 10)
+    changes.set_value(rows[1], "qty", 20)
+    changes.set_value(rows[2], "name", "prune")
+    changes.toggle_delete(rows[3])
+    index = changes.add_row()
+    changes.set_insert_value(index, "name", "kiwi")
+    assert len(changes) == 5
+    shapes = sorted(sql.split()[0] for sql, _ in changes.statements())
+    assert shapes == ["DELETE", "INSERT", "UPDATE", "UPDATE"]
+    assert changes.apply(writer) == 5
+    assert table(reader) == [(1, "apple", 10, None), (2, "pear", 20, "ripe"), (3, "prune", 3, None),
+                             (4, "kiwi", None, None)]
+
+
+def test_reverting_a_cell_drops_the_change(grid):
+    changes, rows, _, _ = grid
+    changes.set_value(rows[0], "qty", "5")
+    changes.set_value(rows[0], "qty", "1")
+    assert len(changes) == 0
+    assert not changes.is_dirty(rows[0], "qty")
+
+
+def test_deleted_and_edited_row_counts_once(grid):
+    changes, rows, writer, reader = grid
+    changes.set_value(rows[0], "qty", 7)
+    changes.toggle_delete(rows[0])
+    assert len(changes) == 1
+    changes.apply(writer)
+    assert [row[1] for row in table(reader)] == ["pear", "plum", "fig"]
+
+
+def test_concurrent_edit_of_same_cell_is_a_conflict(grid):
+    changes, rows, writer, reader = grid
+    changes.set_value(rows[1], "qty", 99)
+    changes.set_value(rows[2], "qty", 33)
+    reader.execute("UPDATE items SET qty = 50 WHERE rowid = 2")
+    before = table(reader)
+    with pytest.raises(ChangeConflict) as error:
+        changes.apply(writer)
+    assert error.value.keys == [(2,)]
+    # Нічого не записано - і зміни лишаються, щоб їх можна було переглянути
+    assert table(reader) == before
+    assert len(changes) == 2
+    assert not writer.in_transaction
+
+
+def test_edit_of_other_column_is_not_a_conflict(grid):
+    changes, rows, writer, reader = grid
+    changes.set_value(rows[1], "qty", 99)
+    reader.execute("UPDATE items SET note = 'soft' WHERE rowid = 2")
+    changes.apply(writer)
+    assert table(reader)[1] == (2, "pear", 99, "soft")
+
+
+def test_deleting_a_changed_or_missing_row_is_a_conflict(grid):
+    changes, rows, writer, reader = grid
+    changes.toggle_delete(rows[0])
+    changes.toggle_delete(rows[2])
+    reader.execute("UPDATE items SET note = 'x' WHERE rowid = 1")
+    reader.execute("DELETE FROM items WHERE rowid = 3")
+    with pytest.raises(ChangeConflict) as error:
+        changes.apply(writer)
+    assert sorted(error.value.keys) == [(1,), (3,)]
+
+
+def test_cancelled_apply_writes_nothing(grid):
+    changes, rows, writer, reader = grid
+    changes.set_value(rows[0], "qty", 10)
+    changes.toggle_delete(rows[1])
+    calls = []
+
+    def cancelled():
+        calls.append(1)
+        return len(calls) > 1   # скасування після першої інструкції
+
+    before = table(reader)
+    with pytest.raises(sqlite3.OperationalError, match="interrupted"):
+        changes.apply(writer, cancelled)
+    assert table(reader) == before
+    assert not writer.in_transaction
+    assert len(changes) == 2
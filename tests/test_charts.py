@@ -0,0 +1,97 @@
+import math
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_core import chart_categories, chart_line, lttb
+
+
+def sine(n):
+    return [(float(i), math.sin(i / 50.0)) for i in range(n)]
+
+
+def test_lttb_keeps_endpoints_and_size():
+    points = sine(10000)
+    sampled = lttb(points, 500)
+    assert len(sampled) == 500
+    assert sampled[0] == points[0]
+    assert sampled[-1] == points[-1]
+    assert [p[0] for p in sampled] == sorted(p[0] for p in sampled)
+    assert set(sampled) <= set(points)
+
+
+def test_lttb_keeps_spikes():
+    points = [(float(i), 0.0) for i in range(5000)]
+    points[1234] = (1234.0, 100.0)
+    points[4321] = (4321.0, -80.0)
+    sampled = lttb(points, 100)
+    assert (1234.0, 100.0) in sampled
+    assert (4321.0, -80.0) in sampled
+
+
+def test_lttb_shape_error_is_small():
+    points = sine(20000)
+    sampled = lttb(points, 800)
+    # Лінійна інтерполяція вибірки відтворює синусоїду з малою похибкою
+    worst = 0.0
+    j = 0
+    for x, y in points:
+        while j + 1 < len(sampled) - 1 and sampled[j + 1][0] <= x:
+            j += 1
+        (x0, y0), (x1, y1) = sampled[j], sampled[j + 1]
+        estimate = y0 + (y1 - y0) * (x - x0) / (x1 - x0) if x1 != x0 else y0
+        worst = max(worst, abs(estimate - y))
+    assert worst < 0.05
+
+
+@pytest.mark.parametrize("threshold", [0, 2, 10000])
+def test_lttb_returns_input_when_nothing_to_drop(threshold):
+    points = sine(50)
+    assert lttb(points, threshold) == points
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE m (t TEXT, x INTEGER, y REAL, kind TEXT)")
+    conn.executemany("INSERT INTO m VALUES (?, ?, ?, ?)",
+                     [(f"2024-01-01 00:{i // 60 % 60:02d}:{i % 60:02d}", i, 1000.0 if i == 7777 else float(i % 10),
+                       "ab"[i % 2] if i % 5 else "c") for i in range(20000)])
+    yield conn
+    conn.close()
+
+
+def test_chart_line_buckets_in_sql_and_keeps_peak(conn):
+    points, info = chart_line(conn, "SELECT x, y FROM m", "x", "y", width=100)
+    assert info["rows"] == 20000
+    assert 0 < info["buckets"] <= 400
+    assert len(points) <= 100
+    assert max(py for _, py in points) == 1000.0
+
+
+def test_chart_line_small_result_is_exact(conn):
+    points, info = chart_line(conn, "SELECT x, y FROM m WHERE x < 50", "x", "y", width=100)
+    assert info["buckets"] == 0
+    assert points == [(float(i), float(i % 10)) for i in range(50)]
+
+
+def test_chart_line_text_dates_become_unix_ms(conn):
+    points, info = chart_line(conn, "SELECT t, y FROM m WHERE x < 3", "t", "y")
+    assert info["is_time"]
+    assert points[0][0] == pytest.approx(1704067200000.0, abs=1)
+    assert points[1][0] - points[0][0] == pytest.approx(1000.0, abs=1)
+
+
+def test_chart_categories_aggregates_and_limits(conn):
+    rows, more = chart_categories(conn, "SELECT kind, y FROM m", "kind")
+    assert dict(rows) == {"a": 8000, "b": 8000, "c": 4000}
+    assert not more
+    rows, more = chart_categories(conn, "SELECT kind, y FROM m", "kind", "y", "MAX", limit=1)
+    assert rows == [("b", 1000.0)]
+    assert more
+    with pytest.raises(ValueError):
+        chart_categories(conn, "SELECT kind FROM m", "kind", "kind", "DROP")
@@ -0,0 +1,78 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sql_cli
+
+
+class ReadOnlyJobsTest(unittest.TestCase):
+    """Завдання лише на читання не змінюють файл бази: ні даних, ні режиму журналу"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp, "data.db")
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT); INSERT INTO t (name) VALUES ('a');")
+        conn.close()
+        self.users_db = os.path.join(self.tmp, "users.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def run_cli(self, *queries):
+        argv = ["--db", self.db_path, "--user", "admin", "--password", "admin123",
+                "--users-db", self.users_db, "--output-dir", self.tmp, "--jobs", "2"]
+        for query in queries:
+            argv += ["--query", query]
+        return sql_cli.main(argv)
+
+    def journal_mode(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute("PRAGMA journal_mode").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_read_only_jobs_keep_journal_mode(self):
+        self.assertEqual(self.run_cli("SELECT * FROM t", "SELECT COUNT(*) FROM t"), 0)
+        self.assertEqual(self.journal_mode(), "delete")
+        self.assertFalse(os.path.exists(self.db_path + "-wal"))
+
+    def test_write_job_is_applied(self):
+        self.assertEqual(self.run_cli("INSERT INTO t (name) VALUES ('b') RETURNING id"), 0)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM t").fetchone()[0], 2)
+        finally:
+            conn.close()
+        self.assertEqual(self.journal_mode(), "delete")
+
+    def test_write_only_job_succeeds_without_file(self):
+        self.assertEqual(self.run_cli("UPDATE t SET name = 'b'"), 0)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.assertEqual(conn.execute("SELECT name FROM t").fetchone()[0], "b")
+        finally:
+            conn.close()
+        self.assertEqual([f for f in os.listdir(self.tmp) if f.endswith(".csv")], [])
+
+    def test_missing_permissions_table_is_reported(self):
+        conn = sqlite3.connect(self.users_db)
+        conn.executescript("""
+            CREATE TABLE users (user_id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL,
+                                password TEXT NOT NULL, role TEXT DEFAULT 'user');
+            INSERT INTO users (username, password, role) VALUES ('viewer', 'secret', 'user');
+        """)
+        conn.close()
+        argv = ["--db", self.db_path, "--user", "viewer", "--password", "secret",
+                "--users-db", self.users_db, "--output-dir", self.tmp, "--query", "SELECT * FROM t"]
+        self.assertEqual(sql_cli.main(argv), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_core import ConnectionManager, PermissionSet, is_authorization_error
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "pool.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.execute("INSERT INTO t (name) VALUES ('a')")
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def connections():
+    connections = ConnectionManager()
+    yield connections
+    connections.close_all()
+
+
+def pragma(conn, name):
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def test_released_connection_is_reused_per_mode(db_path, connections):
+    reader = connections.acquire(db_path)
+    connections.release(reader)
+    assert connections.acquire(db_path) is reader
+    writer = connections.acquire(db_path, readonly=False)
+    assert writer is not reader
+    connections.release(writer)
+    connections.release(reader)
+
+
+def test_idle_pool_is_bounded(db_path, connections):
+    conns = [connections.acquire(db_path) for _ in range(ConnectionManager.MAX_IDLE_PER_DB + 2)]
+    for conn in conns:
+        connections.release(conn)
+    assert len(connections._idle[(db_path, True)]) == ConnectionManager.MAX_IDLE_PER_DB
+    with pytest.raises(sqlite3.ProgrammingError):
+        conns[-1].execute("SELECT 1")
+
+
+def test_get_returns_same_gui_connection(db_path, connections):
+    assert connections.get(db_path) is connections.get(db_path)
+
+
+def test_pragmas_applied_and_journal_mode_untouched(db_path):
+    connections = ConnectionManager(pragmas={"cache_size": -1024})
+    try:
+        conn = connections.acquire(db_path, readonly=False)
+        assert pragma(conn, "cache_size") == -1024
+        assert pragma(conn, "busy_timeout") == 5000
+        assert pragma(conn, "temp_store") == 2   # MEMORY
+        # WAL не вмикається без явного запиту - режим журналу зберігається у файлі бази
+        assert pragma(conn, "journal_mode") == "delete"
+        connections.release(conn)
+    finally:
+        connections.close_all()
+    assert not os.path.exists(db_path + "-wal")
+
+
+def test_readonly_connection_cannot_write(db_path, connections):
+    conn = connections.acquire(db_path)
+    try:
+        assert conn.execute("SELECT name FROM t").fetchall() == [("a",)]
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            conn.execute("INSERT INTO t (name) VALUES ('b')")
+    finally:
+        connections.release(conn)
+
+
+def test_release_rolls_back_and_resets_hooks(db_path, connections):
+    conn = connections.acquire(db_path, readonly=False, authorizer=lambda *args: sqlite3.SQLITE_OK)
+    conn.execute("BEGIN")
+    conn.execute("INSERT INTO t (name) VALUES ('b')")
+    connections.release(conn)
+    assert not conn.in_transaction
+    assert connections.get(db_path).execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+    # Повторно виданий без authorizer - запити не обмежуються
+    again = connections.acquire(db_path, readonly=False)
+    assert again is conn
+    again.execute("DELETE FROM t")
+    connections.release(again)
+
+
+def test_permission_set_is_bound_to_connection(db_path, connections):
+    permissions = PermissionSet(2, {"t": {"select": False, "insert": False, "update": False, "delete": False}})
+    conn = connections.acquire(db_path, authorizer=permissions)
+    try:
+        with pytest.raises(sqlite3.DatabaseError) as error:
+            conn.execute("SELECT * FROM t").fetchall()
+        assert is_authorization_error(str(error.value))
+    finally:
+        connections.release(conn)
+    conn = connections.acquire(db_path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+    finally:
+        connections.release(conn)
@@ -0,0 +1,42 @@
+import csv
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_core import CsvExportWriter, ExportWriter, XlsxExportWriter
+
+ROWS = [(1, 2.5, "=1+1", None), (2, None, "a\x01b", "x")]
+
+
+def test_null_is_empty_cell_in_text_formats():
+    assert ExportWriter.text_value(None) == ""
+    assert ExportWriter.text_value(0) == "0"
+
+
+def test_csv_writes_null_as_empty(tmp_path):
+    path = str(tmp_path / "out.csv")
+    writer = CsvExportWriter(path, "SELECT 1")
+    writer.open(["i", "f", "s", "n"])
+    writer.write_rows(ROWS)
+    writer.close()
+    with open(path, encoding="utf-8", newline="") as f:
+        assert list(csv.reader(f))[1:] == [["1", "2.5", "=1+1", ""], ["2", "", "a\x01b", "x"]]
+
+
+@pytest.mark.parametrize("sample_rows", [1000, 1])
+def test_xlsx_keeps_native_values(tmp_path, sample_rows):
+    openpyxl = pytest.importorskip("openpyxl")
+    path = str(tmp_path / "out.xlsx")
+    writer = XlsxExportWriter(path, "SELECT 1")
+    writer.WIDTH_SAMPLE_ROWS = sample_rows   # 1 - другий рядок іде вже після заголовка
+    writer.open(["i", "f", "s", "n"])
+    writer.write_rows(ROWS[:1])
+    writer.write_rows(ROWS[1:])
+    writer.close()
+    sheet = openpyxl.load_workbook(path).active
+    assert list(sheet.iter_rows(min_row=2, values_only=True)) == [(1, 2.5, "=1+1", None), (2, None, "ab", "x")]
+    # Текст, що починається з "=", лишається текстом, а не формулою
+    assert sheet["C2"].data_type == "s"
@@ -0,0 +1,84 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_core import HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "users.db"))
+    yield store
+    store.close()
+
+
+def queries(rows):
+    return [row[1] for row in rows]
+
+
+def test_fts_search_follows_inserts_and_deletes(store):
+    if not store.has_fts:
+        pytest.skip("SQLite без FTS5")
+    store.append(1, "SELECT * FROM employees", "a.db")
+    store.append(1, "SELECT user_id FROM users", "a.db")
+    store.append(2, "SELECT * FROM employees WHERE id = 2", "a.db")
+    assert queries(store.fetch(1, search="employ")) == ["SELECT * FROM employees"]
+    # "user_i" - префікс фрази "user id", а не LIKE-шаблон
+    assert queries(store.fetch(1, search="user_i")) == ["SELECT user_id FROM users"]
+
+    store.clear(1)
+    assert store.fetch(1, search="employ") == []
+    assert queries(store.fetch(2, search="employ")) == ["SELECT * FROM employees WHERE id = 2"]
+    # Тригер видалення прибрав токени: integrity-check падає, якщо індекс розійшовся з таблицею
+    store.conn.execute("INSERT INTO query_history_fts(query_history_fts) VALUES ('integrity-check')")
+
+
+def test_fetch_pages_from_newest(store):
+    ids = [store.append(1, f"SELECT {i}", "a.db") for i in range(5)]
+    first = store.fetch(1, limit=2)
+    assert queries(first) == ["SELECT 4", "SELECT 3"]
+    second = store.fetch(1, before_id=first[-1][0], limit=2)
+    assert queries(second) == ["SELECT 2", "SELECT 1"]
+    assert [row[0] for row in first + second] == ids[:0:-1]
+
+
+def test_search_without_letters_returns_page(store):
+    store.append(1, "SELECT 1", "a.db")
+    assert queries(store.fetch(1, search="!!")) == ["SELECT 1"]
+
+
+def test_stats_and_profile(store):
+    history_id = store.append(1, "SELECT 1", "a.db")
+    store.update_stats(history_id, 12.5, 1, {"total_ms": 12.5})
+    assert store.get_profile(history_id) == {"total_ms": 12.5}
+    assert store.fetch(1)[0][4:] == (12.5, 1)
+
+
+def test_workload_and_recent_queries(store):
+    for query in ["SELECT a", "SELECT b", "SELECT a", "SELECT c"]:
+        store.append(1, query, "a.db")
+    store.append(2, "SELECT a", "a.db")
+    store.append(1, "SELECT z", "b.db")
+    workload = store.workload("a.db")
+    assert workload[0] == ("SELECT a", 3)
+    assert dict(workload) == {"SELECT a": 3, "SELECT b": 1, "SELECT c": 1}
+    assert dict(store.workload("a.db", user_id=1))["SELECT a"] == 2
+    assert store.recent_queries(1) == ["SELECT z", "SELECT c", "SELECT a", "SELECT b"]
+
+
+def test_json_migration_keeps_order_and_renames_file(store, tmp_path):
+    path = tmp_path / "user_history_1.json"
+    path.write_text(json.dumps(["SELECT newest", "SELECT middle", 42, "SELECT oldest"]), encoding="utf-8")
+    assert store.import_json(1, str(path)) == 3
+    assert not path.exists()
+    assert (tmp_path / "user_history_1.json.migrated").exists()
+    assert queries(store.fetch(1)) == ["SELECT newest", "SELECT middle", "SELECT oldest"]
+    if store.has_fts:
+        assert queries(store.fetch(1, search="middle")) == ["SELECT middle"]
+    # Повторний запуск нічого не дублює
+    assert store.import_json(1, str(path)) == 0
+    assert len(store.fetch(1)) == 3
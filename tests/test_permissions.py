@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_core import ConnectionManager, PermissionSet
+
+
+class ViewPermissionTest(unittest.TestCase):
+    """Читання через представлення перевіряється за таблицею під ним; тіла тригерів - ні"""
+
+    def setUp(self):
+        handle, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript("""
+            CREATE TABLE secret (id INTEGER PRIMARY KEY, value TEXT);
+            CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT);
+            CREATE TABLE audit (note_id INTEGER);
+            CREATE VIEW v AS SELECT * FROM secret;
+            CREATE TRIGGER notes_audit AFTER INSERT ON notes
+            BEGIN INSERT INTO audit VALUES (new.id); END;
+            INSERT INTO secret (value) VALUES ('s');
+        """)
+        conn.close()
+        self.permissions = PermissionSet(2, {
+            "secret": {"select": False, "insert": False, "update": False, "delete": False},
+            "notes": {"select": True, "insert": True, "update": False, "delete": False},
+        })
+        self.connections = ConnectionManager()
+
+    def tearDown(self):
+        self.connections.close_all()
+        os.remove(self.db_path)
+
+    def test_denied_table_through_view(self):
+        conn = self.connections.acquire(self.db_path, readonly=True, authorizer=self.permissions)
+        try:
+            with self.assertRaises(sqlite3.DatabaseError):
+                conn.execute("SELECT * FROM v").fetchall()
+            with self.assertRaises(sqlite3.DatabaseError):
+                conn.execute("SELECT * FROM secret").fetchall()
+        finally:
+            self.connections.release(conn)
+
+    def test_check_statements_rejects_view_over_denied_table(self):
+        conn = self.connections.acquire(self.db_path, readonly=True)
+        try:
+            self.assertFalse(self.permissions.check_statements(conn, ["SELECT * FROM v"]))
+            self.assertTrue(self.permissions.check_statements(conn, ["SELECT * FROM notes"]))
+        finally:
+            self.connections.release(conn)
+
+    def test_trigger_body_is_exempt(self):
+        conn = self.connections.acquire(self.db_path, readonly=False, authorizer=self.permissions)
+        try:
+            conn.execute("INSERT INTO notes (body) VALUES ('n')")
+            conn.commit()
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0], 1)
+        finally:
+            self.connections.release(conn)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_core import ResultCache
+
+QUERY = ["SELECT * FROM t"]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "cache.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO t (name) VALUES (?)", [("a",), ("b",)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def cache():
+    cache = ResultCache()
+    yield cache
+    cache.close()
+
+
+def results(rows, has_more=False):
+    return [{"index": 0, "statement": QUERY[0], "columns": ["id", "name"], "rows": list(rows),
+             "has_more": has_more, "truncated": False, "rowcount": len(rows)}]
+
+
+def test_hit_until_another_connection_commits(db_path, cache):
+    cache.put(db_path, QUERY, cache.fingerprint(db_path), results([(1, "a"), (2, "b")]))
+    assert cache.get(db_path, ["SELECT  *\nFROM t;"])["results"][0]["rows"] == [(1, "a"), (2, "b")]
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE t SET name = 'z' WHERE id = 1")
+    conn.commit()
+    conn.close()
+    assert cache.get(db_path, QUERY) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_file_modified_outside_sqlite_invalidates(db_path, cache):
+    fingerprint = cache.fingerprint(db_path)
+    cache.put(db_path, QUERY, fingerprint, results([(1, "a")]))
+    stat = os.stat(db_path)
+    os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.fingerprint(db_path) != fingerprint
+    assert cache.get(db_path, QUERY) is None
+
+
+def test_missing_file_is_not_cached(tmp_path, cache):
+    path = str(tmp_path / "missing.db")
+    assert cache.fingerprint(path) is None
+    cache.put(path, QUERY, None, results([(1, "a")]))
+    assert cache.stats()["entries"] == 0
+
+
+def test_literals_are_part_of_the_key():
+    key = ResultCache.normalize_sql
+    assert key("SELECT  'a  b'\n FROM t;") == "SELECT 'a  b' FROM t"
+    assert key("SELECT 'a b' FROM t") != key("SELECT 'a  b' FROM t")
+
+
+@pytest.mark.parametrize("statements, cacheable", [
+    (["SELECT * FROM t"], True),
+    (["WITH x AS (SELECT 1) SELECT * FROM x"], True),
+    (["SELECT random()"], False),
+    (["SELECT date('now')"], False),
+    (["UPDATE t SET name = 'x'"], False),
+    (["PRAGMA table_info(t)"], False),
+    ([], False),
+])
+def test_is_cacheable(statements, cacheable):
+    assert ResultCache.is_cacheable(statements) == cacheable
+
+
+def test_extend_appends_fetched_batches(db_path, cache):
+    cache.put(db_path, QUERY, cache.fingerprint(db_path), results([(1, "a")], has_more=True))
+    cache.extend(db_path, QUERY, [(2, "b")], False)
+    last = cache.get(db_path, QUERY)["results"][-1]
+    assert last["rows"] == [(1, "a"), (2, "b")]
+    assert last["rowcount"] == 2
+    assert last["has_more"] is False
+
+
+def test_lru_eviction_and_spill(db_path, tmp_path):
+    rows = [(i, "x" * 100) for i in range(50)]
+    size = ResultCache._estimate(rows) + 200
+    cache = ResultCache(max_bytes=int(size * 2.5), spill_dir=str(tmp_path / "spill"))
+    try:
+        fingerprint = cache.fingerprint(db_path)
+        for n in range(3):
+            cache.put(db_path, [f"SELECT {n}"], fingerprint, results(rows))
+        stats = cache.stats()
+        assert stats["entries"] == 2
+        assert stats["spilled"] == 1
+        # Найдавніший запис повертається з диска
+        assert cache.get(db_path, ["SELECT 0"])["results"][0]["rows"] == rows
+        assert cache.stats()["memory_bytes"] <= cache.max_bytes
+    finally:
+        cache.close()
+
+
+def test_oversized_entry_is_skipped(db_path):
+    cache = ResultCache(max_entry_bytes=1000)
+    try:
+        cache.put(db_path, QUERY, cache.fingerprint(db_path), results([(i, "x" * 100) for i in range(100)]))
+        assert cache.stats()["entries"] == 0
+    finally:
+        cache.close()
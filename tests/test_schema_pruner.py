@@ -0,0 +1,69 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_core import ConnectionManager, SchemaCatalog, SchemaPruner
+
+NOISE = ["audit_log", "settings", "sessions", "invoices", "products", "warehouses", "shipments",
+         "suppliers", "coupons", "reviews"]
+
+
+@pytest.fixture
+def schema(tmp_path):
+    db_path = str(tmp_path / "shop.db")
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE departments (id INTEGER PRIMARY KEY, title TEXT);
+        CREATE TABLE employees (id INTEGER PRIMARY KEY, full_name TEXT, salary REAL,
+                                department_id INTEGER REFERENCES departments(id));
+        CREATE TABLE klienty (id INTEGER PRIMARY KEY, imia TEXT);
+        CREATE TABLE payroll (id INTEGER PRIMARY KEY, employee_id INTEGER REFERENCES employees(id), amount REAL);
+    """)
+    for name in NOISE:
+        conn.execute(f"CREATE TABLE {name} (id INTEGER PRIMARY KEY, code TEXT, created_at TEXT)")
+    conn.commit()
+    conn.close()
+    connections = ConnectionManager()
+    yield SchemaCatalog(connections).get(db_path)
+    connections.close_all()
+
+
+def test_relevant_table_comes_first_with_fk_neighbours(schema):
+    selected = SchemaPruner().select(schema, "Average salary of employees")
+    assert selected[0] == "employees"
+    # Таблиця, на яку посилається employees, і таблиця, що посилається на неї
+    assert {"departments", "payroll"} <= set(selected)
+    assert not set(selected) & set(NOISE)
+
+
+def test_column_match_scores_lower_than_name_match(schema):
+    scores = SchemaPruner().score_tables(schema, "employees salary")
+    assert scores["employees"][0] == 3 + 1
+    # employee_id у payroll - лише збіг за колонкою
+    assert scores["payroll"][0] == 1
+    assert scores["settings"][0] == 0
+
+
+def test_ukrainian_question_matches_transliterated_name(schema):
+    assert SchemaPruner().select(schema, "Покажи всіх клієнтів")[0] == "klienty"
+
+
+def test_history_breaks_ties(schema):
+    history = ["SELECT * FROM reviews"] * 5
+    scores = SchemaPruner().score_tables(schema, "щось зовсім інше", history)
+    assert scores["reviews"][1] > 0
+    assert scores["coupons"][1] == 0
+    # Жодного збігу - віддаються всі таблиці, часто вживані першими
+    assert SchemaPruner().select(schema, "щось зовсім інше", history)[0] == "reviews"
+
+
+def test_top_k_and_token_budget(schema):
+    assert len(SchemaPruner(top_k=20).select(schema, "anything")) == len(schema.tables)
+    selected = SchemaPruner(token_budget=30).select(schema, "employees")
+    # Перша таблиця береться завжди, решта - лише поки вміщається в бюджет
+    assert selected[0] == "employees"
+    assert len(selected) < len(schema.tables)
@@ -0,0 +1,52 @@
+import os
+import random
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_core import HyperLogLog, TopK
+
+
+@pytest.mark.parametrize("distinct", [0, 1, 10, 1000, 50000, 300000])
+def test_hyperloglog_within_error_bound(distinct):
+    sketch = HyperLogLog(p=12)
+    for value in range(distinct):
+        sketch.add(value)
+        if value % 3 == 0:
+            sketch.add(value)   # повтори не впливають на оцінку
+    # Стандартна похибка 1.04 / sqrt(4096) ≈ 1.6%; допускаємо чотири стандартні похибки
+    assert abs(sketch.count() - distinct) <= max(2, 0.065 * distinct)
+
+
+def test_hyperloglog_mixed_types():
+    sketch = HyperLogLog(p=10)
+    values = [f"user{i}@example.com" for i in range(20000)] + [i * 0.5 for i in range(20000)]
+    for value in values:
+        sketch.add(value)
+    assert abs(sketch.count() - len(set(values))) <= 0.13 * len(set(values))
+
+
+def test_topk_finds_heavy_hitters():
+    rng = random.Random(7)
+    values = ["a"] * 5000 + ["b"] * 3000 + ["c"] * 2000 + [f"noise{rng.randrange(50000)}" for _ in range(40000)]
+    rng.shuffle(values)
+    sketch = TopK(k=3, capacity=100)
+    for value in values:
+        sketch.add(value)
+    exact = Counter(values)
+    top = sketch.top()
+    assert [value for value, _ in top] == ["a", "b", "c"]
+    bound = len(values) / (sketch.capacity + 1)
+    for value, count in top:
+        # Лічильники Misra-Gries - нижні межі з похибкою не більше n / (capacity + 1)
+        assert exact[value] - bound <= count <= exact[value]
+
+
+def test_topk_is_exact_below_capacity():
+    sketch = TopK(k=2, capacity=10)
+    for value in "aaabbc":
+        sketch.add(value)
+    assert sketch.top() == [("a", 3), ("b", 2)]
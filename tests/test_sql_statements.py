@@ -0,0 +1,43 @@
+import os
+import sqlite3
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_core import chart_categories, chart_line, split_sql_statements
+
+
+class SplitStatementsTest(unittest.TestCase):
+    def test_comment_only_tail_is_dropped(self):
+        self.assertEqual(split_sql_statements("SELECT 1; -- note"), ["SELECT 1"])
+        self.assertEqual(split_sql_statements("SELECT 1; /* note */ ;"), ["SELECT 1"])
+        self.assertEqual(split_sql_statements("-- only a comment"), [])
+
+    def test_comments_inside_statements_are_kept(self):
+        self.assertEqual(split_sql_statements("-- head\nSELECT 1; SELECT '--' -- tail"),
+                         ["-- head\nSELECT 1", "SELECT '--' -- tail"])
+
+
+class ChartTrailingCommentTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE t (category INTEGER, value INTEGER)")
+        self.conn.executemany("INSERT INTO t VALUES (?, ?)", [(i % 3, i) for i in range(12)])
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_categories(self):
+        rows, more = chart_categories(self.conn, "SELECT * FROM t -- note", "category")
+        self.assertEqual(sorted(rows), [(0, 4), (1, 4), (2, 4)])
+        self.assertFalse(more)
+
+    def test_line(self):
+        points, info = chart_line(self.conn, "SELECT * FROM t -- note", "value", "category")
+        self.assertEqual(info["rows"], 12)
+        self.assertEqual(len(points), 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_core import ConnectionManager, SchemaCatalog, TableBrowser
+
+
+@pytest.fixture
+def table(tmp_path):
+    db_path = str(tmp_path / "browse.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, score INTEGER)")
+    conn.executemany("INSERT INTO items (name, score) VALUES (?, ?)",
+                     [(f"item {i}", None if i % 7 == 0 else i % 10) for i in range(1, 51)])
+    conn.execute("INSERT INTO items (name, score) VALUES ('what?', 3), ('a''b?c', 4)")
+    conn.commit()
+    connections = ConnectionManager()
+    catalog = SchemaCatalog(connections)
+    yield connections.get(db_path), catalog.table(db_path, "items")
+    connections.close_all()
+    conn.close()
+
+
+def visible(rows, browser):
+    return [row[:len(row) - browser.hidden] for row in rows]
+
+
+def walk_forward(conn, browser):
+    rows = visible(browser.first(conn), browser)
+    while True:
+        page = browser.next(conn)
+        if not page:
+            return rows
+        rows += visible(page, browser)
+
+
+def test_seek_pages_match_single_query(table):
+    conn, info = table
+    browser = TableBrowser(info, page_size=7)
+    browser.set_sort("score", descending=True)
+    browser.set_filter("name", "item")
+    expected = conn.execute(
+        "SELECT * FROM items WHERE name LIKE '%item%' ORDER BY score DESC, rowid DESC").fetchall()
+    assert walk_forward(conn, browser) == expected
+    assert browser.estimate_pages(conn) == -(-len(expected) // 7)
+
+
+def test_previous_returns_same_page(table):
+    conn, info = table
+    browser = TableBrowser(info, page_size=5)
+    browser.set_sort("score")
+    first = browser.first(conn)
+    second = browser.next(conn)
+    browser.next(conn)
+    assert browser.previous(conn) == second
+    assert browser.previous(conn) == first
+
+
+def test_jump_matches_offset(table):
+    conn, info = table
+    browser = TableBrowser(info, page_size=6)
+    browser.set_sort("name")
+    rows = visible(browser.jump(conn, 4), browser)
+    assert rows == conn.execute("SELECT * FROM items ORDER BY name, rowid LIMIT 6 OFFSET 18").fetchall()
+
+
+def test_export_sql_keeps_question_marks_in_values(table):
+    conn, info = table
+    browser = TableBrowser(info)
+    browser.set_filter("name", "?")
+    browser.set_filter("score", ">=3")
+    sql = browser.export_sql()
+    assert conn.execute(sql).fetchall() == conn.execute(
+        "SELECT * FROM items WHERE name LIKE '%?%' AND score >= 3").fetchall()
+    assert len(conn.execute(sql).fetchall()) == 2
+
+
+def test_export_sql_matches_browser_rows(table):
+    conn, info = table
+    browser = TableBrowser(info, page_size=1000)
+    browser.set_filter("name", "'b?")
+    browser.set_sort("score", descending=True)
+    exported = conn.execute(browser.export_sql()).fetchall()
+    assert exported == visible(browser.first(conn), browser)
+    assert [row[1] for row in exported] == ["a'b?c"]